@@ -19,7 +19,8 @@ from app.api.models.stamp import (
     StampListResponse,
     StampHealthCheckResponse,
     StampHealthStatus,
-    StampHealthIssue
+    StampHealthIssue,
+    STAMP_ID_PATTERN
 )
 
 router = APIRouter()
@@ -132,7 +133,7 @@ async def list_stamps(
     summary="Check Stamp Health for Uploads"
 )
 async def check_stamp_health(
-    stamp_id: str = Path(..., description="The Batch ID of the Swarm stamp to check.", example="a1b2c3d4e5f6...", pattern=r"^[a-fA-F0-9]{64}$")
+    stamp_id: str = Path(..., description="The Batch ID of the Swarm stamp to check.", example="a1b2c3d4e5f6...", pattern=STAMP_ID_PATTERN)
 ) -> Any:
     """
     Performs a comprehensive health check on a stamp to determine if it can be used for uploads.
@@ -230,7 +231,7 @@ async def check_stamp_health(
     summary="Get Specific Swarm Stamp Batch Details"
 )
 async def get_stamp_details(
-    stamp_id: str = Path(..., description="The Batch ID of the Swarm stamp to retrieve.", example="a1b2c3d4e5f6...", pattern=r"^[a-fA-F0-9]{64}$")
+    stamp_id: str = Path(..., description="The Batch ID of the Swarm stamp to retrieve.", example="a1b2c3d4e5f6...", pattern=STAMP_ID_PATTERN)
 ) -> Any:
     """
     Retrieves details for a specific Swarm postage stamp batch by its ID.
@@ -451,7 +452,7 @@ async def purchase_stamp(
     summary="Extend an Existing Swarm Postage Stamp"
 )
 async def extend_stamp(
-    stamp_id: str = Path(..., description="The Batch ID of the stamp to extend.", example="a1b2c3d4e5f6...", pattern=r"^[a-fA-F0-9]{64}$"),
+    stamp_id: str = Path(..., description="The Batch ID of the stamp to extend.", example="a1b2c3d4e5f6...", pattern=STAMP_ID_PATTERN),
     extension_request: StampExtensionRequest = ...
 ) -> Any:
     """
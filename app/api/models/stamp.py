@@ -1,7 +1,12 @@
 # app/api/models/stamp.py
+import re
 from pydantic import BaseModel, Field, field_validator, model_validator
 from typing import Optional, List, Literal
 
+# Batch IDs are 32-byte hex strings
+STAMP_ID_PATTERN = r"^[a-fA-F0-9]{64}$"
+STAMP_ID_RE = re.compile(STAMP_ID_PATTERN)
+
 # Size presets mapping to depth values
 SIZE_PRESETS = {
     "small": 17,   # Use for one small document
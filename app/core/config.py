@@ -46,6 +46,7 @@ class Settings(BaseSettings):
 
     # === x402 Audit Settings ===
     X402_AUDIT_LOG_PATH: str = "logs/x402_audit.jsonl"
+    X402_AUDIT_DEDUP: bool = False  # Collapse consecutive identical events into one line with a count
 
     # === Base Chain Settings (for monitoring USDC receipts) ===
     BASE_RPC_URL: str = "https://sepolia.base.org"
@@ -10,14 +10,18 @@ Configuration is loaded from app/core/config.py:
 - X402_BLACKLIST_IPS: Comma-separated list of blocked IPs
 - X402_WHITELIST_IPS: Comma-separated list of IPs that bypass payment
 """
+import functools
 import logging
 import ipaddress
-from typing import Optional, Set, Tuple
+from typing import Optional, Set, Tuple, Union
 
 from app.core.config import settings
 
 logger = logging.getLogger(__name__)
 
+IPAddress = Union[ipaddress.IPv4Address, ipaddress.IPv6Address]
+IPNetwork = Union[ipaddress.IPv4Network, ipaddress.IPv6Network]
+
 
 def parse_ip_list(ip_string: Optional[str]) -> Set[str]:
     """
@@ -60,7 +64,44 @@ def parse_ip_list(ip_string: Optional[str]) -> Set[str]:
     return result
 
 
-def ip_matches_list(client_ip: str, ip_list: Set[str]) -> bool:
+@functools.lru_cache(maxsize=32)
+def parse_ip_networks(ip_string: str) -> Tuple[IPNetwork, ...]:
+    """
+    Parse a comma-separated IP list into network objects.
+
+    Single IPs become /32 (or /128) networks, so matching is a containment
+    check for every entry. Results are cached per list string, so a setting
+    is parsed once rather than on every request.
+
+    Args:
+        ip_string: Comma-separated IP addresses/ranges
+
+    Returns:
+        Tuple of IPv4Network/IPv6Network objects
+    """
+    return tuple(
+        ipaddress.ip_network(entry, strict=False) for entry in parse_ip_list(ip_string)
+    )
+
+
+def parse_client_ip(client_ip: str) -> Optional[IPAddress]:
+    """
+    Parse a client IP string into an address object.
+
+    Args:
+        client_ip: The client's IP address
+
+    Returns:
+        The parsed IPv4Address/IPv6Address, or None if invalid
+    """
+    try:
+        return ipaddress.ip_address(client_ip)
+    except ValueError:
+        logger.warning(f"Invalid client IP address: {client_ip}")
+        return None
+
+
+def ip_matches_list(client_ip: Union[str, IPAddress], ip_list: Set[str]) -> bool:
     """
     Check if a client IP matches any entry in the IP list.
 
@@ -69,7 +110,8 @@ def ip_matches_list(client_ip: str, ip_list: Set[str]) -> bool:
     - CIDR range matching
 
     Args:
-        client_ip: The client's IP address
+        client_ip: The client's IP address, as a string or an already-parsed
+            address (lets callers checking several lists parse only once)
         ip_list: Set of IPs/CIDR ranges to check against
 
     Returns:
@@ -78,11 +120,12 @@ def ip_matches_list(client_ip: str, ip_list: Set[str]) -> bool:
     if not ip_list:
         return False
 
-    try:
-        client = ipaddress.ip_address(client_ip)
-    except ValueError:
-        logger.warning(f"Invalid client IP address: {client_ip}")
-        return False
+    if isinstance(client_ip, str):
+        client = parse_client_ip(client_ip)
+        if client is None:
+            return False
+    else:
+        client = client_ip
 
     for entry in ip_list:
         try:
@@ -162,12 +205,26 @@ def check_access(
         - ("free", None) - Client is whitelisted (free access)
         - ("pay", None) - Client must pay via x402
     """
+    # Read both lists once; empty lists skip parsing and matching entirely
+    blacklist_ips = settings.X402_BLACKLIST_IPS
+    whitelist_ips = settings.X402_WHITELIST_IPS
+
+    if not blacklist_ips and not whitelist_ips:
+        return ("pay", None)
+
+    # Parse the client IP once for both lists
+    client = parse_client_ip(client_ip)
+    if client is None:
+        return ("pay", None)
+
     # First check blacklist - blocked IPs cannot proceed at all
-    if is_ip_blacklisted(client_ip):
+    if blacklist_ips and any(client in network for network in parse_ip_networks(blacklist_ips)):
+        logger.warning(f"Blocked blacklisted IP: {client_ip}")
         return ("blocked", "IP address is blocked")
 
     # Check whitelist - whitelisted IPs bypass payment
-    if is_ip_whitelisted(client_ip):
+    if whitelist_ips and any(client in network for network in parse_ip_networks(whitelist_ips)):
+        logger.info(f"Allowing whitelisted IP to bypass payment: {client_ip}")
         return ("free", None)
 
     # Normal access - requires payment
@@ -11,6 +11,12 @@ This module logs all x402 payment events for:
 Log format: JSON lines (one event per line)
 Log location: Configured via X402_AUDIT_LOG_PATH
 
+Events are written by AuditLogHandler, a logging.Handler that buffers them
+in memory and appends in batches: a batch is written once AUDIT_BATCH_SIZE
+events are pending, after AUDIT_FLUSH_INTERVAL_SECONDS, on read, or at
+logging shutdown. Call flush_audit_log() to force a write. The log file
+stays open between batches and is reopened if it is rotated.
+
 Events logged:
 - Request received (timestamp, client IP, endpoint, method)
 - Preflight check (balances, pass/fail)
@@ -24,16 +30,32 @@ Events logged:
 import json
 import logging
 import os
-import uuid
+import threading
+from collections import Counter
 from datetime import datetime, timezone
-from pathlib import Path
-from typing import Dict, Any, Optional
+from typing import BinaryIO, Dict, Any, Iterator, List, Optional, Tuple
 from enum import Enum
 
+import orjson
+
 from app.core.config import settings
 
 logger = logging.getLogger(__name__)
 
+# Write batching
+AUDIT_BATCH_SIZE = 64  # Flush once this many events are pending
+AUDIT_FLUSH_INTERVAL_SECONDS = 1.0  # Max time an event waits in the buffer
+
+# Directory already checked by ensure_audit_log_directory
+_ensured_log_dir: Optional[str] = None
+
+# Block size for reading the log backwards
+AUDIT_READ_CHUNK_BYTES = 64 * 1024
+
+# Running totals for get_audit_stats, advanced over newly appended lines only
+_stats_state: Optional[Dict[str, Any]] = None
+_stats_lock = threading.Lock()
+
 
 class AuditEventType(Enum):
     """Types of audit events that can be logged."""
@@ -53,30 +75,46 @@ class AuditEventType(Enum):
     ERROR = "error"
 
 
+# Enum member -> serialized string, resolved once instead of per event
+_TYPE_STR: Dict[AuditEventType, str] = {member: member.value for member in AuditEventType}
+
+
+_urandom = os.urandom
+_now = datetime.now
+_UTC = timezone.utc
+
+
 def generate_request_id() -> str:
-    """Generate a unique request ID for tracking."""
-    return str(uuid.uuid4())[:8]
+    """Generate a unique request ID for tracking (8 random hex chars)."""
+    return _urandom(4).hex()
 
 
-def get_audit_log_path() -> Path:
+def get_audit_log_path() -> str:
     """Get the path to the audit log file."""
-    log_path = settings.X402_AUDIT_LOG_PATH
-    return Path(log_path)
+    return settings.X402_AUDIT_LOG_PATH
 
 
 def ensure_audit_log_directory() -> bool:
     """
     Ensure the audit log directory exists.
 
+    The directory is only checked once per configured path; later calls
+    return immediately.
+
     Returns:
         True if directory exists or was created, False on error
     """
+    global _ensured_log_dir
+
+    log_dir = os.path.dirname(get_audit_log_path())
+    if log_dir == _ensured_log_dir:
+        return True
+
     try:
-        log_path = get_audit_log_path()
-        log_dir = log_path.parent
-        if not log_dir.exists():
-            log_dir.mkdir(parents=True, exist_ok=True)
+        if log_dir and not os.path.isdir(log_dir):
+            os.makedirs(log_dir, exist_ok=True)
             logger.info(f"Created audit log directory: {log_dir}")
+        _ensured_log_dir = log_dir
         return True
     except Exception as e:
         logger.error(f"Failed to create audit log directory: {e}")
@@ -104,8 +142,8 @@ def create_audit_event(
         A structured event ready to be written to the audit log
     """
     return {
-        "timestamp": datetime.now(timezone.utc).isoformat(),
-        "event_type": event_type.value,
+        "timestamp": _now(_UTC).isoformat(),
+        "event_type": _TYPE_STR[event_type],
         "request_id": request_id or generate_request_id(),
         "client_ip": client_ip,
         "wallet_address": wallet_address,
@@ -113,6 +151,250 @@ def create_audit_event(
     }
 
 
+def _dumps(obj: Any, option: int = 0) -> bytes:
+    """
+    Serialize to compact JSON with orjson.
+
+    Integers wider than 64 bits (wei/PLUR balances) are rejected by orjson,
+    so those objects fall back to the json module, which writes them exactly.
+    """
+    try:
+        return orjson.dumps(obj, option=option | orjson.OPT_NON_STR_KEYS)
+    except TypeError:
+        line = json.dumps(obj, separators=(",", ":"), ensure_ascii=False, default=str).encode()
+        return line + b"\n" if option & orjson.OPT_APPEND_NEWLINE else line
+
+
+def _dedup_key(event: Dict[str, Any], explicit_id: bool = False) -> bytes:
+    """
+    Identity of an event for deduplication.
+
+    The timestamp is ignored, and so is a generated request_id; a request_id
+    the caller supplied is part of the key, so events from different
+    requests are never merged.
+    """
+    return _dumps((
+        event["event_type"],
+        event["client_ip"],
+        event["wallet_address"],
+        event["data"],
+        event["request_id"] if explicit_id else None,
+    ))
+
+
+class AuditLogHandler(logging.Handler):
+    """
+    Buffered JSON-lines writer for audit events.
+
+    Serialized events are held in memory and appended to the log file in
+    batches through a persistent O_APPEND descriptor. The buffer is guarded
+    by the handler's own lock, which is not held while a full or timed
+    batch is written, and logging.shutdown() flushes and closes the handler
+    at exit.
+
+    Like logging.StreamHandler it accepts a binary stream; batches are then
+    written to the stream instead of the log file (useful for capturing
+    events in memory).
+
+    It can also be attached to a standard logger: records whose msg is an
+    audit event dict (see create_audit_event) are written to
+    X402_AUDIT_LOG_PATH.
+    """
+
+    def __init__(self, stream: Optional[BinaryIO] = None):
+        super().__init__()
+        self.stream = stream
+        self._pending: List[bytes] = []
+        self._pending_path: Optional[str] = None
+        self._flush_timer: Optional[threading.Timer] = None
+        # Serializes file writes; held without self.lock while writing
+        self._write_lock = threading.Lock()
+        # Last buffered event and its dedup key, for X402_AUDIT_DEDUP
+        self._last_event: Optional[Dict[str, Any]] = None
+        self._last_event_key: Optional[bytes] = None
+        # Persistent descriptor and the (st_dev, st_ino) it was opened on
+        self._fd: Optional[int] = None
+        self._fd_path: Optional[str] = None
+        self._fd_id: Optional[Tuple[int, int]] = None
+
+    def emit(self, record: logging.LogRecord) -> None:
+        """Buffer a record whose msg is an audit event dict; ignore other records."""
+        if not isinstance(record.msg, dict):
+            return
+        try:
+            self.write_event(get_audit_log_path(), record.msg, settings.X402_AUDIT_DEDUP)
+        except Exception:
+            self.handleError(record)
+
+    def write_event(
+        self,
+        log_path: str,
+        event: Dict[str, Any],
+        dedup: bool = False,
+        explicit_id: bool = False,
+    ) -> str:
+        """
+        Buffer an event, flushing when the batch is full.
+
+        With dedup enabled, an event identical to the last buffered one is
+        merged into it (count/last_timestamp) instead of appended. Pass
+        explicit_id when the event's request_id came from the caller; it
+        then only merges with events of that same request.
+
+        Returns:
+            The request_id of the buffered entry
+        """
+        key = _dedup_key(event, explicit_id) if dedup else None
+        line = _dumps(event, orjson.OPT_APPEND_NEWLINE)
+
+        batch = None
+        with self.lock:
+            # A batch only ever targets one file
+            if self._pending and log_path != self._pending_path:
+                self._write_batch(*self._detach_batch_locked())
+
+            if key is not None and key == self._last_event_key:
+                previous = self._last_event
+                previous["count"] = previous.get("count", 1) + 1
+                previous["last_timestamp"] = event["timestamp"]
+                self._pending[-1] = _dumps(previous, orjson.OPT_APPEND_NEWLINE)
+                return previous["request_id"]
+
+            self._pending.append(line)
+            self._pending_path = log_path
+            self._last_event, self._last_event_key = event, key
+
+            if len(self._pending) >= AUDIT_BATCH_SIZE:
+                batch = self._detach_batch_locked()
+            elif self._flush_timer is None:
+                self._flush_timer = threading.Timer(AUDIT_FLUSH_INTERVAL_SECONDS, self.flush)
+                self._flush_timer.daemon = True
+                self._flush_timer.start()
+
+        # Write after releasing the buffer lock so other loggers keep appending
+        if batch is not None:
+            self._write_batch(*batch)
+        return event["request_id"]
+
+    def flush(self) -> None:
+        """Write any buffered events."""
+        self.flush_pending()
+
+    def flush_pending(self) -> bool:
+        """
+        Write any buffered events.
+
+        Returns:
+            True if the buffer was written (or empty), False on error
+        """
+        with self.lock:
+            if not self._pending:
+                self._cancel_timer_locked()
+                return True
+            batch = self._detach_batch_locked()
+        return self._write_batch(*batch)
+
+    def close(self) -> None:
+        """Flush buffered events and close the log file."""
+        self.flush_pending()
+        with self._write_lock:
+            self._close_fd()
+        super().close()
+
+    def _cancel_timer_locked(self) -> None:
+        """Stop the pending flush timer. Caller must hold self.lock."""
+        if self._flush_timer is not None:
+            self._flush_timer.cancel()
+            self._flush_timer = None
+
+    def _detach_batch_locked(self) -> Tuple[List[bytes], str]:
+        """
+        Take the pending batch and reserve the writer for it.
+
+        Acquires _write_lock before the caller releases self.lock, so batches
+        reach the file in the order they were detached; _write_batch releases
+        it. Caller must hold self.lock and the batch must be non-empty.
+        """
+        self._cancel_timer_locked()
+        batch = (self._pending, self._pending_path)
+        self._pending, self._pending_path = [], None
+        self._last_event, self._last_event_key = None, None
+        self._write_lock.acquire()
+        return batch
+
+    def _write_batch(self, lines: List[bytes], log_path: str) -> bool:
+        """Append a detached batch in a single write and release _write_lock."""
+        error = None
+        try:
+            if self.stream is not None:
+                self.stream.write(b"".join(lines))
+                self.stream.flush()
+            else:
+                os.write(self._get_fd(log_path), b"".join(lines))
+        except Exception as e:
+            error = e
+            self._close_fd()
+        finally:
+            self._write_lock.release()
+
+        # Log only after releasing _write_lock: if this handler is attached
+        # to an ancestor logger, the record re-enters emit() and may flush
+        if error is not None:
+            logger.error(f"Failed to write {len(lines)} audit events: {error}")
+            return False
+        return True
+
+    def _get_fd(self, log_path: str) -> int:
+        """
+        Get the append-mode descriptor for log_path, reusing the cached one.
+
+        Reopens when the configured path changes or when the file on disk is
+        no longer the one we opened (rotated or deleted). Caller must hold
+        _write_lock.
+        """
+        if self._fd is not None and log_path == self._fd_path:
+            try:
+                st = os.stat(log_path)
+                if (st.st_dev, st.st_ino) == self._fd_id:
+                    return self._fd
+            except OSError:
+                pass
+
+        self._close_fd()
+        fd = os.open(log_path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        st = os.fstat(fd)
+        self._fd, self._fd_path, self._fd_id = fd, log_path, (st.st_dev, st.st_ino)
+        return fd
+
+    def _close_fd(self) -> None:
+        """Close the cached descriptor. Caller must hold _write_lock."""
+        if self._fd is not None:
+            try:
+                os.close(self._fd)
+            except OSError:
+                pass
+        self._fd, self._fd_path, self._fd_id = None, None, None
+
+
+# Shared writer used by log_audit_event
+_audit_handler = AuditLogHandler()
+
+
+def flush_audit_log() -> bool:
+    """
+    Write any buffered audit events to the log file.
+
+    Returns:
+        True if the buffer was written (or empty), False on error
+    """
+    return _audit_handler.flush_pending()
+
+
+def close_audit_log() -> None:
+    """Flush buffered events and close the audit log file."""
+    _audit_handler.close()
+
+
 def log_audit_event(
     event_type: AuditEventType,
     data: Dict[str, Any],
@@ -123,6 +405,9 @@ def log_audit_event(
     """
     Log an audit event to the x402 audit log.
 
+    The event is buffered and written with the next batch (see
+    flush_audit_log); write errors at flush time are logged, not raised.
+
     Args:
         event_type: Type of event to log
         data: Event-specific data
@@ -131,27 +416,24 @@ def log_audit_event(
         request_id: Unique request identifier (if available)
 
     Returns:
-        The request_id used for this event, or None on error
+        The request_id used for this event (the merged entry's when
+        X402_AUDIT_DEDUP collapses it into the previous one; a request_id
+        passed in is always kept), or None on error
     """
-    event = create_audit_event(
-        event_type=event_type,
-        data=data,
-        client_ip=client_ip,
-        wallet_address=wallet_address,
-        request_id=request_id
-    )
+    # Positional call: every log_* helper funnels through here
+    event = create_audit_event(event_type, data, client_ip, wallet_address, request_id)
 
     try:
         # Ensure directory exists
         ensure_audit_log_directory()
 
-        # Write event as JSON line
-        log_path = get_audit_log_path()
-        with open(log_path, "a") as f:
-            f.write(json.dumps(event) + "\n")
+        # Buffer event as JSON line
+        logged_id = _audit_handler.write_event(
+            get_audit_log_path(), event, settings.X402_AUDIT_DEDUP, bool(request_id)
+        )
 
-        logger.debug(f"Audit event logged: {event_type.value} [{event['request_id']}]")
-        return event["request_id"]
+        logger.debug(f"Audit event logged: {event['event_type']} [{logged_id}]")
+        return logged_id
 
     except Exception as e:
         logger.error(f"Failed to write audit event: {e}")
@@ -436,6 +718,85 @@ def log_error(
     )
 
 
+def _iter_lines_reversed(f: BinaryIO) -> Iterator[bytes]:
+    """
+    Yield the lines of a binary file from last to first.
+
+    Reads backwards from the end in AUDIT_READ_CHUNK_BYTES blocks, so callers
+    that stop early never touch the start of the file.
+    """
+    f.seek(0, os.SEEK_END)
+    position = f.tell()
+    remainder = b""
+
+    while position > 0:
+        read_size = min(AUDIT_READ_CHUNK_BYTES, position)
+        position -= read_size
+        f.seek(position)
+        lines = (f.read(read_size) + remainder).split(b"\n")
+        # The first piece may be the tail of a line from the previous block
+        remainder = lines[0]
+        for line in reversed(lines[1:]):
+            yield line
+
+    yield remainder
+
+
+def _field_needles(field: str, value: str) -> Tuple[bytes, bytes]:
+    """Byte forms of '"field": value' in compact and json.dumps-default lines."""
+    key = orjson.dumps(field)
+    encoded = orjson.dumps(value)
+    return key + b":" + encoded, key + b": " + encoded
+
+
+def _iter_matching_lines(
+    f: BinaryIO,
+    event_type: Optional[AuditEventType],
+    client_ip: Optional[str],
+    decode: bool,
+) -> Iterator[Tuple[bytes, Optional[Dict[str, Any]]]]:
+    """
+    Yield (line, event) for entries matching the filters, most recent first.
+
+    A filter is pre-checked as a byte substring, in both the compact orjson
+    form and the '": "' form of older json.dumps lines; only candidate lines
+    are decoded and checked exactly. Filtered reads always decode. Otherwise,
+    with decode=False, lines are yielded raw (event is None) after a cheap
+    shape check.
+    """
+    wanted_type = _TYPE_STR[event_type] if event_type else None
+
+    needles = []
+    if wanted_type:
+        needles.append(_field_needles("event_type", wanted_type))
+    if client_ip:
+        needles.append(_field_needles("client_ip", client_ip))
+    decode = decode or bool(needles)
+
+    for line in _iter_lines_reversed(f):
+        line = line.strip()
+        if not line:
+            continue
+        if needles and not all(
+            any(form in line for form in forms) for forms in needles
+        ):
+            continue
+        if not decode:
+            if line.startswith(b"{") and line.endswith(b"}"):
+                yield line, None
+            continue
+        try:
+            event = orjson.loads(line)
+        except orjson.JSONDecodeError:
+            continue
+        # Apply filters
+        if wanted_type and event.get("event_type") != wanted_type:
+            continue
+        if client_ip and event.get("client_ip") != client_ip:
+            continue
+        yield line, event
+
+
 def read_audit_log(
     max_entries: int = 100,
     event_type: Optional[AuditEventType] = None,
@@ -453,35 +814,127 @@ def read_audit_log(
         List of audit events (most recent first)
     """
     try:
+        flush_audit_log()
         log_path = get_audit_log_path()
-        if not log_path.exists():
+        if not os.path.exists(log_path):
             return []
 
+        # Walk backwards from the end so only the newest entries are parsed
         events = []
-        with open(log_path, "r") as f:
-            for line in f:
-                line = line.strip()
-                if not line:
-                    continue
-                try:
-                    event = json.loads(line)
-                    # Apply filters
-                    if event_type and event.get("event_type") != event_type.value:
-                        continue
-                    if client_ip and event.get("client_ip") != client_ip:
-                        continue
-                    events.append(event)
-                except json.JSONDecodeError:
-                    continue
-
-        # Return most recent first, limited to max_entries
-        return list(reversed(events))[:max_entries]
+        with open(log_path, "rb") as f:
+            for _, event in _iter_matching_lines(f, event_type, client_ip, decode=True):
+                if len(events) >= max_entries:
+                    break
+                events.append(event)
+
+        return events
 
     except Exception as e:
         logger.error(f"Failed to read audit log: {e}")
         return []
 
 
+def read_audit_log_bytes(
+    max_entries: int = 100,
+    event_type: Optional[AuditEventType] = None,
+    client_ip: Optional[str] = None
+) -> bytes:
+    """
+    Read entries from the audit log as a JSON array, ready to send as-is.
+
+    Same selection as read_audit_log, but the stored lines are copied into
+    the array without re-serializing them, and without parsing at all when
+    no filter is given. Suitable for Response(content=..., media_type="application/json").
+
+    Returns:
+        JSON array of audit events (most recent first)
+    """
+    try:
+        flush_audit_log()
+        log_path = get_audit_log_path()
+        if not os.path.exists(log_path):
+            return b"[]"
+
+        lines = []
+        with open(log_path, "rb") as f:
+            for line, _ in _iter_matching_lines(f, event_type, client_ip, decode=False):
+                if len(lines) >= max_entries:
+                    break
+                lines.append(line)
+
+        return b"[" + b",".join(lines) + b"]"
+
+    except Exception as e:
+        logger.error(f"Failed to read audit log: {e}")
+        return b"[]"
+
+
+def _update_stats_state(log_path: str) -> Dict[str, Any]:
+    """
+    Bring the cached stats up to date with the log file.
+
+    Only lines appended since the previous call are parsed. The totals are
+    rebuilt from scratch when the path changes or the file is replaced or
+    truncated. Caller must hold _stats_lock.
+    """
+    global _stats_state
+
+    with open(log_path, "rb") as f:
+        st = os.fstat(f.fileno())
+        file_id = (st.st_dev, st.st_ino)
+
+        state = _stats_state
+        if (
+            state is None
+            or state["path"] != log_path
+            or state["file_id"] != file_id
+            or st.st_size < state["offset"]
+        ):
+            state = {
+                "path": log_path,
+                "file_id": file_id,
+                "offset": 0,
+                "total": 0,
+                "events_by_type": Counter(),
+                "first": None,
+                "last": None,
+            }
+            _stats_state = state
+
+        f.seek(state["offset"])
+        new_events = []
+        for line in f:
+            if not line.endswith(b"\n"):
+                break  # Partial line still being written; pick it up next time
+            state["offset"] += len(line)
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                new_events.append(orjson.loads(line))
+            except orjson.JSONDecodeError:
+                continue
+
+    if new_events:
+        events_by_type = state["events_by_type"]
+        events_by_type.update(e.get("event_type", "unknown") for e in new_events)
+        state["total"] += len(new_events)
+
+        # Deduplicated entries stand for `count` events
+        for event in new_events:
+            extra = event.get("count", 1) - 1
+            if extra:
+                events_by_type[event.get("event_type", "unknown")] += extra
+                state["total"] += extra
+
+        if state["first"] is None:
+            state["first"] = new_events[0].get("timestamp")
+        last = new_events[-1]
+        state["last"] = last.get("last_timestamp", last.get("timestamp"))
+
+    return state
+
+
 def get_audit_stats() -> Dict[str, Any]:
     """
     Get statistics from the audit log.
@@ -490,54 +943,33 @@ def get_audit_stats() -> Dict[str, Any]:
         Dict with event counts, date range, etc.
     """
     try:
+        flush_audit_log()
         log_path = get_audit_log_path()
-        if not log_path.exists():
+        if not os.path.exists(log_path):
             return {
                 "total_events": 0,
                 "events_by_type": {},
-                "log_path": str(log_path),
+                "log_path": log_path,
                 "log_exists": False,
             }
 
-        events_by_type: Dict[str, int] = {}
-        total = 0
-        first_timestamp = None
-        last_timestamp = None
-
-        with open(log_path, "r") as f:
-            for line in f:
-                line = line.strip()
-                if not line:
-                    continue
-                try:
-                    event = json.loads(line)
-                    total += 1
-                    event_type = event.get("event_type", "unknown")
-                    events_by_type[event_type] = events_by_type.get(event_type, 0) + 1
-
-                    timestamp = event.get("timestamp")
-                    if timestamp:
-                        if first_timestamp is None:
-                            first_timestamp = timestamp
-                        last_timestamp = timestamp
-                except json.JSONDecodeError:
-                    continue
-
-        return {
-            "total_events": total,
-            "events_by_type": events_by_type,
-            "first_event": first_timestamp,
-            "last_event": last_timestamp,
-            "log_path": str(log_path),
-            "log_exists": True,
-        }
+        with _stats_lock:
+            state = _update_stats_state(log_path)
+            return {
+                "total_events": state["total"],
+                "events_by_type": dict(state["events_by_type"]),
+                "first_event": state["first"],
+                "last_event": state["last"],
+                "log_path": log_path,
+                "log_exists": True,
+            }
 
     except Exception as e:
         logger.error(f"Failed to get audit stats: {e}")
         return {
             "total_events": 0,
             "events_by_type": {},
-            "log_path": str(get_audit_log_path()),
+            "log_path": get_audit_log_path(),
             "log_exists": False,
             "error": str(e),
         }
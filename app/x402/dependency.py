@@ -11,12 +11,11 @@ settlement and response headers.
 """
 import json
 import logging
-from typing import Optional
 
 from fastapi import HTTPException, Request
 
 from x402.types import PaymentPayload
-from x402.facilitator import FacilitatorClient, FacilitatorConfig
+from x402.facilitator import FacilitatorClient
 
 from app.core.config import settings
 from app.services.metrics import x402_payments_total
@@ -28,24 +27,17 @@ from app.x402.middleware import (
     get_client_ip,
     create_payment_requirements,
     decode_payment_header,
-    X_PAYMENT_HEADER,
-    X_PAYMENT_MODE_HEADER,
+    get_facilitator_client,
+    get_payment_headers,
     X402_VERSION,
 )
 
 logger = logging.getLogger(__name__)
 
-# Lazy-initialized facilitator client
-_facilitator_client: Optional[FacilitatorClient] = None
-
 
 def _get_facilitator_client() -> FacilitatorClient:
-    """Get or create the facilitator client singleton."""
-    global _facilitator_client
-    if _facilitator_client is None:
-        config: FacilitatorConfig = {"url": settings.X402_FACILITATOR_URL}
-        _facilitator_client = FacilitatorClient(config=config)
-    return _facilitator_client
+    """Get the facilitator client singleton shared with the middleware."""
+    return get_facilitator_client()
 
 
 async def _calculate_price_for_request(request: Request) -> dict:
@@ -125,7 +117,7 @@ async def require_x402_payment(request: Request) -> None:
             }
         )
 
-    client_ip = get_client_ip(request)
+    client_ip = get_client_ip(request.scope)
     logger.info(f"x402: Processing protected request from {client_ip}: {request.method} {request.url.path}")
 
     # Calculate price for this operation
@@ -151,8 +143,7 @@ async def require_x402_payment(request: Request) -> None:
     )
 
     # Get X-PAYMENT header and payment mode
-    payment_header = request.headers.get(X_PAYMENT_HEADER)
-    payment_mode = request.headers.get(X_PAYMENT_MODE_HEADER, "").lower()
+    payment_header, payment_mode = get_payment_headers(request.scope)
 
     # If no payment header AND no free tier opt-in, return 402
     if not payment_header and payment_mode != "free":
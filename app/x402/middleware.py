@@ -12,20 +12,31 @@ ensuring malformed requests get 422 errors instead of 402.
 
 Uses the official x402 Python SDK for payment handling.
 """
-import json
+import binascii
+import functools
 import logging
-from typing import Callable, Optional
-
-from fastapi import Request, Response
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.responses import JSONResponse
-
-from x402.types import PaymentRequirements, PaymentPayload, SettleResponse
+import re
+from decimal import Decimal
+from typing import Optional, Tuple
+
+import orjson
+import pybase64
+
+from fastapi import Request
+from starlette.datastructures import MutableHeaders
+from starlette.responses import JSONResponse, Response
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from x402.types import (
+    PaymentRequirements,
+    PaymentPayload,
+    SettleResponse,
+    VerifyResponse,
+)
 from x402.facilitator import FacilitatorClient, FacilitatorConfig
-from x402.encoding import safe_base64_decode, safe_base64_encode
 
 from app.core.config import settings
-from app.x402.ratelimit import get_rate_limit_headers
+from app.services.http_client import get_client
 
 logger = logging.getLogger(__name__)
 
@@ -35,6 +46,11 @@ X_PAYMENT_HEADER = "X-PAYMENT"
 X_PAYMENT_RESPONSE_HEADER = "X-PAYMENT-RESPONSE"
 X_PAYMENT_MODE_HEADER = "X-Payment-Mode"
 
+# Lowercased raw forms for matching against ASGI scope headers
+X_PAYMENT_HEADER_B = X_PAYMENT_HEADER.lower().encode("latin-1")
+X_PAYMENT_RESPONSE_HEADER_B = X_PAYMENT_RESPONSE_HEADER.lower().encode("latin-1")
+X_PAYMENT_MODE_HEADER_B = X_PAYMENT_MODE_HEADER.lower().encode("latin-1")
+
 # USDC contract addresses by network
 USDC_ADDRESSES = {
     "base": "0x833589fCD6eDb6E08f4c7C32D4f71b54bdA02913",
@@ -56,6 +72,14 @@ USDC_TOKEN_METADATA = {
     },
 }
 
+# (asset, token metadata) per network, resolved once at import so
+# create_payment_requirements does a single lookup per request
+_DEFAULT_NETWORK = "base-sepolia"
+_NETWORK_ASSETS = {
+    network: (address, USDC_TOKEN_METADATA.get(network, USDC_TOKEN_METADATA[_DEFAULT_NETWORK]))
+    for network, address in USDC_ADDRESSES.items()
+}
+
 # Protected endpoints configuration
 # These endpoints will require x402 payment when X402_ENABLED=true
 PROTECTED_ENDPOINTS = [
@@ -65,33 +89,90 @@ PROTECTED_ENDPOINTS = [
 ]
 
 
+# One compiled matcher per method, built once from PROTECTED_ENDPOINTS
+# (changes to the list after import are not picked up). A path matches
+# a protected path exactly (ignoring trailing slashes) or as a "path/"
+# prefix for sub-resources such as /api/v1/stamps/{id}
+def _build_protected_matchers(endpoints) -> dict:
+    paths_by_method: dict = {}
+    for protected_method, protected_path in endpoints:
+        paths_by_method.setdefault(protected_method, []).append(
+            re.escape(protected_path.rstrip("/"))
+        )
+    return {
+        protected_method: re.compile(r"(?:%s)(?:/|\Z)" % "|".join(paths)).match
+        for protected_method, paths in paths_by_method.items()
+    }
+
+
+_PROTECTED_MATCHERS = _build_protected_matchers(PROTECTED_ENDPOINTS)
+
+
+@functools.lru_cache(maxsize=256)
 def is_protected_endpoint(method: str, path: str) -> bool:
     """Check if the request matches a protected endpoint."""
-    for protected_method, protected_path in PROTECTED_ENDPOINTS:
-        if method == protected_method and path.rstrip("/").startswith(protected_path.rstrip("/")):
-            return True
-    return False
+    match = _PROTECTED_MATCHERS.get(method)
+    return match is not None and match(path) is not None
 
 
-def get_client_ip(request: Request) -> str:
-    """Extract client IP from request, handling proxies."""
-    # Check for forwarded headers first
-    forwarded_for = request.headers.get("X-Forwarded-For")
-    if forwarded_for:
-        # Take the first IP in the chain
-        return forwarded_for.split(",")[0].strip()
+def get_client_ip(scope: Scope) -> str:
+    """
+    Extract client IP from an ASGI scope, handling proxies.
 
-    real_ip = request.headers.get("X-Real-IP")
-    if real_ip:
-        return real_ip.strip()
+    Scans the raw header list once; only the first X-Forwarded-For entry
+    is decoded.
+    """
+    real_ip = None
+    for name, value in scope.get("headers", ()):
+        if name == b"x-forwarded-for":
+            # Take the first IP in the chain
+            first, _, _ = value.partition(b",")
+            first = first.strip()
+            if first:
+                return first.decode("latin-1")
+        elif name == b"x-real-ip" and real_ip is None:
+            real_ip = value
+
+    if real_ip is not None:
+        real_ip = real_ip.strip()
+        if real_ip:
+            return real_ip.decode("latin-1")
 
     # Fall back to direct connection
-    if request.client:
-        return request.client.host
+    client = scope.get("client")
+    if client:
+        return client[0]
 
     return "unknown"
 
 
+def get_payment_headers(scope: Scope) -> Tuple[Optional[str], str]:
+    """
+    Extract the X-PAYMENT header and lowercased X-Payment-Mode from an
+    ASGI scope in a single pass over the raw header list.
+
+    Returns:
+        Tuple of (payment_header, payment_mode); payment_header is None and
+        payment_mode is "" when the header is absent. The first occurrence
+        of each header wins.
+    """
+    payment_header = None
+    payment_mode = None
+    for name, value in scope.get("headers", ()):
+        if name == X_PAYMENT_HEADER_B:
+            if payment_header is None:
+                payment_header = value.decode("latin-1")
+        elif name == X_PAYMENT_MODE_HEADER_B:
+            if payment_mode is None:
+                payment_mode = value.decode("latin-1").lower()
+        else:
+            continue
+        if payment_header is not None and payment_mode is not None:
+            break
+
+    return payment_header, payment_mode or ""
+
+
 def create_payment_requirements(
     request: Request,
     price_usd: float,
@@ -116,20 +197,20 @@ def create_payment_requirements(
         pay_to = "0x0000000000000000000000000000000000000000"
 
     # USDC has 6 decimals, so $1.00 = 1,000,000 smallest units
-    # Convert USD to USDC smallest units (string format for x402)
-    amount_usdc = int(price_usd * 1_000_000)
+    # Convert USD to USDC smallest units (string format for x402). Go
+    # through the float's shortest decimal form: multiplying the float
+    # directly turns e.g. 0.000249 into 248.99999999999997 -> 248 units
+    amount_usdc = int(Decimal(str(price_usd)) * 1_000_000)
 
-    # Get USDC address for the configured network
-    asset = USDC_ADDRESSES.get(network, USDC_ADDRESSES["base-sepolia"])
-
-    # Get USDC token metadata for EIP-712 domain separator
-    # This is required for clients to construct proper EIP-3009 signatures
-    token_metadata = USDC_TOKEN_METADATA.get(network, USDC_TOKEN_METADATA["base-sepolia"])
+    # Get USDC address and token metadata for the configured network.
+    # The metadata is required for clients to construct proper EIP-3009
+    # signatures (EIP-712 domain separator)
+    asset, token_metadata = _NETWORK_ASSETS.get(network, _NETWORK_ASSETS[_DEFAULT_NETWORK])
 
     # Build resource path
     resource = str(request.url)
 
-    return PaymentRequirements(
+    fields = dict(
         scheme="exact",
         network=network,
         max_amount_required=str(amount_usdc),
@@ -139,15 +220,97 @@ def create_payment_requirements(
         pay_to=pay_to,
         max_timeout_seconds=300,  # 5 minutes
         asset=asset,
-        extra=token_metadata
+        extra=dict(token_metadata)
     )
 
+    # Every field is built here with the right type, so for the networks
+    # we know skip Pydantic validation; anything else is validated so a
+    # misconfigured X402_NETWORK still fails loudly
+    if network in _NETWORK_ASSETS and isinstance(description, str):
+        return PaymentRequirements.model_construct(**fields)
+    return PaymentRequirements(**fields)
+
+
+class ORJSONResponse(JSONResponse):
+    """JSONResponse rendered with orjson (bytes out, no str round trip)."""
+
+    def render(self, content) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+
+
+@functools.lru_cache(maxsize=64)
+def _402_body_template(
+    error_message: str,
+    scheme: str,
+    network: str,
+    mime_type: str,
+    pay_to: str,
+    max_timeout_seconds: int,
+    asset: str,
+    extra: tuple,
+) -> Tuple[bytes, bytes]:
+    """
+    Pre-serialized head and tail of a 402 body around the per-request fields.
+
+    These parts only change with settings, so they are rendered once and
+    reused for every resource URL, price and description.
+    """
+    dumps = orjson.dumps
+    head = (
+        b'{"x402Version":' + dumps(X402_VERSION)
+        + b',"error":' + dumps(error_message)
+        + b',"accepts":[{"scheme":' + dumps(scheme)
+        + b',"network":' + dumps(network)
+        + b',"maxAmountRequired":'
+    )
+    tail = (
+        b',"mimeType":' + dumps(mime_type)
+        + b',"outputSchema":null,"payTo":' + dumps(pay_to)
+        + b',"maxTimeoutSeconds":' + dumps(max_timeout_seconds)
+        + b',"asset":' + dumps(asset)
+        + b',"extra":' + dumps(dict(extra) if extra else None)
+        + b"}]}"
+    )
+    return head, tail
+
+
+def _render_402_body(
+    error_message: str,
+    scheme: str,
+    network: str,
+    max_amount_required: str,
+    resource: str,
+    description: str,
+    mime_type: str,
+    pay_to: str,
+    max_timeout_seconds: int,
+    asset: str,
+    extra: tuple,
+) -> bytes:
+    """
+    Render a 402 body for a single payment requirement.
+
+    Splices the per-request fields into the cached template; field order
+    matches PaymentRequirements.model_dump(by_alias=True).
+    """
+    head, tail = _402_body_template(
+        error_message, scheme, network, mime_type,
+        pay_to, max_timeout_seconds, asset, extra,
+    )
+    dumps = orjson.dumps
+    return b"".join((
+        head, dumps(max_amount_required),
+        b',"resource":', dumps(resource),
+        b',"description":', dumps(description),
+        tail,
+    ))
+
 
 def create_402_response(
     payment_requirements: PaymentRequirements,
     error_message: str = "Payment required",
     free_tier_info: Optional[dict] = None
-) -> JSONResponse:
+) -> Response:
     """
     Create an HTTP 402 Payment Required response.
 
@@ -157,22 +320,43 @@ def create_402_response(
         free_tier_info: Optional free tier information to include
 
     Returns:
-        JSONResponse with 402 status and payment details
+        Response with 402 status and payment details
     """
-    response_body = {
-        "x402Version": X402_VERSION,
-        "error": error_message,
-        "accepts": [payment_requirements.model_dump(by_alias=True)]
-    }
-
     # Include free tier info if available
-    if free_tier_info and free_tier_info.get("available"):
-        response_body["freeTier"] = free_tier_info
-
-    return JSONResponse(
+    include_free_tier = bool(free_tier_info and free_tier_info.get("available"))
+
+    if include_free_tier or payment_requirements.output_schema is not None:
+        response_body = {
+            "x402Version": X402_VERSION,
+            "error": error_message,
+            "accepts": [payment_requirements.model_dump(by_alias=True)]
+        }
+        if include_free_tier:
+            response_body["freeTier"] = free_tier_info
+
+        return ORJSONResponse(
+            status_code=402,
+            content=response_body,
+            headers={"Content-Type": "application/json"}
+        )
+
+    body = _render_402_body(
+        error_message,
+        payment_requirements.scheme,
+        payment_requirements.network,
+        payment_requirements.max_amount_required,
+        payment_requirements.resource,
+        payment_requirements.description,
+        payment_requirements.mime_type,
+        payment_requirements.pay_to,
+        payment_requirements.max_timeout_seconds,
+        payment_requirements.asset,
+        tuple((payment_requirements.extra or {}).items()),
+    )
+    return Response(
+        content=body,
         status_code=402,
-        content=response_body,
-        headers={"Content-Type": "application/json"}
+        media_type="application/json",
     )
 
 
@@ -187,19 +371,16 @@ def decode_payment_header(header_value: str) -> Optional[PaymentPayload]:
         PaymentPayload if successfully decoded, None otherwise
     """
     try:
-        # Decode base64 - safe_base64_decode returns str, not bytes
-        decoded_str = safe_base64_decode(header_value)
-        if decoded_str is None:
-            logger.warning("Failed to decode X-PAYMENT header: invalid base64")
-            return None
-
-        # Parse JSON
-        payload_dict = json.loads(decoded_str)
+        # Decode base64 straight to bytes; orjson parses bytes directly
+        payload_dict = orjson.loads(pybase64.b64decode(header_value, validate=True))
 
         # Validate and create PaymentPayload
         return PaymentPayload.model_validate(payload_dict)
 
-    except json.JSONDecodeError as e:
+    except binascii.Error as e:
+        logger.warning(f"Failed to decode X-PAYMENT header: invalid base64: {e}")
+        return None
+    except orjson.JSONDecodeError as e:
         logger.warning(f"Failed to parse X-PAYMENT header JSON: {e}")
         return None
     except Exception as e:
@@ -218,11 +399,113 @@ def encode_payment_response(settle_response: SettleResponse) -> str:
         Base64-encoded JSON string
     """
     response_dict = settle_response.model_dump(by_alias=True)
-    response_json = json.dumps(response_dict)
-    return safe_base64_encode(response_json.encode("utf-8"))
+    return pybase64.b64encode_as_string(orjson.dumps(response_dict))
 
 
-class X402Middleware(BaseHTTPMiddleware):
+class PooledFacilitatorClient(FacilitatorClient):
+    """
+    FacilitatorClient that posts through the shared httpx.AsyncClient.
+
+    The SDK client opens a new AsyncClient (and TCP/TLS connection) for
+    every verify/settle call. This subclass reuses the pooled client from
+    app/services/http_client.py, falling back to the SDK behaviour when
+    the shared client has not been initialized (e.g. outside the app
+    lifespan).
+    """
+
+    async def _post(self, action: str, payment: PaymentPayload,
+                    payment_requirements: PaymentRequirements) -> dict:
+        headers = {"Content-Type": "application/json"}
+
+        if self.config.get("create_headers"):
+            custom_headers = await self.config["create_headers"]()
+            headers.update(custom_headers.get(action, {}))
+
+        response = await get_client().post(
+            f"{self.config['url']}/{action}",
+            json={
+                "x402Version": payment.x402_version,
+                "paymentPayload": payment.model_dump(by_alias=True),
+                "paymentRequirements": payment_requirements.model_dump(
+                    by_alias=True, exclude_none=True
+                ),
+            },
+            headers=headers,
+            follow_redirects=True,
+        )
+        return response.json()
+
+    async def verify(
+        self, payment: PaymentPayload, payment_requirements: PaymentRequirements
+    ) -> VerifyResponse:
+        try:
+            get_client()
+        except RuntimeError:
+            return await super().verify(payment, payment_requirements)
+        return VerifyResponse(**await self._post("verify", payment, payment_requirements))
+
+    async def settle(
+        self, payment: PaymentPayload, payment_requirements: PaymentRequirements
+    ) -> SettleResponse:
+        try:
+            get_client()
+        except RuntimeError:
+            return await super().settle(payment, payment_requirements)
+        return SettleResponse(**await self._post("settle", payment, payment_requirements))
+
+
+# Lazy-initialized facilitator client, shared by the dependency (verify)
+# and the middleware (settle); rebuilt if the facilitator URL changes
+_facilitator_client: Optional[FacilitatorClient] = None
+_facilitator_url: Optional[str] = None
+
+
+def get_facilitator_client() -> FacilitatorClient:
+    """Get or create the facilitator client singleton."""
+    global _facilitator_client, _facilitator_url
+    url = settings.X402_FACILITATOR_URL
+    if _facilitator_client is None or _facilitator_url != url:
+        config: FacilitatorConfig = {"url": url}
+        _facilitator_client = PooledFacilitatorClient(config=config)
+        _facilitator_url = url
+    return _facilitator_client
+
+
+def reset_facilitator_client() -> None:
+    """Drop the facilitator client singleton (useful for testing)."""
+    global _facilitator_client, _facilitator_url
+    _facilitator_client = None
+    _facilitator_url = None
+
+
+# Raw (name, value) headers for free-tier responses. Values below 1024
+# (limits, remaining counts, window lengths) come from a prebuilt table
+# instead of str() + encode() per response; the same values as
+# app.x402.ratelimit.get_rate_limit_headers
+_RATE_LIMIT_LIMIT_B = b"x-ratelimit-limit"
+_RATE_LIMIT_REMAINING_B = b"x-ratelimit-remaining"
+_RATE_LIMIT_RESET_B = b"x-ratelimit-reset"
+_PAYMENT_MODE_FREE_TIER = (X_PAYMENT_MODE_HEADER_B, b"free-tier")
+_SMALL_INTS = tuple(str(i).encode("ascii") for i in range(1024))
+
+
+def _int_bytes(value) -> bytes:
+    if type(value) is int and 0 <= value < 1024:
+        return _SMALL_INTS[value]
+    return str(value).encode("latin-1")
+
+
+def _free_tier_headers(stats: dict) -> list:
+    """Rate limit and payment-mode headers for a free-tier response."""
+    return [
+        (_RATE_LIMIT_LIMIT_B, _int_bytes(stats.get("limit", 0))),
+        (_RATE_LIMIT_REMAINING_B, _int_bytes(stats.get("remaining", 0))),
+        (_RATE_LIMIT_RESET_B, _int_bytes(stats.get("window_seconds", 60))),
+        _PAYMENT_MODE_FREE_TIER,
+    ]
+
+
+class X402Middleware:
     """
     x402 post-response middleware for FastAPI.
 
@@ -238,111 +521,130 @@ class X402Middleware(BaseHTTPMiddleware):
     - request.state.x402_requirements: PaymentRequirements (paid mode)
     - request.state.x402_rate_limit_stats: dict (free-tier mode)
 
+    Implemented as plain ASGI middleware: headers are added to the
+    http.response.start message on its way out, and the body streams
+    through untouched, so no Request/Response objects are built here.
+
     When X402_ENABLED=false, all requests pass through unchanged.
     """
 
-    def __init__(self, app, facilitator_client: Optional[FacilitatorClient] = None):
-        super().__init__(app)
+    def __init__(self, app: ASGIApp, facilitator_client: Optional[FacilitatorClient] = None):
+        self.app = app
         self._facilitator_client = facilitator_client
 
     @property
     def facilitator_client(self) -> FacilitatorClient:
-        """Lazy initialization of facilitator client."""
+        """Injected facilitator client, or the shared singleton."""
         if self._facilitator_client is None:
-            config: FacilitatorConfig = {"url": settings.X402_FACILITATOR_URL}
-            self._facilitator_client = FacilitatorClient(config=config)
+            return get_facilitator_client()
         return self._facilitator_client
 
-    async def dispatch(
-        self,
-        request: Request,
-        call_next: Callable[[Request], Response]
-    ) -> Response:
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
         """
         Post-response processing for x402 payments.
 
         Flow:
         1. Pass request through to FastAPI (validation + dependency + endpoint)
-        2. Check request.state for x402 mode set by the dependency
+        2. When the response starts, check request.state for the x402 mode
+           set by the dependency
         3. For free-tier: add rate limit headers
         4. For paid: settle payment and add X-PAYMENT-RESPONSE header
         """
-        # Skip if x402 is disabled
+        # Disabled: a single settings read, then straight to the app
         if not settings.X402_ENABLED:
-            return await call_next(request)
+            await self.app(scope, receive, send)
+            return
+
+        # Skip non-HTTP scopes and paths the dependency never runs for
+        if scope["type"] != "http" or not is_protected_endpoint(scope["method"], scope["path"]):
+            await self.app(scope, receive, send)
+            return
+
+        # request.state reads and writes this dict, also after routing
+        # copies the scope
+        state = scope.setdefault("state", {})
+        replaced = False
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal replaced
+
+            if replaced:
+                # Settlement failed and an error response was sent instead;
+                # drop the endpoint's own body
+                return
+
+            if message["type"] == "http.response.start":
+                # Check what the dependency decided
+                x402_mode = state.get("x402_mode")
+
+                if x402_mode == "free-tier":
+                    # Add rate limit headers for free-tier responses
+                    stats = state.get("x402_rate_limit_stats", {})
+                    raw_headers = message.get("headers", [])
+                    if not isinstance(raw_headers, list):
+                        raw_headers = list(raw_headers)
+                    raw_headers.extend(_free_tier_headers(stats))
+                    message["headers"] = raw_headers
+
+                elif x402_mode == "paid" and 200 <= message["status"] < 300:
+                    # Settle payment and add response headers
+                    settle_headers = await self._settle(state)
+                    if settle_headers is None:
+                        replaced = True
+                        await _settlement_failed_response()(scope, receive, send)
+                        return
+                    headers = MutableHeaders(scope=message)
+                    for header, value in settle_headers.items():
+                        headers[header] = value
+
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
+
+    async def _settle(self, state: dict) -> Optional[dict]:
+        """
+        Settle the verified payment stored by the dependency.
 
-        # Let the request through — the dependency handles pre-request checks
-        response = await call_next(request)
+        Returns:
+            Headers to add to the response ({} when there is nothing to
+            settle), or None if settlement failed.
+        """
+        payment_payload = state.get("x402_payment")
+        payment_requirements = state.get("x402_requirements")
 
-        # Check what the dependency decided
-        x402_mode = getattr(request.state, 'x402_mode', None)
+        if not (payment_payload and payment_requirements):
+            return {}
 
-        if x402_mode == "free-tier":
-            # Add rate limit headers for free-tier responses
-            stats = getattr(request.state, 'x402_rate_limit_stats', {})
+        try:
+            logger.debug(f"x402: Calling facilitator settle at {settings.X402_FACILITATOR_URL}")
+            settle_response = await self.facilitator_client.settle(
+                payment=payment_payload,
+                payment_requirements=payment_requirements
+            )
 
-            body = b""
-            async for chunk in response.body_iterator:
-                body += chunk
+            tx_hash = getattr(settle_response, 'transaction_hash', 'unknown')
+            logger.info(f"x402: Payment settled successfully, tx_hash={tx_hash}")
 
-            new_response = Response(
-                content=body,
-                status_code=response.status_code,
-                headers=dict(response.headers),
-                media_type=response.media_type
-            )
-            for header, value in get_rate_limit_headers(stats).items():
-                new_response.headers[header] = value
-            new_response.headers["X-Payment-Mode"] = "free-tier"
-
-            return new_response
-
-        if x402_mode == "paid" and 200 <= response.status_code < 300:
-            # Settle payment and add response headers
-            payment_payload = getattr(request.state, 'x402_payment', None)
-            payment_requirements = getattr(request.state, 'x402_requirements', None)
-
-            if payment_payload and payment_requirements:
-                try:
-                    logger.debug(f"x402: Calling facilitator settle at {settings.X402_FACILITATOR_URL}")
-                    settle_response = await self.facilitator_client.settle(
-                        payment=payment_payload,
-                        payment_requirements=payment_requirements
-                    )
-
-                    tx_hash = getattr(settle_response, 'transaction_hash', 'unknown')
-                    logger.info(f"x402: Payment settled successfully, tx_hash={tx_hash}")
-
-                    # Add settlement response header
-                    encoded_response = encode_payment_response(settle_response)
-
-                    body = b""
-                    async for chunk in response.body_iterator:
-                        body += chunk
-
-                    new_response = Response(
-                        content=body,
-                        status_code=response.status_code,
-                        headers=dict(response.headers),
-                        media_type=response.media_type
-                    )
-                    new_response.headers[X_PAYMENT_RESPONSE_HEADER] = encoded_response
-                    new_response.headers["X-Payment-Mode"] = "paid"
-                    new_response.headers["X-Payment-Transaction"] = tx_hash
-
-                    return new_response
-
-                except Exception as e:
-                    logger.error(f"x402: Payment settlement failed: {type(e).__name__}: {e}", exc_info=True)
-                    return JSONResponse(
-                        status_code=500,
-                        content={
-                            "error": "Payment settlement failed",
-                            "detail": "Your request was processed but payment settlement failed. Please retry.",
-                            "x402_status": "settlement_failed",
-                            "message": "Please retry with a new payment or use X-Payment-Mode: free for free tier access"
-                        },
-                        headers={"X-Payment-Mode": "failed"}
-                    )
-
-        return response
+            return {
+                X_PAYMENT_RESPONSE_HEADER: encode_payment_response(settle_response),
+                "X-Payment-Mode": "paid",
+                "X-Payment-Transaction": tx_hash,
+            }
+
+        except Exception as e:
+            logger.error(f"x402: Payment settlement failed: {type(e).__name__}: {e}", exc_info=True)
+            return None
+
+
+def _settlement_failed_response() -> ORJSONResponse:
+    """500 response sent in place of a paid response whose settlement failed."""
+    return ORJSONResponse(
+        status_code=500,
+        content={
+            "error": "Payment settlement failed",
+            "detail": "Your request was processed but payment settlement failed. Please retry.",
+            "x402_status": "settlement_failed",
+            "message": "Please retry with a new payment or use X-Payment-Mode: free for free tier access"
+        },
+        headers={"X-Payment-Mode": "failed"}
+    )
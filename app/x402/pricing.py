@@ -13,8 +13,10 @@ Configuration is loaded from app/core/config.py:
 - X402_MARKUP_PERCENT: Markup percentage to apply
 - X402_MIN_PRICE_USD: Minimum price floor
 """
+import functools
 import logging
-from typing import Dict, Any, Optional
+import time
+from typing import Dict, Any, Optional, Tuple
 
 from app.core.config import settings
 from app.services.swarm_api import (
@@ -28,6 +30,19 @@ logger = logging.getLogger(__name__)
 # Conversion constants
 PLUR_PER_BZZ = 10 ** 16  # 1 BZZ = 10^16 PLUR
 
+# Single staleness bound for prices: the chainstate price is reused for
+# CACHE_TTL_SECONDS after it is fetched, and a cached quote expires together
+# with the chainstate price it was computed from, so no quote is based on a
+# price older than CACHE_TTL_SECONDS.
+CACHE_TTL_SECONDS = 60
+CACHE_MAX_ENTRIES = 512
+
+# Cache for stamp price calculations, stamped with the chainstate fetch time
+_price_cache: Dict[Tuple, Tuple[float, Tuple, Optional[Tuple]]] = {}
+
+# Current chainstate price (fetch time, price) shared by all calculations
+_chainstate_price: Optional[Tuple[float, int]] = None
+
 
 def plur_to_bzz(plur: int) -> float:
     """Convert PLUR to BZZ."""
@@ -79,6 +94,128 @@ def apply_minimum_price(price: float, minimum: Optional[float] = None) -> float:
     return max(price, min_price)
 
 
+def _get_cached_price(key: Tuple) -> Optional[Dict[str, Any]]:
+    """
+    Get cached stamp price if still valid.
+
+    Returns:
+        New price dict built from the cached items, or None if cache expired/empty
+    """
+    entry = _price_cache.get(key)
+    if entry is None:
+        return None
+
+    timestamp, items, breakdown_items = entry
+    if time.time() - timestamp > CACHE_TTL_SECONDS:
+        del _price_cache[key]
+        return None
+
+    result = dict(items)
+    if breakdown_items is not None:
+        result["breakdown"] = dict(breakdown_items)
+    return result
+
+
+def _update_cache(key: Tuple, result: Dict[str, Any], fetched_at: float) -> None:
+    """
+    Update the price cache, dropping the oldest entry when full.
+
+    The entry is stamped with fetched_at, the time the chainstate price
+    behind the quote was fetched, so it never outlives that price.
+
+    The price dict is stored as immutable (key, value) tuples; its values
+    and the breakdown's are scalars, so callers get an independent dict.
+    """
+    if key not in _price_cache and len(_price_cache) >= CACHE_MAX_ENTRIES:
+        del _price_cache[next(iter(_price_cache))]
+    breakdown = result.get("breakdown")
+    _price_cache[key] = (
+        fetched_at,
+        tuple(item for item in result.items() if item[0] != "breakdown"),
+        tuple(breakdown.items()) if breakdown is not None else None,
+    )
+
+
+def clear_price_cache() -> None:
+    """Clear the price cache (useful for testing)."""
+    global _chainstate_price
+    _price_cache.clear()
+    _chainstate_price = None
+    _stamp_price_core.cache_clear()
+
+
+async def _get_current_price() -> Tuple[float, int]:
+    """
+    Get the current price per chunk per block from chainstate.
+
+    The value is reused for CACHE_TTL_SECONDS so calculations for
+    several durations or depths in a row make a single Bee query.
+
+    Returns:
+        Tuple of (fetch time, current price in PLUR)
+
+    Raises:
+        ValueError: If chainstate reports a non-positive price
+    """
+    global _chainstate_price
+    if _chainstate_price is not None:
+        fetched_at, _ = _chainstate_price
+        if time.time() - fetched_at <= CACHE_TTL_SECONDS:
+            return _chainstate_price
+
+    chainstate = await get_chainstate()
+    current_price = int(chainstate.get("currentPrice", 0))
+
+    if current_price <= 0:
+        raise ValueError("Invalid current price from chainstate")
+
+    _chainstate_price = (time.time(), current_price)
+    return _chainstate_price
+
+
+@functools.lru_cache(maxsize=256)
+def _stamp_price_core(
+    duration_hours: int,
+    depth: int,
+    current_price: int,
+    exchange_rate: float,
+    markup_percent: float,
+    min_price: float,
+) -> Tuple[int, int, float, float, float, float]:
+    """
+    Pure stamp price arithmetic, memoized on all of its inputs.
+
+    The chainstate price is part of the key, so this cache adds no
+    staleness beyond CACHE_TTL_SECONDS.
+
+    Returns:
+        Tuple of (amount_plur, total_cost_plur, cost_bzz, cost_usd,
+        price_with_markup, final_price)
+    """
+    # Calculate amount needed for duration (PLUR per chunk)
+    amount_plur = calculate_stamp_amount(duration_hours, current_price)
+
+    # Calculate total cost in PLUR (amount * 2^depth)
+    total_cost_plur = calculate_stamp_total_cost(amount_plur, depth)
+
+    # Convert to BZZ
+    cost_bzz = plur_to_bzz(total_cost_plur)
+
+    # Convert to USD
+    cost_usd = bzz_to_usd(cost_bzz, exchange_rate)
+
+    # Apply markup
+    price_with_markup = apply_markup(cost_usd, markup_percent)
+
+    # Apply minimum price
+    final_price = apply_minimum_price(price_with_markup, min_price)
+
+    return (
+        amount_plur, total_cost_plur, cost_bzz,
+        cost_usd, price_with_markup, final_price,
+    )
+
+
 async def calculate_stamp_price_usd(
     duration_hours: int,
     depth: int = 17,
@@ -109,36 +246,35 @@ async def calculate_stamp_price_usd(
         - minimum_applied: bool - whether minimum price was applied
         - breakdown: dict - detailed cost breakdown (if include_breakdown=True)
 
+    Results are cached per (duration, depth) and pricing configuration
+    until the chainstate price they were computed from is CACHE_TTL_SECONDS
+    old, so repeated quotes skip the chainstate query.
+
     Raises:
         Exception: If unable to fetch chainstate from Bee node
     """
-    # Get current price from chainstate
-    chainstate = await get_chainstate()
-    current_price = int(chainstate.get("currentPrice", 0))
-
-    if current_price <= 0:
-        raise ValueError("Invalid current price from chainstate")
-
-    # Calculate amount needed for duration (PLUR per chunk)
-    amount_plur = calculate_stamp_amount(duration_hours, current_price)
-
-    # Calculate total cost in PLUR (amount * 2^depth)
-    total_cost_plur = calculate_stamp_total_cost(amount_plur, depth)
-
-    # Convert to BZZ
-    cost_bzz = plur_to_bzz(total_cost_plur)
-
-    # Convert to USD
     exchange_rate = settings.X402_BZZ_USD_RATE
-    cost_usd = bzz_to_usd(cost_bzz, exchange_rate)
-
-    # Apply markup
     markup_percent = settings.X402_MARKUP_PERCENT
-    price_with_markup = apply_markup(cost_usd, markup_percent)
-
-    # Apply minimum price
     min_price = settings.X402_MIN_PRICE_USD
-    final_price = apply_minimum_price(price_with_markup, min_price)
+
+    cache_key = (
+        duration_hours, depth, include_breakdown,
+        exchange_rate, markup_percent, min_price,
+    )
+    cached = _get_cached_price(cache_key)
+    if cached is not None:
+        return cached
+
+    # Get current price from chainstate
+    fetched_at, current_price = await _get_current_price()
+
+    (
+        amount_plur, total_cost_plur, cost_bzz,
+        cost_usd, price_with_markup, final_price,
+    ) = _stamp_price_core(
+        duration_hours, depth, current_price,
+        exchange_rate, markup_percent, min_price,
+    )
     minimum_applied = price_with_markup < min_price
 
     result = {
@@ -169,6 +305,7 @@ async def calculate_stamp_price_usd(
         f"(rate={exchange_rate}, markup={markup_percent}%)"
     )
 
+    _update_cache(cache_key, result, fetched_at)
     return result
 
 
@@ -3,7 +3,7 @@
 Rate limiting for x402 payment gateway.
 
 This module provides IP-based rate limiting to prevent abuse of the gateway.
-Uses a sliding window algorithm with in-memory storage.
+Uses an approximate sliding window algorithm with in-memory storage.
 
 Configuration:
 - X402_RATE_LIMIT_PER_IP: Maximum requests per minute per IP (default: 10)
@@ -11,37 +11,86 @@ Configuration:
 Rate limiting is applied BEFORE access control checks and payment verification.
 This protects the gateway from DoS attacks even when x402 is disabled.
 """
+import functools
 import logging
 import threading
 import time
-from collections import defaultdict
-from dataclasses import dataclass, field
-from typing import Dict, List, Optional, Tuple
+from collections import OrderedDict
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Dict, List, Mapping, Optional, Tuple
 
 from app.core.config import settings
 
 logger = logging.getLogger(__name__)
 
+NS_PER_SECOND = 1_000_000_000
 
-@dataclass
+# Number of lock-protected shards the per-IP windows are split across
+# (power of two so the shard index is a mask)
+RATE_LIMIT_SHARDS = 16
+
+# Default cap on tracked IPs; least recently seen IPs are evicted beyond it
+RATE_LIMIT_MAX_CLIENTS = 16384
+
+
+@dataclass(slots=True)
 class RateLimitWindow:
-    """Stores request timestamps for a single IP within the sliding window."""
-    requests: List[float] = field(default_factory=list)
-    lock: threading.Lock = field(default_factory=threading.Lock)
+    """
+    Approximate sliding window counters for a single IP.
+
+    Keeps request counts for the current fixed window and the one before
+    it. Requests in the sliding window are estimated by weighting the
+    previous count by how much of that window the sliding window still
+    covers, assuming its requests were evenly spread. This takes O(1)
+    time and memory per IP regardless of the request rate.
+    """
+    window_start: int
+    previous: int = 0
+    current: int = 0
+
+    def roll(self, now: int, window_ns: int) -> None:
+        """Advance to the fixed window containing now. Caller holds the shard lock."""
+        elapsed = now - self.window_start
+        if elapsed < window_ns:
+            return
+        if elapsed < 2 * window_ns:
+            self.previous = self.current
+            self.window_start += window_ns
+        else:
+            self.previous = 0
+            self.window_start = now
+        self.current = 0
+
+    def estimate(self, now: int, window_ns: int) -> float:
+        """Estimate requests in the sliding window ending at now, without modifying counters."""
+        elapsed = now - self.window_start
+        if elapsed >= 2 * window_ns:
+            return 0.0
+        if elapsed >= window_ns:
+            return self.current * (2 - elapsed / window_ns)
+        return self.previous * (1 - elapsed / window_ns) + self.current
 
 
 class RateLimiter:
     """
     In-memory sliding window rate limiter.
 
-    Uses a sliding window of 60 seconds to track requests per IP.
-    Thread-safe for concurrent access.
+    Uses a sliding window of 60 seconds to track requests per IP,
+    approximated from two fixed-window counters (see RateLimitWindow).
+    Thread-safe for concurrent access: windows are split across
+    RATE_LIMIT_SHARDS dicts with one lock each, so requests from IPs in
+    different shards never wait on each other.
+
+    Memory is bounded by max_clients: each shard holds at most its share
+    and evicts its least recently seen IP when a new one arrives.
     """
 
     def __init__(
         self,
         requests_per_minute: Optional[int] = None,
-        window_seconds: int = 60
+        window_seconds: int = 60,
+        max_clients: int = RATE_LIMIT_MAX_CLIENTS,
     ):
         """
         Initialize the rate limiter.
@@ -49,12 +98,17 @@ class RateLimiter:
         Args:
             requests_per_minute: Max requests allowed per window. If None, uses config.
             window_seconds: Size of the sliding window in seconds.
+            max_clients: Max IPs tracked at once across all shards.
         """
         self._requests_per_minute = requests_per_minute
         self._window_seconds = window_seconds
-        self._windows: Dict[str, RateLimitWindow] = defaultdict(RateLimitWindow)
+        self._window_ns = window_seconds * NS_PER_SECOND
+        self._shard_capacity = max(1, max_clients // RATE_LIMIT_SHARDS)
+        self._shards: List[Tuple[threading.Lock, "OrderedDict[str, RateLimitWindow]"]] = [
+            (threading.Lock(), OrderedDict()) for _ in range(RATE_LIMIT_SHARDS)
+        ]
         self._cleanup_lock = threading.Lock()
-        self._last_cleanup = time.time()
+        self._last_cleanup = time.monotonic_ns()
 
     @property
     def requests_per_minute(self) -> int:
@@ -68,6 +122,10 @@ class RateLimiter:
         """Get the window size in seconds."""
         return self._window_seconds
 
+    def _shard(self, client_ip: str) -> Tuple[threading.Lock, "OrderedDict[str, RateLimitWindow]"]:
+        """Get the lock and window dict for the shard holding client_ip."""
+        return self._shards[hash(client_ip) & (RATE_LIMIT_SHARDS - 1)]
+
     def is_rate_limited(self, client_ip: str) -> Tuple[bool, int, int]:
         """
         Check if a client IP is rate limited.
@@ -85,22 +143,26 @@ class RateLimiter:
             # Don't rate limit unknown IPs (they'll fail other checks)
             return (False, 0, self.requests_per_minute)
 
-        now = time.time()
-        window_start = now - self._window_seconds
+        now = time.monotonic_ns()
 
         # Periodically cleanup old entries
         self._maybe_cleanup(now)
 
-        window = self._windows[client_ip]
+        lock, windows = self._shard(client_ip)
+
+        with lock:
+            window = windows.get(client_ip)
+            if window is None:
+                if len(windows) >= self._shard_capacity:
+                    windows.popitem(last=False)
+                window = windows[client_ip] = RateLimitWindow(window_start=now)
+            else:
+                windows.move_to_end(client_ip)
 
-        with window.lock:
-            # Remove old requests outside the window
-            window.requests = [
-                ts for ts in window.requests
-                if ts > window_start
-            ]
+            # Move to the current fixed window before counting
+            window.roll(now, self._window_ns)
 
-            requests_in_window = len(window.requests)
+            requests_in_window = int(window.estimate(now, self._window_ns))
             limit = self.requests_per_minute
 
             if requests_in_window >= limit:
@@ -111,7 +173,7 @@ class RateLimiter:
                 return (True, requests_in_window, limit)
 
             # Record this request
-            window.requests.append(now)
+            window.current += 1
 
             return (False, requests_in_window + 1, limit)
 
@@ -125,26 +187,16 @@ class RateLimiter:
         Returns:
             Dict with current request count, limit, and window info
         """
-        now = time.time()
-        window_start = now - self._window_seconds
-
-        if client_ip not in self._windows:
-            return {
-                "client_ip": client_ip,
-                "requests_in_window": 0,
-                "limit": self.requests_per_minute,
-                "window_seconds": self._window_seconds,
-                "remaining": self.requests_per_minute,
-            }
-
-        window = self._windows[client_ip]
-
-        with window.lock:
-            # Count requests in window without modifying
-            requests_in_window = len([
-                ts for ts in window.requests
-                if ts > window_start
-            ])
+        now = time.monotonic_ns()
+        lock, windows = self._shard(client_ip)
+
+        with lock:
+            window = windows.get(client_ip)
+            # Estimate requests in window without modifying
+            if window is None:
+                requests_in_window = 0
+            else:
+                requests_in_window = int(window.estimate(now, self._window_ns))
 
         return {
             "client_ip": client_ip,
@@ -161,24 +213,26 @@ class RateLimiter:
         Args:
             client_ip: The client's IP address to reset
         """
-        if client_ip in self._windows:
-            window = self._windows[client_ip]
-            with window.lock:
-                window.requests.clear()
+        lock, windows = self._shard(client_ip)
+        with lock:
+            removed = windows.pop(client_ip, None)
+        if removed is not None:
             logger.debug(f"Reset rate limit for {client_ip}")
 
     def reset_all(self) -> None:
         """Reset all rate limit tracking."""
-        self._windows.clear()
+        for lock, windows in self._shards:
+            with lock:
+                windows.clear()
         logger.info("Reset all rate limits")
 
-    def _maybe_cleanup(self, now: float) -> None:
+    def _maybe_cleanup(self, now: int) -> None:
         """
         Periodically clean up stale entries to prevent memory growth.
 
         Runs cleanup every 5 minutes.
         """
-        cleanup_interval = 300  # 5 minutes
+        cleanup_interval = 300 * NS_PER_SECOND  # 5 minutes
 
         if now - self._last_cleanup < cleanup_interval:
             return
@@ -189,26 +243,21 @@ class RateLimiter:
                 return
 
             self._last_cleanup = now
-            window_start = now - self._window_seconds
-            stale_ips = []
-
-            for ip, window in self._windows.items():
-                with window.lock:
-                    # Remove old requests
-                    window.requests = [
-                        ts for ts in window.requests
-                        if ts > window_start
+            removed = 0
+
+            for lock, windows in self._shards:
+                with lock:
+                    # Remove windows with nothing left in the sliding window
+                    stale_ips = [
+                        ip for ip, window in windows.items()
+                        if window.estimate(now, self._window_ns) == 0
                     ]
-                    # Mark for removal if empty
-                    if not window.requests:
-                        stale_ips.append(ip)
-
-            # Remove empty windows
-            for ip in stale_ips:
-                del self._windows[ip]
+                    for ip in stale_ips:
+                        del windows[ip]
+                removed += len(stale_ips)
 
-            if stale_ips:
-                logger.debug(f"Cleaned up {len(stale_ips)} stale rate limit entries")
+            if removed:
+                logger.debug(f"Cleaned up {removed} stale rate limit entries")
 
 
 # Global rate limiter instance
@@ -282,7 +331,17 @@ def check_rate_limit(client_ip: str, is_free_tier: bool = False) -> Tuple[bool,
     return (True, None, stats)
 
 
-def get_rate_limit_headers(stats: Dict[str, any]) -> Dict[str, str]:
+@functools.lru_cache(maxsize=4096)
+def _rate_limit_headers(limit: int, remaining: int, window_seconds: int) -> Mapping[str, str]:
+    """Read-only rate limit headers, shared by responses with the same values."""
+    return MappingProxyType({
+        "X-RateLimit-Limit": str(limit),
+        "X-RateLimit-Remaining": str(remaining),
+        "X-RateLimit-Reset": str(window_seconds),
+    })
+
+
+def get_rate_limit_headers(stats: Dict[str, any]) -> Mapping[str, str]:
     """
     Generate rate limit headers for HTTP responses.
 
@@ -290,13 +349,13 @@ def get_rate_limit_headers(stats: Dict[str, any]) -> Dict[str, str]:
         stats: Rate limit statistics from check_rate_limit
 
     Returns:
-        Dict of HTTP headers to add to the response
+        Read-only mapping of HTTP headers to add to the response
     """
-    return {
-        "X-RateLimit-Limit": str(stats.get("limit", 0)),
-        "X-RateLimit-Remaining": str(stats.get("remaining", 0)),
-        "X-RateLimit-Reset": str(stats.get("window_seconds", 60)),
-    }
+    return _rate_limit_headers(
+        stats.get("limit", 0),
+        stats.get("remaining", 0),
+        stats.get("window_seconds", 60),
+    )
 
 
 def reset_rate_limiter() -> None:
@@ -5,8 +5,35 @@ Sets environment variables before any app modules are imported,
 ensuring test-friendly defaults (e.g., rate limiting disabled).
 """
 import os
+import tempfile
+
+import pytest
 
 # Disable global rate limiting during tests to prevent 429 responses
 # from interfering with test assertions. Rate limiter unit tests
 # test the component directly without relying on middleware.
 os.environ["RATE_LIMIT_ENABLED"] = "false"
+
+# RAM-backed filesystem used for temporary files when available
+TMPFS_DIR = "/dev/shm"
+
+
+@pytest.fixture(scope="session", autouse=True)
+def tmpfs_tempdir():
+    """
+    Put tempfile's temporary files on tmpfs for the whole session.
+
+    Tests that write scratch files (audit logs, state files) then avoid
+    disk I/O. Falls back to the default temp dir when /dev/shm is missing
+    or not writable (e.g. macOS).
+    """
+    if not (os.path.isdir(TMPFS_DIR) and os.access(TMPFS_DIR, os.W_OK)):
+        yield None
+        return
+
+    previous = tempfile.tempdir
+    tempfile.tempdir = TMPFS_DIR
+    try:
+        yield TMPFS_DIR
+    finally:
+        tempfile.tempdir = previous
@@ -36,8 +36,9 @@ class TestFileUploadBasics:
         )
 
         assert response.status_code == 200
-        assert response.json()["reference"] == "test_reference_123"
-        assert "test.json" in response.json()["message"]
+        data = response.json()
+        assert data["reference"] == "test_reference_123"
+        assert "test.json" in data["message"]
         mock_upload.assert_called_once()
 
     @patch('app.api.endpoints.data.upload_data_to_swarm')
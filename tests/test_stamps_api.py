@@ -335,8 +335,9 @@ class TestStampsAPI:
         response = client.post("/api/v1/stamps/", json=purchase_data)
 
         assert response.status_code == 400
-        assert "insufficient funds" in response.json()["detail"].lower()
-        assert "99.5" in response.json()["detail"]  # shortfall amount
+        detail = response.json()["detail"]
+        assert "insufficient funds" in detail.lower()
+        assert "99.5" in detail  # shortfall amount
         # Verify purchase was never called
         mock_purchase.assert_not_called()
 
@@ -8,6 +8,10 @@ from unittest.mock import patch
 from fastapi.testclient import TestClient
 
 from app.main import app
+from app.api.models.stamp import STAMP_ID_RE
+
+# Keep the shared TestClient on a single xdist worker (--dist loadgroup)
+pytestmark = pytest.mark.xdist_group("validation_http")
 
 # Reusable mock return values
 MOCK_FUNDS_OK = {"sufficient": True, "required_bzz": 0.01, "wallet_balance_bzz": 100.0, "shortfall_bzz": 0}
@@ -18,43 +22,42 @@ client = TestClient(app)
 # Valid 64-char hex stamp ID for path parameter validation
 VALID_STAMP_ID = "a" * 64
 
+# Raw request bodies, encoded once so the client sends them as-is
+VALID_PURCHASE_BODY = b'{"amount": 8000000000, "depth": 17}'
+MALFORMED_JSON_BODIES = [s.encode() for s in [
+    '{"amount": 8000000000, "depth": 17,}',      # Trailing comma
+    '{"amount": 8000000000 "depth": 17}',        # Missing comma
+    '{amount: 8000000000, depth: 17}',           # Unquoted keys
+    '{"amount": 8000000000, "depth":}',          # Missing value
+    '{"amount": 8000000000, "depth": 17',        # Unclosed brace
+]]
+MALFORMED_JSON_IDS = ["trailing-comma", "missing-comma", "unquoted-keys", "missing-value", "unclosed-brace"]
+
 
 class TestAmountValidation:
     """Tests for amount field validation in stamp operations."""
 
+    @pytest.mark.parametrize("amount", ["abc", [], {}], ids=["string", "list", "dict"])
     @patch('app.services.swarm_api.purchase_postage_stamp', return_value="mock_batch")
     @patch('app.services.swarm_api.check_sufficient_funds', return_value=MOCK_FUNDS_OK)
     @patch('app.services.swarm_api.extend_postage_stamp', return_value="mock_batch")
     @patch('app.services.swarm_api.get_all_stamps_processed', return_value=[{"batchID": "test_id", "depth": 17, "local": True}])
-    def test_amount_non_numeric_types_rejected(self, mock_stamps, mock_extend, mock_funds, mock_purchase):
-        """Test that non-numeric amount types are rejected.
+    def test_amount_non_numeric_types_rejected(self, mock_stamps, mock_extend, mock_funds, mock_purchase, amount):
+        """Test that non-numeric amount types are rejected."""
+        purchase_data = {"amount": amount, "depth": 17}
+        response = client.post("/api/v1/stamps/", json=purchase_data)
+        assert response.status_code == 422
 
-        Note: Zero, negative, and float amounts are accepted by the API
-        (no Pydantic gt=0 constraint), but non-numeric types are rejected.
-        """
-        invalid_amounts = [
-            "abc",       # String
-            [],          # List
-            {},          # Dict
-        ]
-
-        for amount in invalid_amounts:
-            purchase_data = {"amount": amount, "depth": 17}
-            response = client.post("/api/v1/stamps/", json=purchase_data)
-            assert response.status_code == 422, f"Should reject amount: {amount}"
-
-    def test_amount_zero_and_negative_rejected(self):
+    @pytest.mark.parametrize("amount", [0, -1, -1000000000], ids=["zero", "neg1", "neg1e9"])
+    def test_amount_zero_and_negative_rejected(self, amount):
         """Test that zero and negative amounts are rejected (gt=0 constraint)."""
-        rejected_amounts = [0, -1, -1000000000]
-
-        for amount in rejected_amounts:
-            purchase_data = {"amount": amount, "depth": 17}
-            response = client.post("/api/v1/stamps/", json=purchase_data)
-            assert response.status_code == 422, f"Amount {amount} should be rejected"
+        purchase_data = {"amount": amount, "depth": 17}
+        response = client.post("/api/v1/stamps/", json=purchase_data)
+        assert response.status_code == 422
 
-            extend_data = {"amount": amount}
-            response = client.patch(f"/api/v1/stamps/{VALID_STAMP_ID}/extend", json=extend_data)
-            assert response.status_code == 422, f"Extend amount {amount} should be rejected"
+        extend_data = {"amount": amount}
+        response = client.patch(f"/api/v1/stamps/{VALID_STAMP_ID}/extend", json=extend_data)
+        assert response.status_code == 422
 
     @patch('app.services.swarm_api.purchase_postage_stamp', return_value="mock_batch")
     @patch('app.services.swarm_api.check_sufficient_funds', return_value=MOCK_FUNDS_OK)
@@ -82,49 +85,40 @@ class TestAmountValidation:
 class TestDepthValidation:
     """Tests for depth field validation."""
 
+    # Boundary values that should be valid
+    @pytest.mark.parametrize("depth", [16, 17, 18, 20, 24, 32])
     @patch('app.services.swarm_api.purchase_postage_stamp', return_value="mock_batch")
     @patch('app.services.swarm_api.check_sufficient_funds', return_value=MOCK_FUNDS_OK)
-    def test_depth_valid_range(self, mock_funds, mock_purchase):
+    def test_depth_valid_range(self, mock_funds, mock_purchase, depth):
         """Test that depth values are within valid range."""
-        # Test boundary values that should be valid
-        valid_depths = [16, 17, 18, 20, 24, 32]
-
-        for depth in valid_depths:
-            purchase_data = {"amount": 8000000000, "depth": depth}
-            response = client.post("/api/v1/stamps/", json=purchase_data)
-            # Should pass validation
-            assert response.status_code == 201, f"Valid depth {depth} should pass validation"
+        purchase_data = {"amount": 8000000000, "depth": depth}
+        response = client.post("/api/v1/stamps/", json=purchase_data)
+        assert response.status_code == 201
 
-    def test_depth_invalid_range(self):
+    @pytest.mark.parametrize("depth", [
+        0, 1, 5, 10, 15,    # Too low
+        33, 40, 50, 100     # Too high
+    ])
+    def test_depth_invalid_range(self, depth):
         """Test that invalid depth values are rejected."""
-        invalid_depths = [
-            0, 1, 5, 10, 15,    # Too low
-            33, 40, 50, 100     # Too high
-        ]
+        purchase_data = {"amount": 8000000000, "depth": depth}
+        response = client.post("/api/v1/stamps/", json=purchase_data)
+        assert response.status_code == 422
 
-        for depth in invalid_depths:
-            purchase_data = {"amount": 8000000000, "depth": depth}
-            response = client.post("/api/v1/stamps/", json=purchase_data)
-            assert response.status_code == 422, f"Invalid depth {depth} should be rejected"
+    @pytest.mark.parametrize("depth", [17.5, [], {}], ids=["float", "list", "dict"])
+    def test_depth_non_integer_values_rejected(self, depth):
+        """Test that non-integer depth values are rejected."""
+        purchase_data = {"amount": 8000000000, "depth": depth}
+        response = client.post("/api/v1/stamps/", json=purchase_data)
+        assert response.status_code == 422
 
     @patch('app.services.swarm_api.purchase_postage_stamp', return_value="mock_batch")
     @patch('app.services.swarm_api.check_sufficient_funds', return_value=MOCK_FUNDS_OK)
-    def test_depth_non_integer_values(self, mock_funds, mock_purchase):
-        """Test that non-integer depth values are rejected.
+    def test_depth_coercible_values_accepted(self, mock_funds, mock_purchase):
+        """Test depth values that Pydantic coerces or defaults.
 
         Note: Pydantic coerces "17" (string) to int 17, so it's accepted.
         """
-        rejected_depths = [
-            17.5,        # Non-integer float
-            [],          # List
-            {}           # Dict
-        ]
-
-        for depth in rejected_depths:
-            purchase_data = {"amount": 8000000000, "depth": depth}
-            response = client.post("/api/v1/stamps/", json=purchase_data)
-            assert response.status_code == 422, f"Non-integer depth {depth} should be rejected"
-
         # String "17" is coerced to int by Pydantic — accepted
         purchase_data = {"amount": 8000000000, "depth": "17"}
         response = client.post("/api/v1/stamps/", json=purchase_data)
@@ -158,25 +152,23 @@ class TestLabelValidation:
         response = client.post("/api/v1/stamps/", json=purchase_data)
         assert response.status_code == 201, "Request with empty label should be valid"
 
+    @pytest.mark.parametrize("label", [
+        "simple-label",
+        "label_with_underscores",
+        "label with spaces",
+        "label123",
+        "UPPERCASE",
+        "MixedCase",
+        "special!@#$%^&*()",
+        "unicode-测试-🚀",
+    ])
     @patch('app.services.swarm_api.purchase_postage_stamp', return_value="mock_batch")
     @patch('app.services.swarm_api.check_sufficient_funds', return_value=MOCK_FUNDS_OK)
-    def test_label_string_validation(self, mock_funds, mock_purchase):
+    def test_label_string_validation(self, mock_funds, mock_purchase, label):
         """Test that label accepts valid string values."""
-        valid_labels = [
-            "simple-label",
-            "label_with_underscores",
-            "label with spaces",
-            "label123",
-            "UPPERCASE",
-            "MixedCase",
-            "special!@#$%^&*()",
-            "unicode-测试-🚀",
-        ]
-
-        for label in valid_labels:
-            purchase_data = {"amount": 8000000000, "depth": 17, "label": label}
-            response = client.post("/api/v1/stamps/", json=purchase_data)
-            assert response.status_code == 201, f"Valid label '{label}' should be accepted"
+        purchase_data = {"amount": 8000000000, "depth": 17, "label": label}
+        response = client.post("/api/v1/stamps/", json=purchase_data)
+        assert response.status_code == 201
 
     @patch('app.services.swarm_api.purchase_postage_stamp', return_value="mock_batch")
     @patch('app.services.swarm_api.check_sufficient_funds', return_value=MOCK_FUNDS_OK)
@@ -195,20 +187,15 @@ class TestLabelValidation:
         # Should either accept or reject gracefully
         assert response.status_code in [201, 422], "Very long label should be handled gracefully"
 
-    def test_label_type_validation(self):
+    @pytest.mark.parametrize(
+        "label", [123, 12.34, True, [], {}],
+        ids=["int", "float", "bool", "list", "dict"]
+    )
+    def test_label_type_validation(self, label):
         """Test that non-string label values are rejected."""
-        invalid_labels = [
-            123,         # Integer
-            12.34,       # Float
-            True,        # Boolean
-            [],          # List
-            {},          # Dict
-        ]
-
-        for label in invalid_labels:
-            purchase_data = {"amount": 8000000000, "depth": 17, "label": label}
-            response = client.post("/api/v1/stamps/", json=purchase_data)
-            assert response.status_code == 422, f"Non-string label {type(label)} should be rejected"
+        purchase_data = {"amount": 8000000000, "depth": 17, "label": label}
+        response = client.post("/api/v1/stamps/", json=purchase_data)
+        assert response.status_code == 422
 
 
 class TestRequestStructureValidation:
@@ -274,38 +261,48 @@ class TestRequestStructureValidation:
 class TestStampIdValidation:
     """Tests for stamp ID validation in URL parameters."""
 
+    @pytest.mark.parametrize("stamp_id", [
+        "000de42079daebd58347bb38ce05bdc477701d93651d3bba318a9aee3fbd786a",  # 64 char hex
+        "abcdef1234567890abcdef1234567890abcdef1234567890abcdef1234567890",  # Mix of letters/numbers
+        "0123456789abcdef0123456789abcdef0123456789abcdef0123456789abcdef",  # All valid hex chars
+    ], ids=["hex", "mixed", "all-hex-chars"])
+    def test_valid_stamp_id_formats(self, stamp_id):
+        """Test that valid stamp ID formats match the path parameter pattern."""
+        assert STAMP_ID_RE.match(stamp_id)
+
     @patch('app.services.swarm_api.get_all_stamps_processed', return_value=[])
-    def test_valid_stamp_id_formats(self, mock_stamps):
-        """Test that valid stamp ID formats are accepted."""
-        valid_ids = [
-            "000de42079daebd58347bb38ce05bdc477701d93651d3bba318a9aee3fbd786a",  # 64 char hex
-            "abcdef1234567890abcdef1234567890abcdef1234567890abcdef1234567890",  # Mix of letters/numbers
-            "0123456789abcdef0123456789abcdef0123456789abcdef0123456789abcdef",  # All valid hex chars
-        ]
-
-        for stamp_id in valid_ids:
-            response = client.get(f"/api/v1/stamps/{stamp_id}")
-            # Should pass validation (returns 404 since mock returns empty list)
-            assert response.status_code == 404, f"Valid ID '{stamp_id}' should pass validation"
-
-    def test_invalid_stamp_id_formats(self):
-        """Test that invalid stamp ID formats are rejected by regex validation."""
-        invalid_ids = [
-            "too_short",          # Too short
-            "a" * 100,            # Too long
-            "invalid-chars!@#",   # Invalid characters
-            "gggggggggggggggggggggggggggggggggggggggggggggggggggggggggggggggg",  # Invalid hex chars
-            "spaces in id",       # Spaces
-            "../../../etc/passwd", # Path traversal attempt
-            "<script>alert('xss')</script>",  # XSS attempt
-        ]
-
-        for stamp_id in invalid_ids:
-            response = client.get(f"/api/v1/stamps/{stamp_id}")
-            # 422 from regex validation, or 404 if '/' chars cause URL path mismatch
-            assert response.status_code in [404, 422], f"Invalid ID '{stamp_id}' should be rejected"
-
-        # Empty string routes to list endpoint (200)
+    def test_valid_stamp_id_passes_route_validation(self, mock_stamps):
+        """Test that a valid stamp ID passes FastAPI path validation."""
+        response = client.get(f"/api/v1/stamps/{VALID_STAMP_ID}")
+        # Should pass validation (returns 404 since mock returns empty list)
+        assert response.status_code == 404
+
+    @pytest.mark.parametrize("stamp_id", [
+        "too_short",          # Too short
+        "a" * 100,            # Too long
+        "invalid-chars!@#",   # Invalid characters
+        "gggggggggggggggggggggggggggggggggggggggggggggggggggggggggggggggg",  # Invalid hex chars
+        "spaces in id",       # Spaces
+        "../../../etc/passwd", # Path traversal attempt
+        "<script>alert('xss')</script>",  # XSS attempt
+    ], ids=["too-short", "too-long", "invalid-chars", "non-hex", "spaces", "path-traversal", "xss"])
+    def test_invalid_stamp_id_formats(self, stamp_id):
+        """Test that invalid stamp ID formats do not match the path parameter pattern."""
+        assert not STAMP_ID_RE.match(stamp_id)
+
+    def test_invalid_stamp_id_rejected_by_route(self):
+        """Test that an invalid stamp ID is rejected by FastAPI path validation."""
+        response = client.get("/api/v1/stamps/too_short")
+        assert response.status_code == 422
+
+    def test_path_traversal_stamp_id_rejected_by_route(self):
+        """Test that '/' chars in a stamp ID never reach the stamp endpoint."""
+        response = client.get("/api/v1/stamps/../../../etc/passwd")
+        # 422 from regex validation, or 404 if '/' chars cause URL path mismatch
+        assert response.status_code in [404, 422]
+
+    def test_empty_stamp_id_routes_to_list(self):
+        """Test that an empty stamp ID routes to the list endpoint."""
         response = client.get("/api/v1/stamps/")
         assert response.status_code in [200, 500, 502]
 
@@ -338,58 +335,45 @@ class TestContentTypeValidation:
         FastAPI parses JSON body regardless of Content-Type header,
         so text/plain with valid JSON body is accepted.
         """
-        purchase_data = '{"amount": 8000000000, "depth": 17}'
-
         # text/plain with valid JSON body — FastAPI still parses it
         response = client.post(
             "/api/v1/stamps/",
-            data=purchase_data,
+            content=VALID_PURCHASE_BODY,
             headers={"Content-Type": "text/plain"}
         )
         assert response.status_code in [201, 422], "text/plain with valid JSON may be accepted"
 
         # Missing content type with valid JSON body — also accepted
-        response = client.post("/api/v1/stamps/", data=purchase_data)
+        response = client.post("/api/v1/stamps/", content=VALID_PURCHASE_BODY)
         assert response.status_code in [201, 422], "Missing content type with valid JSON may be accepted"
 
-    def test_malformed_json_handling(self):
+    @pytest.mark.parametrize("malformed", MALFORMED_JSON_BODIES, ids=MALFORMED_JSON_IDS)
+    def test_malformed_json_handling(self, malformed):
         """Test handling of malformed JSON."""
-        malformed_json_examples = [
-            '{"amount": 8000000000, "depth": 17,}',      # Trailing comma
-            '{"amount": 8000000000 "depth": 17}',        # Missing comma
-            '{amount: 8000000000, depth: 17}',           # Unquoted keys
-            '{"amount": 8000000000, "depth":}',          # Missing value
-            '{"amount": 8000000000, "depth": 17',        # Unclosed brace
-        ]
-
-        for malformed in malformed_json_examples:
-            response = client.post(
-                "/api/v1/stamps/",
-                data=malformed,
-                headers={"Content-Type": "application/json"}
-            )
-            assert response.status_code == 422, f"Malformed JSON should be rejected: {malformed}"
+        response = client.post(
+            "/api/v1/stamps/",
+            content=malformed,
+            headers={"Content-Type": "application/json"}
+        )
+        assert response.status_code == 422
 
 
 class TestBusinessRuleValidation:
     """Tests for business rule validation beyond basic field validation."""
 
+    @pytest.mark.parametrize("combo", [
+        {"amount": 1000000000, "depth": 16},   # Small amount, low depth
+        {"amount": 10000000000, "depth": 20},  # Medium amount, medium depth
+        {"amount": 100000000000, "depth": 24}, # Large amount, high depth
+    ], ids=["small", "medium", "large"])
     @patch('app.services.swarm_api.purchase_postage_stamp', return_value="mock_batch")
     @patch('app.services.swarm_api.check_sufficient_funds', return_value=MOCK_FUNDS_OK)
-    def test_reasonable_amount_depth_combinations(self, mock_funds, mock_purchase):
+    def test_reasonable_amount_depth_combinations(self, mock_funds, mock_purchase, combo):
         """Test that amount and depth combinations make business sense."""
-        # These are business rule tests - the combinations should be reasonable
-        combinations = [
-            {"amount": 1000000000, "depth": 16},   # Small amount, low depth
-            {"amount": 10000000000, "depth": 20},  # Medium amount, medium depth
-            {"amount": 100000000000, "depth": 24}, # Large amount, high depth
-        ]
-
-        for combo in combinations:
-            purchase_data = {**combo, "label": "test"}
-            response = client.post("/api/v1/stamps/", json=purchase_data)
-            # Should pass validation (business logic validation)
-            assert response.status_code == 201, f"Reasonable combination should be accepted: {combo}"
+        purchase_data = {**combo, "label": "test"}
+        response = client.post("/api/v1/stamps/", json=purchase_data)
+        # Should pass validation (business logic validation)
+        assert response.status_code == 201
 
     @patch('app.services.swarm_api.extend_postage_stamp', return_value="mock_batch")
     @patch('app.services.swarm_api.check_sufficient_funds', return_value=MOCK_FUNDS_OK)
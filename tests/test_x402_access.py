@@ -2,11 +2,15 @@
 """
 Unit tests for x402 access control (whitelist/blacklist).
 """
+import ipaddress
+
 import pytest
 from unittest.mock import patch
 
 from app.x402.access import (
     parse_ip_list,
+    parse_ip_networks,
+    parse_client_ip,
     ip_matches_list,
     is_ip_blacklisted,
     is_ip_whitelisted,
@@ -117,6 +121,45 @@ class TestIPMatchesList:
         assert ip_matches_list("2001:db8::1", ip_list) is True
         assert ip_matches_list("2001:db9::1", ip_list) is False
 
+    def test_parsed_address_match(self):
+        """Already-parsed addresses are matched without re-parsing."""
+        ip_list = {"192.168.1.1", "10.0.0.0/8"}
+        assert ip_matches_list(ipaddress.ip_address("192.168.1.1"), ip_list) is True
+        assert ip_matches_list(ipaddress.ip_address("10.5.5.5"), ip_list) is True
+        assert ip_matches_list(ipaddress.ip_address("192.168.2.1"), ip_list) is False
+
+
+class TestParseIPNetworks:
+    """Test cached network parsing used by check_access."""
+
+    def test_single_ips_become_host_networks(self):
+        networks = parse_ip_networks("192.168.1.1, 10.0.0.0/8, ::1")
+        assert set(networks) == {
+            ipaddress.ip_network("192.168.1.1/32"),
+            ipaddress.ip_network("10.0.0.0/8"),
+            ipaddress.ip_network("::1/128"),
+        }
+
+    def test_invalid_entries_skipped(self):
+        assert parse_ip_networks("not-an-ip, 10.0.0.1") == (ipaddress.ip_network("10.0.0.1/32"),)
+
+    def test_result_cached_per_string(self):
+        assert parse_ip_networks("10.0.0.0/8") is parse_ip_networks("10.0.0.0/8")
+
+
+class TestParseClientIP:
+    """Test client IP parsing."""
+
+    def test_valid_ips(self):
+        """Valid IPv4/IPv6 strings are parsed."""
+        assert parse_client_ip("192.168.1.1") == ipaddress.ip_address("192.168.1.1")
+        assert parse_client_ip("::1") == ipaddress.ip_address("::1")
+
+    def test_invalid_ip_returns_none(self):
+        """Invalid IP strings return None."""
+        assert parse_client_ip("invalid") is None
+        assert parse_client_ip("") is None
+
 
 class TestIsIPBlacklisted:
     """Test blacklist checking."""
@@ -254,6 +297,26 @@ class TestCheckAccess:
         status, reason = check_access("192.168.1.1", wallet_address="0x1234")
         assert status == "pay"
 
+    @patch("app.x402.access.settings")
+    def test_settings_change_takes_effect(self, mock_settings):
+        """Cached parsing follows the current list values."""
+        mock_settings.X402_BLACKLIST_IPS = "192.168.1.100"
+        mock_settings.X402_WHITELIST_IPS = ""
+        assert check_access("192.168.1.100")[0] == "blocked"
+
+        mock_settings.X402_BLACKLIST_IPS = "192.168.1.101"
+        assert check_access("192.168.1.100")[0] == "pay"
+
+    @patch("app.x402.access.settings")
+    def test_invalid_client_ip_returns_pay(self, mock_settings):
+        """Unparseable client IP matches neither list."""
+        mock_settings.X402_BLACKLIST_IPS = "192.168.1.100"
+        mock_settings.X402_WHITELIST_IPS = "10.0.0.0/8"
+
+        status, reason = check_access("unknown")
+        assert status == "pay"
+        assert reason is None
+
 
 class TestGetAccessControlStatus:
     """Test access control status reporting."""
@@ -10,27 +10,34 @@ These tests verify the full x402 flow including:
 - Audit logging
 - 402 response generation
 - Payment verification and settlement
+
+Classes are independent and can run in parallel with
+``pytest -n auto --dist loadgroup``; each worker has its own rate limiter,
+which the autouse ``rate_limits`` fixture resets around every test.
 """
+import io
 import json
-import os
 import pytest
-import tempfile
-from unittest.mock import patch, MagicMock, AsyncMock
+from types import SimpleNamespace
+from unittest.mock import patch, create_autospec
 
-from fastapi import FastAPI, Depends, APIRouter, Path
+from fastapi import FastAPI, Depends, APIRouter
 from fastapi.testclient import TestClient
-from pydantic import BaseModel
 
-from x402.types import PaymentRequirements, PaymentPayload, VerifyResponse, SettleResponse
+from x402.types import VerifyResponse, SettleResponse
 from x402.encoding import safe_base64_encode
+from x402.facilitator import FacilitatorClient
 
-from app.x402.middleware import X402Middleware, PROTECTED_ENDPOINTS
+from app.x402.middleware import X402Middleware
 from app.x402.dependency import require_x402_payment
 from app.x402.access import check_access
-from app.x402.ratelimit import reset_rate_limiter
+from app.x402.ratelimit import check_rate_limit, get_rate_limiter
 from app.x402.audit import (
-    get_audit_log_path,
+    log_audit_event,
     read_audit_log,
+    flush_audit_log,
+    close_audit_log,
+    AuditLogHandler,
     AuditEventType,
 )
 
@@ -55,7 +62,10 @@ def _make_app(*routes, facilitator_client=None):
     for method, path, handler in routes:
         router.add_api_route(path, handler, methods=[method])
     app.include_router(router)
-    app.add_middleware(X402Middleware, facilitator_client=facilitator_client or MagicMock())
+    app.add_middleware(
+        X402Middleware,
+        facilitator_client=facilitator_client or create_autospec(FacilitatorClient, instance=True),
+    )
     return app
 
 
@@ -68,27 +78,77 @@ def _make_simple_app(*routes):
     return app
 
 
-def _configure(mock_dep, mock_mw, *, free_tier=False):
-    """Set common mock values on both dependency and middleware settings mocks."""
-    mock_dep.X402_ENABLED = True
-    mock_dep.X402_NETWORK = "base-sepolia"
-    mock_dep.X402_PAY_TO_ADDRESS = "0xpayee"
-    mock_dep.X402_MIN_PRICE_USD = 0.01
-    mock_dep.X402_FREE_TIER_ENABLED = free_tier
-    mock_dep.X402_FREE_TIER_RATE_LIMIT = 3
+async def _send_seen_by_app(method, path):
+    """Call X402Middleware on a bare ASGI scope, bypassing routing.
+
+    Returns the send callable the wrapped app received; it is the caller's
+    own send when the middleware passes the request through untouched.
+    """
+    seen = []
+
+    async def app(scope, receive, send):
+        seen.append(send)
+
+    async def send(message):
+        pass
+
+    middleware = X402Middleware(app, facilitator_client=create_autospec(FacilitatorClient, instance=True))
+    await middleware({"type": "http", "method": method, "path": path, "headers": []}, None, send)
+    assert len(seen) == 1
+    return seen[0], send
+
+
+# Settings shared by the x402 modules under test; tests override single keys
+# through the settings_ns fixture.
+SETTINGS_DEFAULTS = {
+    "X402_ENABLED": True,
+    "X402_FACILITATOR_URL": "https://x402.org/facilitator",
+    "X402_NETWORK": "base-sepolia",
+    "X402_PAY_TO_ADDRESS": "0xpayee",
+    "X402_MIN_PRICE_USD": 0.01,
+    "X402_FREE_TIER_ENABLED": False,
+    "X402_FREE_TIER_RATE_LIMIT": 3,
+    "X402_RATE_LIMIT_PER_IP": 10,
+    "X402_BLACKLIST_IPS": "",
+    "X402_WHITELIST_IPS": "",
+    "X402_AUDIT_LOG_PATH": "logs/x402_audit.jsonl",
+    "X402_AUDIT_DEDUP": False,
+}
+
+SETTINGS_MODULES = (
+    "app.x402.middleware",
+    "app.x402.dependency",
+    "app.x402.access",
+    "app.x402.ratelimit",
+    "app.x402.audit",
+)
+
 
-    mock_mw.X402_ENABLED = True
-    mock_mw.X402_NETWORK = "base-sepolia"
-    mock_mw.X402_PAY_TO_ADDRESS = "0xpayee"
+@pytest.fixture(autouse=True)
+def settings_ns(monkeypatch):
+    """Plain settings object swapped into every x402 module for the test."""
+    ns = SimpleNamespace(**SETTINGS_DEFAULTS)
+    for module in SETTINGS_MODULES:
+        monkeypatch.setattr(f"{module}.settings", ns)
+    return ns
 
 
-def create_valid_payment_header(
+@pytest.fixture(autouse=True)
+def rate_limits():
+    """Clear the limiter around each test; it is global to the worker process."""
+    limiter = get_rate_limiter()
+    limiter.reset_all()
+    yield limiter
+    limiter.reset_all()
+
+
+def _payment_payload(
     payer: str = "0x1234567890abcdef1234567890abcdef12345678",
     amount: str = "100000",
     network: str = "base-sepolia"
-) -> str:
-    """Create a valid base64-encoded payment header."""
-    payload = {
+) -> dict:
+    """Build an x402 exact-scheme payment payload."""
+    return {
         "x402Version": 1,
         "scheme": "exact",
         "network": network,
@@ -104,7 +164,32 @@ def create_valid_payment_header(
             }
         }
     }
-    return safe_base64_encode(json.dumps(payload).encode("utf-8"))
+
+
+def _encode_payment_header(payload: dict) -> str:
+    return safe_base64_encode(json.dumps(payload, separators=(",", ":")).encode("utf-8"))
+
+
+# Encoded once at import; every paid request in these tests sends it.
+DEFAULT_PAYMENT_HEADER = _encode_payment_header(_payment_payload())
+
+
+# Canned facilitator responses, built once and replayed by the mocks
+VERIFY_OK = VerifyResponse(
+    is_valid=True, invalid_reason=None,
+    payer="0x1234567890abcdef1234567890abcdef12345678"
+)
+VERIFY_FAIL = VerifyResponse(is_valid=False, invalid_reason="Insufficient balance", payer=None)
+SETTLE_OK = SettleResponse(success=True, transaction="0x" + "ab" * 32, network="base-sepolia")
+
+# Subset of the 402 requirements for a $0.10 quote paid to 0xTestPayee
+# (USDC has 6 decimals).
+EXPECTED_402_REQUIREMENTS = {
+    "scheme": "exact",
+    "network": "base-sepolia",
+    "payTo": "0xTestPayee",
+    "maxAmountRequired": "100000",
+}
 
 
 # --- Endpoint handlers ---
@@ -120,46 +205,109 @@ async def upload_manifest():
 async def health():
     return {"status": "healthy"}
 
+async def list_stamps():
+    return {"stamps": []}
+
+async def download_data(reference: str):
+    return {"reference": reference, "data": "hello"}
+
+
+ROUTES = (
+    ("POST", "/api/v1/stamps/", create_stamp),
+    ("GET", "/api/v1/stamps/", list_stamps),
+    ("POST", "/api/v1/data/", upload_data),
+    ("POST", "/api/v1/data/manifest", upload_manifest),
+    ("GET", "/api/v1/data/{reference}", download_data),
+    ("GET", "/api/v1/health", health),
+)
+
+
+# --- Shared apps ---
+# Settings are read at request time, so one app per module serves every
+# test; each test still patches the settings it needs. Entering the client
+# keeps one event loop portal open instead of starting one per request.
+@pytest.fixture(scope="module")
+def client():
+    """Client for an app with the x402 dependency and middleware."""
+    with TestClient(_make_app(*ROUTES)) as c:
+        yield c
+
+
+@pytest.fixture(scope="module")
+def simple_client():
+    """Client for an app with the middleware only (x402 disabled tests)."""
+    with TestClient(_make_simple_app(*ROUTES)) as c:
+        yield c
 
+
+@pytest.fixture
+def ok_facilitator(monkeypatch):
+    """Facilitator replaying successful verify/settle responses.
+
+    The dependency verifies through it and paid_client's middleware settles
+    through it.
+    """
+    facilitator = create_autospec(FacilitatorClient, instance=True)
+    facilitator.verify.return_value = VERIFY_OK
+    facilitator.settle.return_value = SETTLE_OK
+    monkeypatch.setattr("app.x402.dependency._get_facilitator_client", lambda: facilitator)
+    return facilitator
+
+
+@pytest.fixture
+def paid_client(ok_facilitator):
+    """Client for an app whose middleware settles via ok_facilitator."""
+    with TestClient(_make_app(*ROUTES, facilitator_client=ok_facilitator)) as c:
+        yield c
+
+
+# Class-scoped so the patches are entered once per class; apply them with
+# @pytest.mark.usefixtures on the class.
+@pytest.fixture(scope="class")
+def ok_balance():
+    """Base wallet balance check patched to a healthy result."""
+    with patch("app.x402.dependency.check_base_eth_balance", return_value=OK_BALANCE) as mock:
+        yield mock
+
+
+@pytest.fixture(scope="class")
+def mock_price_quote():
+    """get_price_quote patched once per class.
+
+    Tests that depend on the price set return_value themselves, since the
+    mock is shared across the class.
+    """
+    with patch("app.x402.dependency.get_price_quote") as mock:
+        mock.return_value = {"price_usd": 0.05, "description": "Test"}
+        yield mock
+
+
+@pytest.fixture
+def audit_stream(monkeypatch):
+    """Capture audit events in memory instead of writing the log file."""
+    stream = io.BytesIO()
+    monkeypatch.setattr("app.x402.audit._audit_handler", AuditLogHandler(stream=stream))
+    return stream
+
+
+@pytest.mark.usefixtures("ok_balance", "mock_price_quote")
 class TestMiddlewareIntegration:
     """Test x402 middleware with full FastAPI integration."""
 
-    def setup_method(self):
-        reset_rate_limiter()
-
-    def teardown_method(self):
-        reset_rate_limiter()
+    # Passthrough branches hand the app the original send, so these call
+    # the middleware directly instead of going through routing.
+    @pytest.mark.asyncio
+    async def test_x402_disabled_passes_through(self, settings_ns):
+        settings_ns.X402_ENABLED = False
+        app_send, send = await _send_seen_by_app("POST", "/api/v1/stamps/")
+        assert app_send is send
 
-    @patch("app.x402.middleware.settings")
-    def test_x402_disabled_passes_through(self, mock_mw):
-        mock_mw.X402_ENABLED = False
-        app = _make_simple_app(("POST", "/api/v1/stamps/", create_stamp))
-        client = TestClient(app)
-        response = client.post("/api/v1/stamps/")
-        assert response.status_code == 200
-        assert response.json()["status"] == "created"
+    @pytest.mark.asyncio
+    async def test_unprotected_endpoint_passes_through(self):
+        app_send, send = await _send_seen_by_app("GET", "/api/v1/health")
+        assert app_send is send
 
-    @patch("app.x402.dependency.check_base_eth_balance", return_value=OK_BALANCE)
-    @patch("app.x402.middleware.settings")
-    @patch("app.x402.dependency.settings")
-    def test_unprotected_endpoint_passes_through(self, mock_dep, mock_mw, mock_balance):
-        _configure(mock_dep, mock_mw)
-        app = _make_app(("GET", "/api/v1/health", health))
-        client = TestClient(app)
-        response = client.get("/api/v1/health")
-        assert response.status_code == 200
-        assert response.json()["status"] == "healthy"
-
-    @patch("app.x402.dependency.check_base_eth_balance", return_value=OK_BALANCE)
-    @patch("app.x402.dependency.get_price_quote")
-    @patch("app.x402.middleware.settings")
-    @patch("app.x402.dependency.settings")
-    def test_protected_endpoint_returns_402_without_payment(self, mock_dep, mock_mw, mock_price, mock_balance):
-        _configure(mock_dep, mock_mw, free_tier=False)
-        mock_price.return_value = {"price_usd": 0.05, "description": "Test operation"}
-
-        app = _make_app(("POST", "/api/v1/stamps/", create_stamp))
-        client = TestClient(app)
+    def test_protected_endpoint_returns_402_without_payment(self, client):
         response = client.post("/api/v1/stamps/")
 
         assert response.status_code == 402
@@ -168,44 +316,24 @@ class TestMiddlewareIntegration:
         assert "accepts" in data
         assert len(data["accepts"]) > 0
 
-    @patch("app.x402.dependency.check_base_eth_balance", return_value=OK_BALANCE)
-    @patch("app.x402.dependency.get_price_quote")
-    @patch("app.x402.middleware.settings")
-    @patch("app.x402.dependency.settings")
-    def test_402_response_contains_payment_requirements(self, mock_dep, mock_mw, mock_price, mock_balance):
-        _configure(mock_dep, mock_mw, free_tier=False)
-        mock_dep.X402_PAY_TO_ADDRESS = "0xTestPayee"
-        mock_mw.X402_PAY_TO_ADDRESS = "0xTestPayee"
-        mock_price.return_value = {"price_usd": 0.10, "description": "Stamp purchase"}
-
-        app = _make_app(("POST", "/api/v1/stamps/", create_stamp))
-        client = TestClient(app)
+    def test_402_response_contains_payment_requirements(self, client, settings_ns, mock_price_quote):
+        settings_ns.X402_PAY_TO_ADDRESS = "0xTestPayee"
+        mock_price_quote.return_value = {"price_usd": 0.10, "description": "Stamp purchase"}
+
         response = client.post("/api/v1/stamps/")
 
         assert response.status_code == 402
-        data = response.json()["detail"]
-        requirements = data["accepts"][0]
-        assert requirements["scheme"] == "exact"
-        assert requirements["network"] == "base-sepolia"
-        assert requirements["payTo"] == "0xTestPayee"
-        assert int(requirements["maxAmountRequired"]) == 100000
-
-    @patch("app.x402.dependency.check_base_eth_balance", return_value=OK_BALANCE)
-    @patch("app.x402.dependency.get_price_quote")
-    @patch("app.x402.middleware.settings")
-    @patch("app.x402.dependency.settings")
-    def test_invalid_payment_header_returns_402(self, mock_dep, mock_mw, mock_price, mock_balance):
-        _configure(mock_dep, mock_mw)
-        mock_price.return_value = {"price_usd": 0.05, "description": "Test operation"}
-
-        app = _make_app(("POST", "/api/v1/stamps/", create_stamp))
-        client = TestClient(app)
+        requirements = response.json()["detail"]["accepts"][0]
+        assert EXPECTED_402_REQUIREMENTS.items() <= requirements.items()
+
+    def test_invalid_payment_header_returns_402(self, client):
         response = client.post("/api/v1/stamps/", headers={"X-PAYMENT": "invalid-base64-data!!!"})
 
         assert response.status_code == 402
         assert "Invalid X-PAYMENT header" in response.json()["detail"]["error"]
 
 
+@pytest.mark.usefixtures("ok_balance")
 class TestValidationBeforePayment:
     """Test that x402 no longer blocks at the ASGI level (issue #95).
 
@@ -215,58 +343,22 @@ class TestValidationBeforePayment:
     validation (body, typed path params), so those still get 402.
     """
 
-    def setup_method(self):
-        reset_rate_limiter()
-
-    def teardown_method(self):
-        reset_rate_limiter()
-
-    @patch("app.x402.dependency.check_base_eth_balance", return_value=OK_BALANCE)
-    @patch("app.x402.middleware.settings")
-    @patch("app.x402.dependency.settings")
-    def test_nonexistent_route_returns_404_not_402(self, mock_dep, mock_mw, mock_balance):
+    def test_nonexistent_route_returns_404_not_402(self, client):
         """Requests to non-existent routes should return 404, not 402."""
-        _configure(mock_dep, mock_mw, free_tier=False)
 
-        app = _make_app(("POST", "/api/v1/stamps/", create_stamp))
-        client = TestClient(app)
         response = client.post("/api/v1/nonexistent/")
         assert response.status_code == 404
 
-    @patch("app.x402.dependency.check_base_eth_balance", return_value=OK_BALANCE)
-    @patch("app.x402.middleware.settings")
-    @patch("app.x402.dependency.settings")
-    def test_get_on_protected_path_passes_through(self, mock_dep, mock_mw, mock_balance):
+    def test_get_on_protected_path_passes_through(self, client):
         """GET requests on protected endpoint paths should pass through."""
-        _configure(mock_dep, mock_mw, free_tier=False)
 
-        async def list_stamps():
-            return {"stamps": []}
-
-        app = _make_app(
-            ("POST", "/api/v1/stamps/", create_stamp),
-            ("GET", "/api/v1/stamps/", list_stamps),
-        )
-        client = TestClient(app)
         response = client.get("/api/v1/stamps/")
         assert response.status_code == 200
         assert response.json() == {"stamps": []}
 
-    @patch("app.x402.dependency.check_base_eth_balance", return_value=OK_BALANCE)
-    @patch("app.x402.middleware.settings")
-    @patch("app.x402.dependency.settings")
-    def test_unprotected_get_with_x402_enabled(self, mock_dep, mock_mw, mock_balance):
+    def test_unprotected_get_with_x402_enabled(self, client):
         """GET endpoints on the same router should not be payment-gated."""
-        _configure(mock_dep, mock_mw, free_tier=False)
-
-        async def download_data(reference: str):
-            return {"reference": reference, "data": "hello"}
 
-        app = _make_app(
-            ("POST", "/api/v1/data/", upload_data),
-            ("GET", "/api/v1/data/{reference}", download_data),
-        )
-        client = TestClient(app)
         response = client.get("/api/v1/data/abc123")
         assert response.status_code == 200
         assert response.json()["reference"] == "abc123"
@@ -275,92 +367,47 @@ class TestValidationBeforePayment:
 class TestAccessControlIntegration:
     """Test access control integration with the gateway."""
 
-    @patch("app.x402.access.settings")
-    def test_blacklisted_ip_blocked(self, mock_settings):
-        mock_settings.X402_BLACKLIST_IPS = "192.168.1.100"
-        mock_settings.X402_WHITELIST_IPS = ""
-        status, reason = check_access("192.168.1.100")
-        assert status == "blocked"
-        assert reason == "IP address is blocked"
-
-    @patch("app.x402.access.settings")
-    def test_whitelisted_ip_free_access(self, mock_settings):
-        mock_settings.X402_BLACKLIST_IPS = ""
-        mock_settings.X402_WHITELIST_IPS = "192.168.1.50"
-        status, reason = check_access("192.168.1.50")
-        assert status == "free"
-        assert reason is None
-
-    @patch("app.x402.access.settings")
-    def test_normal_ip_requires_payment(self, mock_settings):
-        mock_settings.X402_BLACKLIST_IPS = ""
-        mock_settings.X402_WHITELIST_IPS = ""
-        status, reason = check_access("192.168.1.1")
-        assert status == "pay"
-        assert reason is None
-
-    @patch("app.x402.access.settings")
-    def test_cidr_range_blocking(self, mock_settings):
-        mock_settings.X402_BLACKLIST_IPS = "10.0.0.0/8"
-        mock_settings.X402_WHITELIST_IPS = ""
-        status, _ = check_access("10.50.100.200")
-        assert status == "blocked"
-        status, _ = check_access("192.168.1.1")
-        assert status == "pay"
+    @pytest.mark.parametrize("blacklist,whitelist,ip,status,reason", [
+        ("192.168.1.100", "", "192.168.1.100", "blocked", "IP address is blocked"),
+        ("", "192.168.1.50", "192.168.1.50", "free", None),
+        ("", "", "192.168.1.1", "pay", None),
+        ("10.0.0.0/8", "", "10.50.100.200", "blocked", "IP address is blocked"),
+        ("10.0.0.0/8", "", "192.168.1.1", "pay", None),
+    ], ids=["blacklisted", "whitelisted", "normal", "cidr-blocked", "cidr-outside"])
+    def test_access_status(self, blacklist, whitelist, ip, status, reason, settings_ns):
+        settings_ns.X402_BLACKLIST_IPS = blacklist
+        settings_ns.X402_WHITELIST_IPS = whitelist
+        assert check_access(ip) == (status, reason)
 
 
 class TestRateLimitingIntegration:
     """Test rate limiting integration."""
 
-    def setup_method(self):
-        reset_rate_limiter()
-
-    def teardown_method(self):
-        reset_rate_limiter()
-
-    @patch("app.x402.ratelimit.settings")
-    def test_rate_limit_blocks_after_threshold(self, mock_settings):
-        from app.x402.ratelimit import check_rate_limit
-        mock_settings.X402_RATE_LIMIT_PER_IP = 3
+    @pytest.mark.parametrize("limit", [1, 2, 3, 5, 10, 100])
+    def test_rate_limit_threshold(self, limit, settings_ns):
+        settings_ns.X402_RATE_LIMIT_PER_IP = limit
 
-        for i in range(3):
-            is_allowed, reason, stats = check_rate_limit("192.168.1.1")
-            assert is_allowed is True
+        for _ in range(limit):
+            assert check_rate_limit("192.168.1.1")[0] is True
 
-        is_allowed, reason, stats = check_rate_limit("192.168.1.1")
+        is_allowed, reason, _ = check_rate_limit("192.168.1.1")
         assert is_allowed is False
         assert "Rate limit exceeded" in reason
 
-    @patch("app.x402.ratelimit.settings")
-    def test_different_ips_have_separate_limits(self, mock_settings):
-        from app.x402.ratelimit import check_rate_limit
-        mock_settings.X402_RATE_LIMIT_PER_IP = 2
-
-        check_rate_limit("192.168.1.1")
-        check_rate_limit("192.168.1.1")
-        is_allowed, _, _ = check_rate_limit("192.168.1.1")
-        assert is_allowed is False
-
-        is_allowed, _, _ = check_rate_limit("192.168.1.2")
-        assert is_allowed is True
+        # Other IPs keep their own window
+        assert check_rate_limit("192.168.1.2")[0] is True
 
 
 class TestAuditLoggingIntegration:
     """Test audit logging integration."""
 
-    def setup_method(self):
-        self.temp_dir = tempfile.mkdtemp()
-        self.audit_log_path = os.path.join(self.temp_dir, "x402_audit.jsonl")
-
-    def teardown_method(self):
-        import shutil
-        shutil.rmtree(self.temp_dir, ignore_errors=True)
-
-    @patch("app.x402.audit.settings")
-    def test_audit_event_logged(self, mock_settings):
-        from app.x402.audit import log_audit_event
-        mock_settings.X402_AUDIT_LOG_PATH = self.audit_log_path
+    @pytest.fixture
+    def audit_log_file(self, tmp_path, settings_ns):
+        settings_ns.X402_AUDIT_LOG_PATH = str(tmp_path / "x402_audit.jsonl")
+        yield settings_ns.X402_AUDIT_LOG_PATH
+        close_audit_log()
 
+    def test_audit_event_logged(self, audit_stream):
         request_id = log_audit_event(
             event_type=AuditEventType.REQUEST_RECEIVED,
             data={"method": "POST", "path": "/api/v1/stamps/"},
@@ -368,16 +415,12 @@ class TestAuditLoggingIntegration:
         )
         assert request_id is not None
 
-        with open(self.audit_log_path, "r") as f:
-            event = json.loads(f.readline())
+        flush_audit_log()
+        event = json.loads(audit_stream.getvalue().splitlines()[0])
         assert event["event_type"] == "request_received"
         assert event["client_ip"] == "192.168.1.1"
 
-    @patch("app.x402.audit.settings")
-    def test_audit_log_reading(self, mock_settings):
-        from app.x402.audit import log_audit_event
-        mock_settings.X402_AUDIT_LOG_PATH = self.audit_log_path
-
+    def test_audit_log_reading(self, audit_log_file):
         log_audit_event(event_type=AuditEventType.REQUEST_RECEIVED, data={"method": "POST"}, client_ip="192.168.1.1")
         log_audit_event(event_type=AuditEventType.PAYMENT_RECEIVED, data={"amount": "100000"}, client_ip="192.168.1.1")
 
@@ -386,11 +429,7 @@ class TestAuditLoggingIntegration:
         assert events[0]["event_type"] == "payment_received"
         assert events[1]["event_type"] == "request_received"
 
-    @patch("app.x402.audit.settings")
-    def test_audit_log_filtering(self, mock_settings):
-        from app.x402.audit import log_audit_event
-        mock_settings.X402_AUDIT_LOG_PATH = self.audit_log_path
-
+    def test_audit_log_filtering(self, audit_log_file):
         log_audit_event(event_type=AuditEventType.REQUEST_RECEIVED, data={}, client_ip="192.168.1.1")
         log_audit_event(event_type=AuditEventType.REQUEST_RECEIVED, data={}, client_ip="192.168.1.2")
 
@@ -399,203 +438,79 @@ class TestAuditLoggingIntegration:
         assert events[0]["client_ip"] == "192.168.1.1"
 
 
+@pytest.mark.usefixtures("ok_balance", "mock_price_quote")
 class TestFullPaymentFlow:
     """Test full payment flow with mocked facilitator."""
 
-    def setup_method(self):
-        reset_rate_limiter()
-
-    def teardown_method(self):
-        reset_rate_limiter()
-
-    @patch("app.x402.dependency.check_base_eth_balance", return_value=OK_BALANCE)
-    @patch("app.x402.dependency._get_facilitator_client")
-    @patch("app.x402.dependency.get_price_quote")
-    @patch("app.x402.middleware.settings")
-    @patch("app.x402.dependency.settings")
-    def test_successful_payment_flow(self, mock_dep, mock_mw, mock_price, mock_get_fac, mock_balance):
-        _configure(mock_dep, mock_mw)
-        mock_dep.X402_FACILITATOR_URL = "https://x402.org/facilitator"
-        mock_price.return_value = {"price_usd": 0.05, "description": "Test stamp"}
-
-        # Dependency uses this to verify
-        mock_fac = MagicMock()
-        mock_fac.verify = AsyncMock(return_value=VerifyResponse(
-            is_valid=True, invalid_reason=None,
-            payer="0x1234567890abcdef1234567890abcdef12345678"
-        ))
-        mock_get_fac.return_value = mock_fac
-
-        # Middleware uses this to settle
-        mock_mw_fac = MagicMock()
-        mock_mw_fac.settle = AsyncMock(return_value=SettleResponse(
-            success=True, transaction="0x" + "ab" * 32, network="base-sepolia"
-        ))
-
-        app = _make_app(
-            ("POST", "/api/v1/stamps/", create_stamp),
-            facilitator_client=mock_mw_fac,
-        )
-        client = TestClient(app)
-
-        payment_header = create_valid_payment_header()
-        response = client.post("/api/v1/stamps/", headers={"X-PAYMENT": payment_header})
+    def test_successful_payment_flow(self, paid_client, ok_facilitator):
+        response = paid_client.post("/api/v1/stamps/", headers={"X-PAYMENT": DEFAULT_PAYMENT_HEADER})
 
         assert response.status_code == 200
         assert response.json()["status"] == "created"
         assert "X-PAYMENT-RESPONSE" in response.headers
-        mock_fac.verify.assert_called_once()
-        mock_mw_fac.settle.assert_called_once()
-
-    @patch("app.x402.dependency.check_base_eth_balance", return_value=OK_BALANCE)
-    @patch("app.x402.dependency._get_facilitator_client")
-    @patch("app.x402.dependency.get_price_quote")
-    @patch("app.x402.middleware.settings")
-    @patch("app.x402.dependency.settings")
-    def test_payment_verification_failure(self, mock_dep, mock_mw, mock_price, mock_get_fac, mock_balance):
-        _configure(mock_dep, mock_mw)
-        mock_dep.X402_FACILITATOR_URL = "https://x402.org/facilitator"
-        mock_price.return_value = {"price_usd": 0.05, "description": "Test stamp"}
-
-        mock_fac = MagicMock()
-        mock_fac.verify = AsyncMock(return_value=VerifyResponse(
-            is_valid=False, invalid_reason="Insufficient balance", payer=None
-        ))
-        mock_get_fac.return_value = mock_fac
-
-        app = _make_app(("POST", "/api/v1/stamps/", create_stamp))
-        client = TestClient(app)
-
-        payment_header = create_valid_payment_header()
-        response = client.post("/api/v1/stamps/", headers={"X-PAYMENT": payment_header})
+        ok_facilitator.verify.assert_called_once()
+        ok_facilitator.settle.assert_called_once()
 
-        assert response.status_code == 402
-        assert "Insufficient balance" in response.json()["detail"]["error"]
+    def test_settlement_failure_returns_500(self, paid_client, ok_facilitator):
+        ok_facilitator.settle.side_effect = RuntimeError("facilitator down")
 
+        response = paid_client.post("/api/v1/stamps/", headers={"X-PAYMENT": DEFAULT_PAYMENT_HEADER})
 
-class TestProtectedEndpoints:
-    """Test all protected endpoints are properly gated."""
+        assert response.status_code == 500
+        assert response.json()["x402_status"] == "settlement_failed"
+        assert response.headers["X-Payment-Mode"] == "failed"
+        assert "X-PAYMENT-RESPONSE" not in response.headers
 
-    def setup_method(self):
-        reset_rate_limiter()
+    def test_payment_verification_failure(self, client, monkeypatch):
+        mock_fac = create_autospec(FacilitatorClient, instance=True)
+        mock_fac.verify.return_value = VERIFY_FAIL
+        monkeypatch.setattr("app.x402.dependency._get_facilitator_client", lambda: mock_fac)
 
-    def teardown_method(self):
-        reset_rate_limiter()
-
-    @patch("app.x402.dependency.check_base_eth_balance", return_value=OK_BALANCE)
-    @patch("app.x402.dependency.get_price_quote")
-    @patch("app.x402.middleware.settings")
-    @patch("app.x402.dependency.settings")
-    def test_stamps_endpoint_protected(self, mock_dep, mock_mw, mock_price, mock_balance):
-        _configure(mock_dep, mock_mw, free_tier=False)
-        mock_price.return_value = {"price_usd": 0.05, "description": "Test"}
-        app = _make_app(("POST", "/api/v1/stamps/", create_stamp))
-        client = TestClient(app)
-        response = client.post("/api/v1/stamps/")
-        assert response.status_code == 402
+        response = client.post("/api/v1/stamps/", headers={"X-PAYMENT": DEFAULT_PAYMENT_HEADER})
 
-    @patch("app.x402.dependency.check_base_eth_balance", return_value=OK_BALANCE)
-    @patch("app.x402.dependency.get_price_quote")
-    @patch("app.x402.middleware.settings")
-    @patch("app.x402.dependency.settings")
-    def test_data_endpoint_protected(self, mock_dep, mock_mw, mock_price, mock_balance):
-        _configure(mock_dep, mock_mw, free_tier=False)
-        mock_price.return_value = {"price_usd": 0.05, "description": "Test"}
-        app = _make_app(("POST", "/api/v1/data/", upload_data))
-        client = TestClient(app)
-        response = client.post("/api/v1/data/")
         assert response.status_code == 402
+        assert "Insufficient balance" in response.json()["detail"]["error"]
 
-    @patch("app.x402.dependency.check_base_eth_balance", return_value=OK_BALANCE)
-    @patch("app.x402.dependency.get_price_quote")
-    @patch("app.x402.middleware.settings")
-    @patch("app.x402.dependency.settings")
-    def test_manifest_endpoint_protected(self, mock_dep, mock_mw, mock_price, mock_balance):
-        _configure(mock_dep, mock_mw, free_tier=False)
-        mock_price.return_value = {"price_usd": 0.05, "description": "Test"}
-        app = _make_app(("POST", "/api/v1/data/manifest", upload_manifest))
-        client = TestClient(app)
-        response = client.post("/api/v1/data/manifest")
+
+@pytest.mark.usefixtures("ok_balance", "mock_price_quote")
+class TestProtectedEndpoints:
+    """Test all protected endpoints are properly gated."""
+
+    @pytest.mark.parametrize("path", ["/api/v1/stamps/", "/api/v1/data/", "/api/v1/data/manifest"])
+    def test_endpoint_protected(self, path, client):
+        response = client.post(path)
         assert response.status_code == 402
 
 
+@pytest.mark.usefixtures("ok_balance", "mock_price_quote")
 class TestEndToEndScenarios:
     """Test complete end-to-end scenarios."""
 
-    def setup_method(self):
-        reset_rate_limiter()
-
-    def teardown_method(self):
-        reset_rate_limiter()
-
-    @patch("app.x402.dependency.check_base_eth_balance", return_value=OK_BALANCE)
-    @patch("app.x402.dependency._get_facilitator_client")
-    @patch("app.x402.dependency.get_price_quote")
-    @patch("app.x402.middleware.settings")
-    @patch("app.x402.dependency.settings")
-    def test_gateway_operator_workflow(self, mock_dep, mock_mw, mock_price, mock_get_fac, mock_balance):
+    def test_gateway_operator_workflow(self, simple_client, paid_client, settings_ns):
         # Step 1: x402 disabled
-        mock_mw.X402_ENABLED = False
-        app = _make_simple_app(("POST", "/api/v1/stamps/", create_stamp))
-        client = TestClient(app)
-        response = client.post("/api/v1/stamps/")
+        settings_ns.X402_ENABLED = False
+        response = simple_client.post("/api/v1/stamps/")
         assert response.status_code == 200
 
         # Step 2: Enable x402
-        _configure(mock_dep, mock_mw, free_tier=False)
-        mock_dep.X402_FACILITATOR_URL = "https://x402.org/facilitator"
-        mock_price.return_value = {"price_usd": 0.05, "description": "Test"}
-
-        mock_fac = MagicMock()
-        mock_fac.verify = AsyncMock(return_value=VerifyResponse(
-            is_valid=True, invalid_reason=None,
-            payer="0x1234567890abcdef1234567890abcdef12345678"
-        ))
-        mock_get_fac.return_value = mock_fac
-
-        mock_mw_fac = MagicMock()
-        mock_mw_fac.settle = AsyncMock(return_value=SettleResponse(
-            success=True, transaction="0x" + "ab" * 32, network="base-sepolia"
-        ))
-
-        app2 = _make_app(
-            ("POST", "/api/v1/stamps/", create_stamp),
-            facilitator_client=mock_mw_fac,
-        )
-        client2 = TestClient(app2)
+        settings_ns.X402_ENABLED = True
 
         # Step 3: Without payment, get 402
-        response = client2.post("/api/v1/stamps/")
+        response = paid_client.post("/api/v1/stamps/")
         assert response.status_code == 402
 
         # Step 4: With payment, succeed
-        payment_header = create_valid_payment_header()
-        response = client2.post("/api/v1/stamps/", headers={"X-PAYMENT": payment_header})
+        response = paid_client.post("/api/v1/stamps/", headers={"X-PAYMENT": DEFAULT_PAYMENT_HEADER})
         assert response.status_code == 200
 
-    @patch("app.x402.dependency.check_base_eth_balance", return_value=OK_BALANCE)
-    @patch("app.x402.dependency.get_price_quote")
-    @patch("app.x402.middleware.settings")
-    @patch("app.x402.dependency.settings")
-    def test_price_varies_by_endpoint(self, mock_dep, mock_mw, mock_price, mock_balance):
-        _configure(mock_dep, mock_mw, free_tier=False)
-
-        app = _make_app(
-            ("POST", "/api/v1/stamps/", create_stamp),
-            ("POST", "/api/v1/data/", upload_data),
-        )
-        client = TestClient(app)
-
-        mock_price.return_value = {"price_usd": 0.10, "description": "Stamp"}
-        response = client.post("/api/v1/stamps/")
-        stamp_price = int(response.json()["detail"]["accepts"][0]["maxAmountRequired"])
-
-        mock_price.return_value = {"price_usd": 0.05, "description": "Upload"}
-        response = client.post("/api/v1/data/")
-        data_price = int(response.json()["detail"]["accepts"][0]["maxAmountRequired"])
-
-        assert stamp_price == 100000
-        assert data_price == 50000
+    @pytest.mark.parametrize("path,price_usd,units", [
+        ("/api/v1/stamps/", 0.10, 100000),
+        ("/api/v1/data/", 0.05, 50000),
+    ])
+    def test_price_varies_by_endpoint(self, path, price_usd, units, client, mock_price_quote):
+        mock_price_quote.return_value = {"price_usd": price_usd, "description": "Test"}
+        response = client.post(path)
+        assert int(response.json()["detail"]["accepts"][0]["maxAmountRequired"]) == units
 
 
 class TestHealthEndpointWithX402:
@@ -717,56 +632,42 @@ class TestHealthEndpointWithX402:
         assert response["x402"]["base_wallet"]["address"] == test_address
 
 
+@pytest.mark.usefixtures("mock_price_quote")
 class TestMiddlewareWithCriticalBalance:
     """Test dependency blocks requests when balance is critical."""
 
     def setup_method(self):
-        reset_rate_limiter()
         from app.x402.base_balance import clear_balance_cache
         clear_balance_cache()
 
     def teardown_method(self):
-        reset_rate_limiter()
         from app.x402.base_balance import clear_balance_cache
         clear_balance_cache()
 
     @patch("app.x402.dependency.check_base_eth_balance")
-    @patch("app.x402.dependency.get_price_quote")
-    @patch("app.x402.middleware.settings")
-    @patch("app.x402.dependency.settings")
-    def test_critical_balance_returns_503(self, mock_dep, mock_mw, mock_price, mock_base_balance):
-        _configure(mock_dep, mock_mw, free_tier=False)
+    def test_critical_balance_returns_503(self, mock_base_balance, client):
         mock_base_balance.return_value = {
             "ok": False, "is_critical": True,
             "balance_wei": int(0.0005 * 10**18), "balance_eth": 0.0005,
             "threshold_eth": 0.005, "critical_eth": 0.001,
             "address": "0xpayee", "warning": "Base wallet ETH critically low"
         }
-        mock_price.return_value = {"price_usd": 0.05, "description": "Test"}
 
-        app = _make_app(("POST", "/api/v1/stamps/", create_stamp))
-        client = TestClient(app)
         response = client.post("/api/v1/stamps/")
 
         assert response.status_code == 503
-        assert "temporarily unavailable" in response.json()["detail"]["error"]
-        assert response.json()["detail"]["x402_status"] == "critical"
+        detail = response.json()["detail"]
+        assert "temporarily unavailable" in detail["error"]
+        assert detail["x402_status"] == "critical"
 
     @patch("app.x402.dependency.check_base_eth_balance")
-    @patch("app.x402.dependency.get_price_quote")
-    @patch("app.x402.middleware.settings")
-    @patch("app.x402.dependency.settings")
-    def test_warning_balance_allows_requests(self, mock_dep, mock_mw, mock_price, mock_base_balance):
-        _configure(mock_dep, mock_mw, free_tier=False)
+    def test_warning_balance_allows_requests(self, mock_base_balance, client):
         mock_base_balance.return_value = {
             "ok": False, "is_critical": False,
             "balance_wei": int(0.003 * 10**18), "balance_eth": 0.003,
             "threshold_eth": 0.005, "critical_eth": 0.001,
             "address": "0xpayee", "warning": "Base wallet ETH below warning threshold"
         }
-        mock_price.return_value = {"price_usd": 0.05, "description": "Test"}
 
-        app = _make_app(("POST", "/api/v1/stamps/", create_stamp))
-        client = TestClient(app)
         response = client.post("/api/v1/stamps/")
         assert response.status_code == 402
@@ -10,12 +10,15 @@ Tests cover:
 """
 import json
 import pytest
+from dataclasses import dataclass
 from unittest.mock import patch, MagicMock, AsyncMock
 from base64 import b64encode
 
 from fastapi import FastAPI, Request, Depends, APIRouter
 from fastapi.testclient import TestClient
+from pydantic import ValidationError
 from starlette.responses import JSONResponse
+from x402.types import PaymentRequirements
 
 from app.x402.middleware import (
     X402Middleware,
@@ -25,6 +28,10 @@ from app.x402.middleware import (
     create_402_response,
     decode_payment_header,
     encode_payment_response,
+    get_facilitator_client,
+    get_payment_headers,
+    reset_facilitator_client,
+    PooledFacilitatorClient,
     X402_VERSION,
     X_PAYMENT_HEADER,
     X_PAYMENT_RESPONSE_HEADER,
@@ -48,6 +55,12 @@ OK_BALANCE = {
 }
 
 
+@dataclass
+class _FakeRequest:
+    """Stand-in for Request where only the URL is read."""
+    url: str
+
+
 def _make_app(*routes):
     """Create a FastAPI app with x402 dependency and middleware.
 
@@ -64,18 +77,51 @@ def _make_app(*routes):
     return app
 
 
-def _configure_dep(mock_dep, mock_mw, *, free_tier=False, balance=None):
-    """Set common mock values on both dependency and middleware settings mocks."""
-    mock_dep.X402_ENABLED = True
-    mock_dep.X402_NETWORK = "base-sepolia"
-    mock_dep.X402_PAY_TO_ADDRESS = "0x1234"
-    mock_dep.X402_MIN_PRICE_USD = 0.01
-    mock_dep.X402_FREE_TIER_ENABLED = free_tier
-    mock_dep.X402_FREE_TIER_RATE_LIMIT = 3
+async def _upload_data():
+    return {"status": "uploaded"}
+
+
+async def _purchase_stamp():
+    return {"status": "purchased"}
+
+
+async def _download_data(reference: str):
+    return {"reference": reference}
+
+
+# Settings are read at request time, so one app serves every flow test;
+# each test still patches the settings it needs
+@pytest.fixture(scope="module")
+def client():
+    """Client for an app with the x402 dependency and middleware."""
+    app = _make_app(
+        ("POST", "/api/v1/data/", _upload_data),
+        ("POST", "/api/v1/stamps/", _purchase_stamp),
+        ("GET", "/api/v1/data/{reference}", _download_data),
+    )
+    with TestClient(app) as c:
+        yield c
+
+
+# Settings shared by the dependency and middleware mocks in flow tests
+_BASE_SETTINGS = {
+    "X402_ENABLED": True,
+    "X402_FACILITATOR_URL": "https://x402.org/facilitator",
+    "X402_NETWORK": "base-sepolia",
+    "X402_PAY_TO_ADDRESS": "0x1234",
+    "X402_MIN_PRICE_USD": 0.01,
+    "X402_FREE_TIER_RATE_LIMIT": 3,
+}
+
+
+def _configure_dep(mock_dep, mock_mw, *, free_tier=False, **overrides):
+    """Set common mock values on both dependency and middleware settings mocks.
 
-    mock_mw.X402_ENABLED = True
-    mock_mw.X402_NETWORK = "base-sepolia"
-    mock_mw.X402_PAY_TO_ADDRESS = "0x1234"
+    Keyword overrides replace entries of _BASE_SETTINGS on both mocks.
+    """
+    values = {**_BASE_SETTINGS, "X402_FREE_TIER_ENABLED": free_tier, **overrides}
+    mock_dep.configure_mock(**values)
+    mock_mw.configure_mock(**values)
 
 
 class TestIsProtectedEndpoint:
@@ -110,40 +156,65 @@ class TestIsProtectedEndpoint:
 class TestGetClientIP:
     """Test client IP extraction."""
 
+    @staticmethod
+    def _scope(headers=None, client=None):
+        return {
+            "type": "http",
+            "headers": [
+                (name.lower().encode("latin-1"), value.encode("latin-1"))
+                for name, value in (headers or {}).items()
+            ],
+            "client": client,
+        }
+
     def test_forwarded_for_header(self):
-        request = MagicMock(spec=Request)
-        request.headers = {"X-Forwarded-For": "203.0.113.50, 70.41.3.18"}
-        request.client = None
-        assert get_client_ip(request) == "203.0.113.50"
+        scope = self._scope({"X-Forwarded-For": "203.0.113.50, 70.41.3.18"})
+        assert get_client_ip(scope) == "203.0.113.50"
 
     def test_real_ip_header(self):
-        request = MagicMock(spec=Request)
-        request.headers = {"X-Real-IP": "203.0.113.50"}
-        request.client = None
-        assert get_client_ip(request) == "203.0.113.50"
+        scope = self._scope({"X-Real-IP": "203.0.113.50"})
+        assert get_client_ip(scope) == "203.0.113.50"
 
     def test_direct_connection(self):
-        request = MagicMock(spec=Request)
-        request.headers = {}
-        request.client = MagicMock()
-        request.client.host = "192.168.1.100"
-        assert get_client_ip(request) == "192.168.1.100"
+        scope = self._scope(client=("192.168.1.100", 54321))
+        assert get_client_ip(scope) == "192.168.1.100"
 
     def test_no_client_info(self):
-        request = MagicMock(spec=Request)
-        request.headers = {}
-        request.client = None
-        assert get_client_ip(request) == "unknown"
+        scope = self._scope()
+        assert get_client_ip(scope) == "unknown"
 
     def test_forwarded_for_takes_precedence(self):
-        request = MagicMock(spec=Request)
-        request.headers = {
-            "X-Forwarded-For": "203.0.113.50",
-            "X-Real-IP": "10.0.0.1"
-        }
-        request.client = MagicMock()
-        request.client.host = "192.168.1.100"
-        assert get_client_ip(request) == "203.0.113.50"
+        scope = self._scope(
+            {
+                "X-Real-IP": "10.0.0.1",
+                "X-Forwarded-For": "203.0.113.50",
+            },
+            client=("192.168.1.100", 54321),
+        )
+        assert get_client_ip(scope) == "203.0.113.50"
+
+    def test_request_scope(self):
+        request = Request(self._scope({"X-Forwarded-For": " 203.0.113.50 "}))
+        assert get_client_ip(request.scope) == "203.0.113.50"
+
+
+class TestGetPaymentHeaders:
+    """Test X-PAYMENT / X-Payment-Mode extraction from the raw scope."""
+
+    def test_both_headers(self):
+        scope = {"headers": [
+            (b"content-type", b"application/json"),
+            (b"x-payment", b"abc123"),
+            (b"x-payment-mode", b"FREE"),
+        ]}
+        assert get_payment_headers(scope) == ("abc123", "free")
+
+    def test_missing_headers(self):
+        assert get_payment_headers({"headers": []}) == (None, "")
+
+    def test_first_occurrence_wins(self):
+        scope = {"headers": [(b"x-payment", b"first"), (b"x-payment", b"second")]}
+        assert get_payment_headers(scope) == ("first", "")
 
 
 class TestCreatePaymentRequirements:
@@ -154,9 +225,7 @@ class TestCreatePaymentRequirements:
         mock_settings.X402_NETWORK = "base-sepolia"
         mock_settings.X402_PAY_TO_ADDRESS = "0x1234567890abcdef1234567890abcdef12345678"
 
-        request = MagicMock(spec=Request)
-        request.url = MagicMock()
-        request.url.__str__ = MagicMock(return_value="https://gateway.example.com/api/v1/data/")
+        request = _FakeRequest(url="https://gateway.example.com/api/v1/data/")
 
         result = create_payment_requirements(request=request, price_usd=0.05, description="Test upload")
 
@@ -173,21 +242,35 @@ class TestCreatePaymentRequirements:
         mock_settings.X402_NETWORK = "base-sepolia"
         mock_settings.X402_PAY_TO_ADDRESS = None
 
-        request = MagicMock(spec=Request)
-        request.url = MagicMock()
-        request.url.__str__ = MagicMock(return_value="https://gateway.example.com/api/v1/data/")
+        request = _FakeRequest(url="https://gateway.example.com/api/v1/data/")
 
         result = create_payment_requirements(request=request, price_usd=0.01, description="Test")
         assert result.pay_to == "0x0000000000000000000000000000000000000000"
 
+    @patch("app.x402.middleware.settings")
+    def test_matches_validated_model(self, mock_settings):
+        mock_settings.X402_NETWORK = "base"
+        mock_settings.X402_PAY_TO_ADDRESS = "0x1234"
+
+        result = create_payment_requirements(_FakeRequest(url="https://example.com"), 0.05, "Test")
+        validated = PaymentRequirements.model_validate(result.model_dump())
+
+        assert result.model_dump(by_alias=True) == validated.model_dump(by_alias=True)
+
+    @patch("app.x402.middleware.settings")
+    def test_unsupported_network_rejected(self, mock_settings):
+        mock_settings.X402_NETWORK = "not-a-network"
+        mock_settings.X402_PAY_TO_ADDRESS = "0x1234"
+
+        with pytest.raises(ValidationError):
+            create_payment_requirements(_FakeRequest(url="https://example.com"), 0.05, "Test")
+
     @patch("app.x402.middleware.settings")
     def test_usd_to_usdc_conversion(self, mock_settings):
         mock_settings.X402_NETWORK = "base-sepolia"
         mock_settings.X402_PAY_TO_ADDRESS = "0x1234"
 
-        request = MagicMock(spec=Request)
-        request.url = MagicMock()
-        request.url.__str__ = MagicMock(return_value="https://example.com")
+        request = _FakeRequest(url="https://example.com")
 
         result = create_payment_requirements(request, price_usd=1.0, description="Test")
         assert result.max_amount_required == "1000000"
@@ -195,6 +278,21 @@ class TestCreatePaymentRequirements:
         result = create_payment_requirements(request, price_usd=0.01, description="Test")
         assert result.max_amount_required == "10000"
 
+    @pytest.mark.parametrize("price_usd,expected", [
+        (0.05, "50000"),
+        (0.000249, "249"),
+        (0.000493, "493"),
+        (1.000001, "1000001"),
+        (2, "2000000"),
+    ])
+    @patch("app.x402.middleware.settings")
+    def test_usd_to_usdc_conversion_exact(self, mock_settings, price_usd, expected):
+        mock_settings.X402_NETWORK = "base-sepolia"
+        mock_settings.X402_PAY_TO_ADDRESS = "0x1234"
+
+        result = create_payment_requirements(_FakeRequest(url="https://example.com"), price_usd, "Test")
+        assert result.max_amount_required == expected
+
 
 class TestCreate402Response:
     """Test 402 response generation."""
@@ -204,9 +302,7 @@ class TestCreate402Response:
         mock_settings.X402_NETWORK = "base-sepolia"
         mock_settings.X402_PAY_TO_ADDRESS = "0x1234"
 
-        request = MagicMock(spec=Request)
-        request.url = MagicMock()
-        request.url.__str__ = MagicMock(return_value="https://example.com")
+        request = _FakeRequest(url="https://example.com")
 
         payment_req = create_payment_requirements(request, 0.05, "Test")
         response = create_402_response(payment_req, "Payment required")
@@ -221,6 +317,26 @@ class TestCreate402Response:
         assert len(body["accepts"]) == 1
 
 
+    @pytest.mark.parametrize("url,description", [
+        ("https://example.com/api/v1/data/", "Data upload (1024 bytes, 24h)"),
+        ('https://example.com/api/v1/data/?name="a b"', 'Quoted "name" \\ ünïcode'),
+    ])
+    @patch("app.x402.middleware.settings")
+    def test_402_body_matches_model_dump(self, mock_settings, url, description):
+        mock_settings.X402_NETWORK = "base-sepolia"
+        mock_settings.X402_PAY_TO_ADDRESS = "0x1234"
+
+        payment_req = create_payment_requirements(_FakeRequest(url=url), 0.05, description)
+        response = create_402_response(payment_req, 'Payment "required"')
+
+        assert json.loads(response.body) == {
+            "x402Version": X402_VERSION,
+            "error": 'Payment "required"',
+            "accepts": [payment_req.model_dump(by_alias=True)],
+        }
+        assert response.headers["content-length"] == str(len(response.body))
+
+
 class TestDecodePaymentHeader:
     """Test X-PAYMENT header decoding."""
 
@@ -277,22 +393,90 @@ class TestEncodePaymentResponse:
         assert decoded["network"] == "base-sepolia"
 
 
+class TestFreeTierHeaders:
+    """Test raw free-tier response headers."""
+
+    @pytest.mark.parametrize("stats", [
+        {"limit": 5, "remaining": 4, "window_seconds": 60},
+        {"limit": 5000, "remaining": 4999, "window_seconds": 3600},
+        {},
+    ])
+    def test_match_rate_limit_headers(self, stats):
+        from app.x402.middleware import _free_tier_headers
+        from app.x402.ratelimit import get_rate_limit_headers
+
+        raw = {name.decode(): value.decode() for name, value in _free_tier_headers(stats)}
+        expected = {name.lower(): value for name, value in get_rate_limit_headers(stats).items()}
+        expected["x-payment-mode"] = "free-tier"
+        assert raw == expected
+
+
+class TestFacilitatorClientSingleton:
+    """Test the shared facilitator client."""
+
+    @pytest.fixture(autouse=True)
+    def _reset(self):
+        reset_facilitator_client()
+        yield
+        reset_facilitator_client()
+
+    @patch("app.x402.middleware.settings")
+    def test_client_is_reused(self, mock_settings):
+        mock_settings.X402_FACILITATOR_URL = "https://facilitator.example.com"
+
+        client = get_facilitator_client()
+
+        assert isinstance(client, PooledFacilitatorClient)
+        assert get_facilitator_client() is client
+        assert X402Middleware(MagicMock()).facilitator_client is client
+
+    @patch("app.x402.middleware.settings")
+    def test_url_change_rebuilds_client(self, mock_settings):
+        mock_settings.X402_FACILITATOR_URL = "https://one.example.com"
+        first = get_facilitator_client()
+
+        mock_settings.X402_FACILITATOR_URL = "https://two.example.com/"
+        second = get_facilitator_client()
+
+        assert second is not first
+        assert second.config["url"] == "https://two.example.com"
+
+    @pytest.mark.asyncio
+    @patch("app.x402.middleware.get_client")
+    async def test_settle_uses_shared_http_client(self, mock_get_client):
+        response = MagicMock()
+        response.json.return_value = {
+            "success": True,
+            "transaction": "0xabc",
+            "network": "base-sepolia",
+            "payer": "0x1234",
+        }
+        mock_get_client.return_value.post = AsyncMock(return_value=response)
+
+        client = PooledFacilitatorClient({"url": "https://facilitator.example.com/"})
+        payment = MagicMock()
+        payment.x402_version = 1
+        payment.model_dump.return_value = {}
+        requirements = MagicMock()
+        requirements.model_dump.return_value = {}
+
+        result = await client.settle(payment, requirements)
+
+        assert result.success is True
+        mock_get_client.return_value.post.assert_awaited_once()
+        url = mock_get_client.return_value.post.await_args.args[0]
+        assert url == "https://facilitator.example.com/settle"
+
+
 class TestX402MiddlewareFlow:
     """Test middleware and dependency integration flow."""
 
     @patch("app.x402.middleware.settings")
-    def test_disabled_middleware_passes_through(self, mock_settings):
+    @patch("app.x402.dependency.settings")
+    def test_disabled_middleware_passes_through(self, mock_dep, mock_mw, client):
         """When X402_ENABLED=false, all requests pass through."""
-        mock_settings.X402_ENABLED = False
+        _configure_dep(mock_dep, mock_mw, X402_ENABLED=False)
 
-        app = FastAPI()
-        app.add_middleware(X402Middleware)
-
-        @app.post("/api/v1/data/")
-        async def upload_data():
-            return {"status": "uploaded"}
-
-        client = TestClient(app)
         response = client.post("/api/v1/data/")
         assert response.status_code == 200
         assert response.json() == {"status": "uploaded"}
@@ -300,15 +484,10 @@ class TestX402MiddlewareFlow:
     @patch("app.x402.dependency.check_base_eth_balance", return_value=OK_BALANCE)
     @patch("app.x402.middleware.settings")
     @patch("app.x402.dependency.settings")
-    def test_unprotected_endpoint_passes_through(self, mock_dep, mock_mw, mock_balance):
+    def test_unprotected_endpoint_passes_through(self, mock_dep, mock_mw, mock_balance, client):
         """Unprotected endpoints pass through even when x402 enabled."""
         _configure_dep(mock_dep, mock_mw)
 
-        async def download_data(reference: str):
-            return {"reference": reference}
-
-        app = _make_app(("GET", "/api/v1/data/{reference}", download_data))
-        client = TestClient(app)
         response = client.get("/api/v1/data/abc123")
         assert response.status_code == 200
         assert response.json() == {"reference": "abc123"}
@@ -317,16 +496,11 @@ class TestX402MiddlewareFlow:
     @patch("app.x402.dependency.get_price_quote")
     @patch("app.x402.middleware.settings")
     @patch("app.x402.dependency.settings")
-    def test_protected_endpoint_returns_402_without_payment(self, mock_dep, mock_mw, mock_price, mock_balance):
+    def test_protected_endpoint_returns_402_without_payment(self, mock_dep, mock_mw, mock_price, mock_balance, client):
         """Protected endpoint returns 402 without X-PAYMENT header when free tier disabled."""
         _configure_dep(mock_dep, mock_mw, free_tier=False)
         mock_price.return_value = {"price_usd": 0.05, "description": "Data upload"}
 
-        async def upload_data():
-            return {"status": "uploaded"}
-
-        app = _make_app(("POST", "/api/v1/data/", upload_data))
-        client = TestClient(app)
         response = client.post("/api/v1/data/")
 
         assert response.status_code == 402
@@ -339,16 +513,11 @@ class TestX402MiddlewareFlow:
     @patch("app.x402.dependency.get_price_quote")
     @patch("app.x402.middleware.settings")
     @patch("app.x402.dependency.settings")
-    def test_invalid_payment_header_returns_402(self, mock_dep, mock_mw, mock_price, mock_balance):
+    def test_invalid_payment_header_returns_402(self, mock_dep, mock_mw, mock_price, mock_balance, client):
         """Invalid X-PAYMENT header returns 402."""
         _configure_dep(mock_dep, mock_mw)
         mock_price.return_value = {"price_usd": 0.05, "description": "Data upload"}
 
-        async def upload_data():
-            return {"status": "uploaded"}
-
-        app = _make_app(("POST", "/api/v1/data/", upload_data))
-        client = TestClient(app)
         response = client.post("/api/v1/data/", headers={X_PAYMENT_HEADER: "invalid-base64!!!"})
 
         assert response.status_code == 402
@@ -360,10 +529,9 @@ class TestX402MiddlewareFlow:
     @patch("app.x402.dependency.get_price_quote")
     @patch("app.x402.middleware.settings")
     @patch("app.x402.dependency.settings")
-    def test_verification_failure_returns_402(self, mock_dep, mock_mw, mock_price, mock_get_fac, mock_balance):
+    def test_verification_failure_returns_402(self, mock_dep, mock_mw, mock_price, mock_get_fac, mock_balance, client):
         """Payment verification failure returns 402."""
         _configure_dep(mock_dep, mock_mw)
-        mock_dep.X402_FACILITATOR_URL = "https://x402.org/facilitator"
         mock_price.return_value = {"price_usd": 0.05, "description": "Data upload"}
 
         from x402.types import VerifyResponse
@@ -373,12 +541,6 @@ class TestX402MiddlewareFlow:
         ))
         mock_get_fac.return_value = mock_fac
 
-        async def upload_data():
-            return {"status": "uploaded"}
-
-        app = _make_app(("POST", "/api/v1/data/", upload_data))
-        client = TestClient(app)
-
         payload = {
             "x402Version": 1, "scheme": "exact", "network": "base-sepolia",
             "payload": {
@@ -406,15 +568,10 @@ class TestMiddlewarePriceCalculation:
     @patch("app.x402.dependency.get_price_quote")
     @patch("app.x402.middleware.settings")
     @patch("app.x402.dependency.settings")
-    def test_stamps_endpoint_pricing(self, mock_dep, mock_mw, mock_price, mock_balance):
+    def test_stamps_endpoint_pricing(self, mock_dep, mock_mw, mock_price, mock_balance, client):
         _configure_dep(mock_dep, mock_mw, free_tier=False)
         mock_price.return_value = {"price_usd": 1.50, "description": "Stamp purchase"}
 
-        async def purchase_stamp():
-            return {"status": "purchased"}
-
-        app = _make_app(("POST", "/api/v1/stamps/", purchase_stamp))
-        client = TestClient(app)
         response = client.post("/api/v1/stamps/")
 
         assert response.status_code == 402
@@ -426,15 +583,10 @@ class TestMiddlewarePriceCalculation:
     @patch("app.x402.dependency.get_price_quote")
     @patch("app.x402.middleware.settings")
     @patch("app.x402.dependency.settings")
-    def test_data_endpoint_uses_content_length(self, mock_dep, mock_mw, mock_price, mock_balance):
+    def test_data_endpoint_uses_content_length(self, mock_dep, mock_mw, mock_price, mock_balance, client):
         _configure_dep(mock_dep, mock_mw, free_tier=False)
         mock_price.return_value = {"price_usd": 0.10, "description": "Data upload"}
 
-        async def upload_data():
-            return {"status": "uploaded"}
-
-        app = _make_app(("POST", "/api/v1/data/", upload_data))
-        client = TestClient(app)
         response = client.post("/api/v1/data/", headers={"Content-Length": "10240"})
 
         assert response.status_code == 402
@@ -515,15 +667,10 @@ class TestFreeTierAccess:
     @patch("app.x402.dependency.get_price_quote")
     @patch("app.x402.middleware.settings")
     @patch("app.x402.dependency.settings")
-    def test_free_tier_allows_access_without_payment(self, mock_dep, mock_mw, mock_price, mock_balance):
+    def test_free_tier_allows_access_without_payment(self, mock_dep, mock_mw, mock_price, mock_balance, client):
         _configure_dep(mock_dep, mock_mw, free_tier=True)
         mock_price.return_value = {"price_usd": 0.05, "description": "Data upload"}
 
-        async def upload_data():
-            return {"status": "uploaded"}
-
-        app = _make_app(("POST", "/api/v1/data/", upload_data))
-        client = TestClient(app)
         response = client.post("/api/v1/data/", headers={"X-Payment-Mode": "free"})
 
         assert response.status_code == 200
@@ -537,19 +684,11 @@ class TestFreeTierAccess:
     @patch("app.x402.dependency.get_price_quote")
     @patch("app.x402.middleware.settings")
     @patch("app.x402.dependency.settings")
-    def test_free_tier_rate_limit_enforced(self, mock_dep, mock_mw, mock_price, mock_rl, mock_balance):
-        _configure_dep(mock_dep, mock_mw, free_tier=True)
-        mock_dep.X402_FREE_TIER_RATE_LIMIT = 2
-        mock_rl.X402_FREE_TIER_RATE_LIMIT = 2
-        mock_rl.X402_RATE_LIMIT_PER_IP = 10
+    def test_free_tier_rate_limit_enforced(self, mock_dep, mock_mw, mock_price, mock_rl, mock_balance, client):
+        _configure_dep(mock_dep, mock_mw, free_tier=True, X402_FREE_TIER_RATE_LIMIT=2)
+        mock_rl.configure_mock(X402_FREE_TIER_RATE_LIMIT=2, X402_RATE_LIMIT_PER_IP=10)
         mock_price.return_value = {"price_usd": 0.05, "description": "Data upload"}
 
-        async def upload_data():
-            return {"status": "uploaded"}
-
-        app = _make_app(("POST", "/api/v1/data/", upload_data))
-        client = TestClient(app)
-
         for i in range(2):
             response = client.post("/api/v1/data/", headers={"X-Payment-Mode": "free"})
             assert response.status_code == 200, f"Request {i+1} should succeed"
@@ -566,15 +705,10 @@ class TestFreeTierAccess:
     @patch("app.x402.dependency.get_price_quote")
     @patch("app.x402.middleware.settings")
     @patch("app.x402.dependency.settings")
-    def test_free_tier_disabled_returns_402(self, mock_dep, mock_mw, mock_price, mock_balance):
+    def test_free_tier_disabled_returns_402(self, mock_dep, mock_mw, mock_price, mock_balance, client):
         _configure_dep(mock_dep, mock_mw, free_tier=False)
         mock_price.return_value = {"price_usd": 0.05, "description": "Data upload"}
 
-        async def upload_data():
-            return {"status": "uploaded"}
-
-        app = _make_app(("POST", "/api/v1/data/", upload_data))
-        client = TestClient(app)
         response = client.post("/api/v1/data/")
         assert response.status_code == 402
 
@@ -583,18 +717,11 @@ class TestFreeTierAccess:
     @patch("app.x402.dependency.get_price_quote")
     @patch("app.x402.middleware.settings")
     @patch("app.x402.dependency.settings")
-    def test_free_tier_rate_limit_headers_present(self, mock_dep, mock_mw, mock_price, mock_rl, mock_balance):
-        _configure_dep(mock_dep, mock_mw, free_tier=True)
-        mock_dep.X402_FREE_TIER_RATE_LIMIT = 5
-        mock_rl.X402_FREE_TIER_RATE_LIMIT = 5
-        mock_rl.X402_RATE_LIMIT_PER_IP = 10
+    def test_free_tier_rate_limit_headers_present(self, mock_dep, mock_mw, mock_price, mock_rl, mock_balance, client):
+        _configure_dep(mock_dep, mock_mw, free_tier=True, X402_FREE_TIER_RATE_LIMIT=5)
+        mock_rl.configure_mock(X402_FREE_TIER_RATE_LIMIT=5, X402_RATE_LIMIT_PER_IP=10)
         mock_price.return_value = {"price_usd": 0.05, "description": "Data upload"}
 
-        async def upload_data():
-            return {"status": "uploaded"}
-
-        app = _make_app(("POST", "/api/v1/data/", upload_data))
-        client = TestClient(app)
         response = client.post("/api/v1/data/", headers={"X-Payment-Mode": "free"})
 
         assert response.status_code == 200
@@ -607,21 +734,14 @@ class TestFreeTierAccess:
     @patch("app.x402.dependency.get_price_quote")
     @patch("app.x402.middleware.settings")
     @patch("app.x402.dependency.settings")
-    def test_free_tier_429_includes_upgrade_info(self, mock_dep, mock_mw, mock_price, mock_rl, mock_balance):
-        _configure_dep(mock_dep, mock_mw, free_tier=True)
-        mock_dep.X402_FREE_TIER_RATE_LIMIT = 1
-        mock_dep.X402_PAY_TO_ADDRESS = "0xPaymentWallet"
-        mock_mw.X402_PAY_TO_ADDRESS = "0xPaymentWallet"
-        mock_rl.X402_FREE_TIER_RATE_LIMIT = 1
-        mock_rl.X402_RATE_LIMIT_PER_IP = 10
+    def test_free_tier_429_includes_upgrade_info(self, mock_dep, mock_mw, mock_price, mock_rl, mock_balance, client):
+        _configure_dep(
+            mock_dep, mock_mw, free_tier=True,
+            X402_FREE_TIER_RATE_LIMIT=1, X402_PAY_TO_ADDRESS="0xPaymentWallet",
+        )
+        mock_rl.configure_mock(X402_FREE_TIER_RATE_LIMIT=1, X402_RATE_LIMIT_PER_IP=10)
         mock_price.return_value = {"price_usd": 0.10, "description": "Stamp purchase"}
 
-        async def purchase_stamp():
-            return {"status": "purchased"}
-
-        app = _make_app(("POST", "/api/v1/stamps/", purchase_stamp))
-        client = TestClient(app)
-
         response = client.post("/api/v1/stamps/", headers={"X-Payment-Mode": "free"})
         assert response.status_code == 200
 
@@ -639,22 +759,10 @@ class TestFreeTierAccess:
     @patch("app.x402.dependency.get_price_quote")
     @patch("app.x402.middleware.settings")
     @patch("app.x402.dependency.settings")
-    def test_different_endpoints_share_free_tier_limit(self, mock_dep, mock_mw, mock_price, mock_balance):
+    def test_different_endpoints_share_free_tier_limit(self, mock_dep, mock_mw, mock_price, mock_balance, client):
         _configure_dep(mock_dep, mock_mw, free_tier=True)
         mock_price.return_value = {"price_usd": 0.05, "description": "Operation"}
 
-        async def purchase_stamp():
-            return {"status": "purchased"}
-
-        async def upload_data():
-            return {"status": "uploaded"}
-
-        app = _make_app(
-            ("POST", "/api/v1/stamps/", purchase_stamp),
-            ("POST", "/api/v1/data/", upload_data),
-        )
-        client = TestClient(app)
-
         assert client.post("/api/v1/stamps/", headers={"X-Payment-Mode": "free"}).status_code == 200
         assert client.post("/api/v1/data/", headers={"X-Payment-Mode": "free"}).status_code == 200
         assert client.post("/api/v1/stamps/", headers={"X-Payment-Mode": "free"}).status_code == 200
@@ -667,19 +775,13 @@ class TestFreeTierAccess:
     @patch("app.x402.dependency.get_price_quote")
     @patch("app.x402.middleware.settings")
     @patch("app.x402.dependency.settings")
-    def test_402_response_includes_free_tier_info(self, mock_dep, mock_mw, mock_price, mock_rl, mock_balance):
-        _configure_dep(mock_dep, mock_mw, free_tier=True)
-        mock_dep.X402_FREE_TIER_RATE_LIMIT = 5
-        mock_rl.X402_FREE_TIER_ENABLED = True
-        mock_rl.X402_FREE_TIER_RATE_LIMIT = 5
-        mock_rl.X402_RATE_LIMIT_PER_IP = 10
+    def test_402_response_includes_free_tier_info(self, mock_dep, mock_mw, mock_price, mock_rl, mock_balance, client):
+        _configure_dep(mock_dep, mock_mw, free_tier=True, X402_FREE_TIER_RATE_LIMIT=5)
+        mock_rl.configure_mock(
+            X402_FREE_TIER_ENABLED=True, X402_FREE_TIER_RATE_LIMIT=5, X402_RATE_LIMIT_PER_IP=10,
+        )
         mock_price.return_value = {"price_usd": 0.05, "description": "Data upload"}
 
-        async def upload_data():
-            return {"status": "uploaded"}
-
-        app = _make_app(("POST", "/api/v1/data/", upload_data))
-        client = TestClient(app)
         response = client.post("/api/v1/data/")
 
         assert response.status_code == 402
@@ -695,15 +797,10 @@ class TestFreeTierAccess:
     @patch("app.x402.dependency.get_price_quote")
     @patch("app.x402.middleware.settings")
     @patch("app.x402.dependency.settings")
-    def test_402_response_no_free_tier_when_disabled(self, mock_dep, mock_mw, mock_price, mock_balance):
+    def test_402_response_no_free_tier_when_disabled(self, mock_dep, mock_mw, mock_price, mock_balance, client):
         _configure_dep(mock_dep, mock_mw, free_tier=False)
         mock_price.return_value = {"price_usd": 0.05, "description": "Data upload"}
 
-        async def upload_data():
-            return {"status": "uploaded"}
-
-        app = _make_app(("POST", "/api/v1/data/", upload_data))
-        client = TestClient(app)
         response = client.post("/api/v1/data/")
 
         assert response.status_code == 402
@@ -716,15 +813,10 @@ class TestFreeTierAccess:
     @patch("app.x402.dependency.get_price_quote")
     @patch("app.x402.middleware.settings")
     @patch("app.x402.dependency.settings")
-    def test_free_tier_request_disabled_returns_402(self, mock_dep, mock_mw, mock_price, mock_balance):
+    def test_free_tier_request_disabled_returns_402(self, mock_dep, mock_mw, mock_price, mock_balance, client):
         _configure_dep(mock_dep, mock_mw, free_tier=False)
         mock_price.return_value = {"price_usd": 0.05, "description": "Data upload"}
 
-        async def upload_data():
-            return {"status": "uploaded"}
-
-        app = _make_app(("POST", "/api/v1/data/", upload_data))
-        client = TestClient(app)
         response = client.post("/api/v1/data/", headers={"X-Payment-Mode": "free"})
 
         assert response.status_code == 402
@@ -3,7 +3,8 @@
 Unit tests for x402 pre-flight balance checks.
 """
 import pytest
-from unittest.mock import patch, MagicMock
+from types import MappingProxyType, SimpleNamespace
+from unittest.mock import patch, AsyncMock, DEFAULT
 
 from app.x402.preflight import (
     plur_to_bzz,
@@ -16,95 +17,114 @@ from app.x402.preflight import (
     WEI_PER_XDAI,
 )
 
+# Raw balance strings as returned by the Bee API
+BAL_2_BZZ_STR = str(2 * PLUR_PER_BZZ)
+BAL_5_BZZ_STR = str(5 * PLUR_PER_BZZ)
+BAL_10_BZZ_STR = str(10 * PLUR_PER_BZZ)
+BAL_15_BZZ_STR = str(15 * PLUR_PER_BZZ)
+BAL_20_BZZ_STR = str(20 * PLUR_PER_BZZ)
+WEI_1_XDAI_STR = str(WEI_PER_XDAI)
+WEI_0P1_XDAI_STR = str(WEI_PER_XDAI // 10)
+
+# Warning thresholds read by the individual balance checks
+PREFLIGHT_SETTINGS = SimpleNamespace(
+    X402_XBZZ_WARN_THRESHOLD=10.0,
+    X402_XDAI_WARN_THRESHOLD=0.5,
+    X402_CHEQUEBOOK_WARN_THRESHOLD=5.0,
+)
 
-class TestConversionFunctions:
-    """Test unit conversion functions."""
-
-    def test_plur_to_bzz_zero(self):
-        """Zero PLUR equals zero BZZ."""
-        assert plur_to_bzz(0) == 0.0
-
-    def test_plur_to_bzz_one_bzz(self):
-        """One BZZ worth of PLUR."""
-        assert plur_to_bzz(PLUR_PER_BZZ) == 1.0
-
-    def test_plur_to_bzz_fractional(self):
-        """Fractional BZZ values."""
-        assert plur_to_bzz(PLUR_PER_BZZ // 2) == 0.5
+# Bee API responses; read-only so tests can share them
+WALLET_20_BZZ = MappingProxyType({"walletAddress": "0x123", "bzzBalance": BAL_20_BZZ_STR})
+WALLET_5_BZZ = MappingProxyType({"walletAddress": "0x123", "bzzBalance": BAL_5_BZZ_STR})
+WALLET_10_BZZ = MappingProxyType({"walletAddress": "0x123", "bzzBalance": BAL_10_BZZ_STR})
+WALLET_1_XDAI = MappingProxyType({"walletAddress": "0x123", "nativeTokenBalance": WEI_1_XDAI_STR})
+WALLET_0P1_XDAI = MappingProxyType({"walletAddress": "0x123", "nativeTokenBalance": WEI_0P1_XDAI_STR})
+WALLET_NO_XDAI = MappingProxyType({"walletAddress": "0x123"})
+CHEQUEBOOK_10_OF_15_BZZ = MappingProxyType({
+    "chequebookAddress": "0xcheque123",
+    "availableBalance": BAL_10_BZZ_STR,
+    "totalBalance": BAL_15_BZZ_STR,
+})
+CHEQUEBOOK_2_OF_5_BZZ = MappingProxyType({
+    "chequebookAddress": "0xcheque123",
+    "availableBalance": BAL_2_BZZ_STR,
+    "totalBalance": BAL_5_BZZ_STR,
+})
 
-    def test_wei_to_xdai_zero(self):
-        """Zero wei equals zero xDAI."""
-        assert wei_to_xdai(0) == 0.0
 
-    def test_wei_to_xdai_one_xdai(self):
-        """One xDAI worth of wei."""
-        assert wei_to_xdai(WEI_PER_XDAI) == 1.0
+class TestConversionFunctions:
+    """Test unit conversion functions."""
 
-    def test_wei_to_xdai_fractional(self):
-        """Fractional xDAI values."""
-        assert wei_to_xdai(WEI_PER_XDAI // 2) == 0.5
+    @pytest.mark.parametrize("plur,bzz", [
+        (0, 0.0),
+        (PLUR_PER_BZZ, 1.0),
+        (PLUR_PER_BZZ // 2, 0.5),
+    ], ids=["zero", "one_bzz", "fractional"])
+    def test_plur_to_bzz(self, plur, bzz):
+        """Convert PLUR to BZZ."""
+        assert plur_to_bzz(plur) == bzz
+
+    @pytest.mark.parametrize("wei,xdai", [
+        (0, 0.0),
+        (WEI_PER_XDAI, 1.0),
+        (WEI_PER_XDAI // 2, 0.5),
+    ], ids=["zero", "one_xdai", "fractional"])
+    def test_wei_to_xdai(self, wei, xdai):
+        """Convert wei to xDAI."""
+        assert wei_to_xdai(wei) == xdai
 
 
 class TestCheckXBZZBalance:
     """Test xBZZ balance checks."""
 
-    @patch("app.x402.preflight.get_wallet_info")
-    @patch("app.x402.preflight.settings")
-    def test_xbzz_above_threshold(self, mock_settings, mock_get_wallet):
+    @pytest.mark.asyncio
+    @patch("app.x402.preflight.get_wallet_info", new_callable=AsyncMock)
+    @patch("app.x402.preflight.settings", PREFLIGHT_SETTINGS)
+    async def test_xbzz_above_threshold(self, mock_get_wallet):
         """xBZZ balance above threshold returns ok=True."""
-        mock_settings.X402_XBZZ_WARN_THRESHOLD = 10.0
-        mock_get_wallet.return_value = {
-            "walletAddress": "0x123",
-            "bzzBalance": str(20 * PLUR_PER_BZZ)  # 20 BZZ
-        }
+        mock_get_wallet.return_value = WALLET_20_BZZ
 
-        result = check_xbzz_balance()
+        result = await check_xbzz_balance()
 
         assert result["ok"] is True
         assert result["balance_bzz"] == 20.0
         assert result["threshold_bzz"] == 10.0
         assert result["warning"] is None
 
-    @patch("app.x402.preflight.get_wallet_info")
-    @patch("app.x402.preflight.settings")
-    def test_xbzz_below_threshold(self, mock_settings, mock_get_wallet):
+    @pytest.mark.asyncio
+    @patch("app.x402.preflight.get_wallet_info", new_callable=AsyncMock)
+    @patch("app.x402.preflight.settings", PREFLIGHT_SETTINGS)
+    async def test_xbzz_below_threshold(self, mock_get_wallet):
         """xBZZ balance below threshold returns ok=False with warning."""
-        mock_settings.X402_XBZZ_WARN_THRESHOLD = 10.0
-        mock_get_wallet.return_value = {
-            "walletAddress": "0x123",
-            "bzzBalance": str(5 * PLUR_PER_BZZ)  # 5 BZZ
-        }
+        mock_get_wallet.return_value = WALLET_5_BZZ
 
-        result = check_xbzz_balance()
+        result = await check_xbzz_balance()
 
         assert result["ok"] is False
         assert result["balance_bzz"] == 5.0
         assert result["threshold_bzz"] == 10.0
         assert "below threshold" in result["warning"]
 
-    @patch("app.x402.preflight.get_wallet_info")
-    @patch("app.x402.preflight.settings")
-    def test_xbzz_at_exact_threshold(self, mock_settings, mock_get_wallet):
+    @pytest.mark.asyncio
+    @patch("app.x402.preflight.get_wallet_info", new_callable=AsyncMock)
+    @patch("app.x402.preflight.settings", PREFLIGHT_SETTINGS)
+    async def test_xbzz_at_exact_threshold(self, mock_get_wallet):
         """xBZZ balance exactly at threshold returns ok=True."""
-        mock_settings.X402_XBZZ_WARN_THRESHOLD = 10.0
-        mock_get_wallet.return_value = {
-            "walletAddress": "0x123",
-            "bzzBalance": str(10 * PLUR_PER_BZZ)  # 10 BZZ
-        }
+        mock_get_wallet.return_value = WALLET_10_BZZ
 
-        result = check_xbzz_balance()
+        result = await check_xbzz_balance()
 
         assert result["ok"] is True
         assert result["balance_bzz"] == 10.0
 
-    @patch("app.x402.preflight.get_wallet_info")
-    @patch("app.x402.preflight.settings")
-    def test_xbzz_api_error(self, mock_settings, mock_get_wallet):
+    @pytest.mark.asyncio
+    @patch("app.x402.preflight.get_wallet_info", new_callable=AsyncMock)
+    @patch("app.x402.preflight.settings", PREFLIGHT_SETTINGS)
+    async def test_xbzz_api_error(self, mock_get_wallet):
         """API error returns ok=False with error message."""
-        mock_settings.X402_XBZZ_WARN_THRESHOLD = 10.0
         mock_get_wallet.side_effect = Exception("Connection refused")
 
-        result = check_xbzz_balance()
+        result = await check_xbzz_balance()
 
         assert result["ok"] is False
         assert result["balance_bzz"] == 0.0
@@ -114,51 +134,42 @@ class TestCheckXBZZBalance:
 class TestCheckXDAIBalance:
     """Test xDAI balance checks."""
 
-    @patch("app.x402.preflight.get_wallet_info")
-    @patch("app.x402.preflight.settings")
-    def test_xdai_above_threshold(self, mock_settings, mock_get_wallet):
+    @pytest.mark.asyncio
+    @patch("app.x402.preflight.get_wallet_info", new_callable=AsyncMock)
+    @patch("app.x402.preflight.settings", PREFLIGHT_SETTINGS)
+    async def test_xdai_above_threshold(self, mock_get_wallet):
         """xDAI balance above threshold returns ok=True."""
-        mock_settings.X402_XDAI_WARN_THRESHOLD = 0.5
-        mock_get_wallet.return_value = {
-            "walletAddress": "0x123",
-            "nativeTokenBalance": str(int(1.0 * WEI_PER_XDAI))  # 1 xDAI
-        }
+        mock_get_wallet.return_value = WALLET_1_XDAI
 
-        result = check_xdai_balance()
+        result = await check_xdai_balance()
 
         assert result["ok"] is True
         assert result["balance_xdai"] == 1.0
         assert result["threshold_xdai"] == 0.5
         assert result["warning"] is None
 
-    @patch("app.x402.preflight.get_wallet_info")
-    @patch("app.x402.preflight.settings")
-    def test_xdai_below_threshold(self, mock_settings, mock_get_wallet):
+    @pytest.mark.asyncio
+    @patch("app.x402.preflight.get_wallet_info", new_callable=AsyncMock)
+    @patch("app.x402.preflight.settings", PREFLIGHT_SETTINGS)
+    async def test_xdai_below_threshold(self, mock_get_wallet):
         """xDAI balance below threshold returns ok=False with warning."""
-        mock_settings.X402_XDAI_WARN_THRESHOLD = 0.5
-        mock_get_wallet.return_value = {
-            "walletAddress": "0x123",
-            "nativeTokenBalance": str(int(0.1 * WEI_PER_XDAI))  # 0.1 xDAI
-        }
+        mock_get_wallet.return_value = WALLET_0P1_XDAI
 
-        result = check_xdai_balance()
+        result = await check_xdai_balance()
 
         assert result["ok"] is False
         assert result["balance_xdai"] == 0.1
         assert "below threshold" in result["warning"]
         assert "gas" in result["warning"].lower()
 
-    @patch("app.x402.preflight.get_wallet_info")
-    @patch("app.x402.preflight.settings")
-    def test_xdai_missing_field(self, mock_settings, mock_get_wallet):
+    @pytest.mark.asyncio
+    @patch("app.x402.preflight.get_wallet_info", new_callable=AsyncMock)
+    @patch("app.x402.preflight.settings", PREFLIGHT_SETTINGS)
+    async def test_xdai_missing_field(self, mock_get_wallet):
         """Missing nativeTokenBalance field defaults to 0."""
-        mock_settings.X402_XDAI_WARN_THRESHOLD = 0.5
-        mock_get_wallet.return_value = {
-            "walletAddress": "0x123",
-            # nativeTokenBalance missing
-        }
+        mock_get_wallet.return_value = WALLET_NO_XDAI
 
-        result = check_xdai_balance()
+        result = await check_xdai_balance()
 
         assert result["ok"] is False
         assert result["balance_xdai"] == 0.0
@@ -167,18 +178,14 @@ class TestCheckXDAIBalance:
 class TestCheckChequebookBalance:
     """Test chequebook balance checks."""
 
-    @patch("app.x402.preflight.get_chequebook_info")
-    @patch("app.x402.preflight.settings")
-    def test_chequebook_above_threshold(self, mock_settings, mock_get_chequebook):
+    @pytest.mark.asyncio
+    @patch("app.x402.preflight.get_chequebook_info", new_callable=AsyncMock)
+    @patch("app.x402.preflight.settings", PREFLIGHT_SETTINGS)
+    async def test_chequebook_above_threshold(self, mock_get_chequebook):
         """Chequebook balance above threshold returns ok=True."""
-        mock_settings.X402_CHEQUEBOOK_WARN_THRESHOLD = 5.0
-        mock_get_chequebook.return_value = {
-            "chequebookAddress": "0xcheque123",
-            "availableBalance": str(10 * PLUR_PER_BZZ),  # 10 BZZ
-            "totalBalance": str(15 * PLUR_PER_BZZ)  # 15 BZZ
-        }
+        mock_get_chequebook.return_value = CHEQUEBOOK_10_OF_15_BZZ
 
-        result = check_chequebook_balance()
+        result = await check_chequebook_balance()
 
         assert result["ok"] is True
         assert result["available_balance_bzz"] == 10.0
@@ -186,130 +193,131 @@ class TestCheckChequebookBalance:
         assert result["threshold_bzz"] == 5.0
         assert result["warning"] is None
 
-    @patch("app.x402.preflight.get_chequebook_info")
-    @patch("app.x402.preflight.settings")
-    def test_chequebook_below_threshold(self, mock_settings, mock_get_chequebook):
+    @pytest.mark.asyncio
+    @patch("app.x402.preflight.get_chequebook_info", new_callable=AsyncMock)
+    @patch("app.x402.preflight.settings", PREFLIGHT_SETTINGS)
+    async def test_chequebook_below_threshold(self, mock_get_chequebook):
         """Chequebook balance below threshold returns ok=False with warning."""
-        mock_settings.X402_CHEQUEBOOK_WARN_THRESHOLD = 5.0
-        mock_get_chequebook.return_value = {
-            "chequebookAddress": "0xcheque123",
-            "availableBalance": str(2 * PLUR_PER_BZZ),  # 2 BZZ
-            "totalBalance": str(5 * PLUR_PER_BZZ)  # 5 BZZ
-        }
+        mock_get_chequebook.return_value = CHEQUEBOOK_2_OF_5_BZZ
 
-        result = check_chequebook_balance()
+        result = await check_chequebook_balance()
 
         assert result["ok"] is False
         assert result["available_balance_bzz"] == 2.0
         assert "below threshold" in result["warning"]
         assert "bandwidth" in result["warning"].lower()
 
-    @patch("app.x402.preflight.get_chequebook_balance")
-    @patch("app.x402.preflight.get_chequebook_info")
-    @patch("app.x402.preflight.settings")
-    def test_chequebook_api_error(self, mock_settings, mock_get_chequebook_info, mock_get_chequebook_balance):
+    @pytest.mark.asyncio
+    @patch("app.x402.preflight.get_chequebook_balance", new_callable=AsyncMock)
+    @patch("app.x402.preflight.get_chequebook_info", new_callable=AsyncMock)
+    @patch("app.x402.preflight.settings", PREFLIGHT_SETTINGS)
+    async def test_chequebook_api_error(self, mock_get_chequebook_info, mock_get_chequebook_balance):
         """API error returns ok=False with error message."""
-        mock_settings.X402_CHEQUEBOOK_WARN_THRESHOLD = 5.0
         mock_get_chequebook_info.side_effect = Exception("Connection refused")
         mock_get_chequebook_balance.side_effect = Exception("Connection refused")
 
-        result = check_chequebook_balance()
+        result = await check_chequebook_balance()
 
         assert result["ok"] is False
         assert result["available_balance_bzz"] == 0.0
         assert "Failed to fetch" in result["warning"]
 
 
-class TestCheckPreflightBalances:
-    """Test combined pre-flight balance checks."""
+@pytest.fixture(scope="module")
+def balance_factories():
+    """Factories for the per-check results consumed by check_preflight_balances."""
 
-    @patch("app.x402.preflight.check_chequebook_balance")
-    @patch("app.x402.preflight.check_xdai_balance")
-    @patch("app.x402.preflight.check_xbzz_balance")
-    def test_all_checks_pass(self, mock_xbzz, mock_xdai, mock_chequebook):
-        """All checks passing returns can_accept=True."""
-        mock_xbzz.return_value = {
-            "ok": True,
-            "balance_plur": 20 * PLUR_PER_BZZ,
-            "balance_bzz": 20.0,
+    def make_xbzz(ok=True):
+        balance = 20 if ok else 5
+        return {
+            "ok": ok,
+            "balance_plur": balance * PLUR_PER_BZZ,
+            "balance_bzz": float(balance),
             "threshold_bzz": 10.0,
             "wallet_address": "0xwallet123",
-            "warning": None
+            "warning": None if ok else "xBZZ balance below threshold"
         }
-        mock_xdai.return_value = {
-            "ok": True,
-            "balance_wei": int(1.0 * WEI_PER_XDAI),
-            "balance_xdai": 1.0,
+
+    def make_xdai(ok=True):
+        balance = 1.0 if ok else 0.1
+        return {
+            "ok": ok,
+            "balance_wei": int(balance * WEI_PER_XDAI),
+            "balance_xdai": balance,
             "threshold_xdai": 0.5,
             "wallet_address": "0xwallet123",
-            "warning": None
+            "warning": None if ok else "xDAI below threshold"
         }
-        mock_chequebook.return_value = {
-            "ok": True,
-            "available_balance_plur": 10 * PLUR_PER_BZZ,
-            "available_balance_bzz": 10.0,
-            "total_balance_plur": 15 * PLUR_PER_BZZ,
-            "total_balance_bzz": 15.0,
+
+    def make_chequebook(ok=True):
+        available, total = (10, 15) if ok else (2, 5)
+        return {
+            "ok": ok,
+            "available_balance_plur": available * PLUR_PER_BZZ,
+            "available_balance_bzz": float(available),
+            "total_balance_plur": total * PLUR_PER_BZZ,
+            "total_balance_bzz": float(total),
             "threshold_bzz": 5.0,
             "chequebook_address": "0xcheque123",
-            "warning": None
+            "warning": None if ok else "Chequebook below threshold"
         }
 
-        result = check_preflight_balances()
+    return SimpleNamespace(
+        make_xbzz=make_xbzz,
+        make_xdai=make_xdai,
+        make_chequebook=make_chequebook,
+    )
 
-        assert result["can_accept"] is True
-        assert result["xbzz_ok"] is True
-        assert result["xdai_ok"] is True
-        assert result["chequebook_ok"] is True
-        assert len(result["warnings"]) == 0
-        assert len(result["errors"]) == 0
 
-    @patch("app.x402.preflight.check_chequebook_balance")
-    @patch("app.x402.preflight.check_xdai_balance")
-    @patch("app.x402.preflight.check_xbzz_balance")
-    def test_low_balance_warnings(self, mock_xbzz, mock_xdai, mock_chequebook):
-        """Low balances generate warnings but can still accept."""
-        mock_xbzz.return_value = {
-            "ok": False,
-            "balance_plur": 5 * PLUR_PER_BZZ,
-            "balance_bzz": 5.0,
-            "threshold_bzz": 10.0,
-            "wallet_address": "0xwallet123",
-            "warning": "xBZZ balance below threshold"
-        }
-        mock_xdai.return_value = {
-            "ok": True,
-            "balance_wei": int(1.0 * WEI_PER_XDAI),
-            "balance_xdai": 1.0,
-            "threshold_xdai": 0.5,
-            "wallet_address": "0xwallet123",
-            "warning": None
-        }
-        mock_chequebook.return_value = {
-            "ok": True,
-            "available_balance_plur": 10 * PLUR_PER_BZZ,
-            "available_balance_bzz": 10.0,
-            "total_balance_plur": 15 * PLUR_PER_BZZ,
-            "total_balance_bzz": 15.0,
-            "threshold_bzz": 5.0,
-            "chequebook_address": "0xcheque123",
-            "warning": None
-        }
+class TestCheckPreflightBalances:
+    """Test combined pre-flight balance checks."""
 
-        result = check_preflight_balances()
+    @pytest.fixture(autouse=True)
+    def checks(self, balance_factories):
+        """Patch the three balance checks, all passing by default."""
+        with patch.multiple(
+            "app.x402.preflight",
+            new_callable=AsyncMock,
+            check_xbzz_balance=DEFAULT,
+            check_xdai_balance=DEFAULT,
+            check_chequebook_balance=DEFAULT,
+        ) as mocks:
+            mocks["check_xbzz_balance"].return_value = balance_factories.make_xbzz()
+            mocks["check_xdai_balance"].return_value = balance_factories.make_xdai()
+            mocks["check_chequebook_balance"].return_value = balance_factories.make_chequebook()
+            yield SimpleNamespace(
+                xbzz=mocks["check_xbzz_balance"],
+                xdai=mocks["check_xdai_balance"],
+                chequebook=mocks["check_chequebook_balance"],
+            )
+
+    # Low balances are warnings only, so the gateway can always accept
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("xbzz_ok,xdai_ok,chequebook_ok,expected_warnings", [
+        (True, True, True, 0),
+        (False, True, True, 1),
+        (False, False, False, 3),
+    ], ids=["all_checks_pass", "low_balance_warning", "multiple_warnings"])
+    async def test_balance_combinations(
+        self, checks, balance_factories, xbzz_ok, xdai_ok, chequebook_ok, expected_warnings
+    ):
+        checks.xbzz.return_value = balance_factories.make_xbzz(xbzz_ok)
+        checks.xdai.return_value = balance_factories.make_xdai(xdai_ok)
+        checks.chequebook.return_value = balance_factories.make_chequebook(chequebook_ok)
+
+        result = await check_preflight_balances()
 
-        # Can accept even with low balance (warning only)
         assert result["can_accept"] is True
-        assert result["xbzz_ok"] is False
-        assert len(result["warnings"]) == 1
+        assert result["xbzz_ok"] is xbzz_ok
+        assert result["xdai_ok"] is xdai_ok
+        assert result["chequebook_ok"] is chequebook_ok
+        assert len(result["warnings"]) == expected_warnings
         assert len(result["errors"]) == 0
 
-    @patch("app.x402.preflight.check_chequebook_balance")
-    @patch("app.x402.preflight.check_xdai_balance")
-    @patch("app.x402.preflight.check_xbzz_balance")
-    def test_api_error_generates_warning_not_error(self, mock_xbzz, mock_xdai, mock_chequebook):
+    @pytest.mark.asyncio
+    async def test_api_error_generates_warning_not_error(self, checks):
         """Bee node connectivity issues are warnings, not blocking errors."""
-        mock_xbzz.return_value = {
+        checks.xbzz.return_value = {
             "ok": False,
             "balance_plur": 0,
             "balance_bzz": 0.0,
@@ -317,26 +325,8 @@ class TestCheckPreflightBalances:
             "wallet_address": None,
             "warning": "Failed to fetch xBZZ balance: Connection refused"
         }
-        mock_xdai.return_value = {
-            "ok": True,
-            "balance_wei": int(1.0 * WEI_PER_XDAI),
-            "balance_xdai": 1.0,
-            "threshold_xdai": 0.5,
-            "wallet_address": "0xwallet123",
-            "warning": None
-        }
-        mock_chequebook.return_value = {
-            "ok": True,
-            "available_balance_plur": 10 * PLUR_PER_BZZ,
-            "available_balance_bzz": 10.0,
-            "total_balance_plur": 15 * PLUR_PER_BZZ,
-            "total_balance_bzz": 15.0,
-            "threshold_bzz": 5.0,
-            "chequebook_address": "0xcheque123",
-            "warning": None
-        }
 
-        result = check_preflight_balances()
+        result = await check_preflight_balances()
 
         # Gateway stays available; Bee node issues are warnings not errors
         assert result["can_accept"] is True
@@ -345,39 +335,10 @@ class TestCheckPreflightBalances:
         unreachable_warnings = [w for w in result["warnings"] if "unreachable" in w.lower()]
         assert len(unreachable_warnings) == 1
 
-    @patch("app.x402.preflight.check_chequebook_balance")
-    @patch("app.x402.preflight.check_xdai_balance")
-    @patch("app.x402.preflight.check_xbzz_balance")
-    def test_balances_structure(self, mock_xbzz, mock_xdai, mock_chequebook):
+    @pytest.mark.asyncio
+    async def test_balances_structure(self, checks):
         """Verify balances structure in response."""
-        mock_xbzz.return_value = {
-            "ok": True,
-            "balance_plur": 20 * PLUR_PER_BZZ,
-            "balance_bzz": 20.0,
-            "threshold_bzz": 10.0,
-            "wallet_address": "0xwallet123",
-            "warning": None
-        }
-        mock_xdai.return_value = {
-            "ok": True,
-            "balance_wei": int(1.0 * WEI_PER_XDAI),
-            "balance_xdai": 1.0,
-            "threshold_xdai": 0.5,
-            "wallet_address": "0xwallet123",
-            "warning": None
-        }
-        mock_chequebook.return_value = {
-            "ok": True,
-            "available_balance_plur": 10 * PLUR_PER_BZZ,
-            "available_balance_bzz": 10.0,
-            "total_balance_plur": 15 * PLUR_PER_BZZ,
-            "total_balance_bzz": 15.0,
-            "threshold_bzz": 5.0,
-            "chequebook_address": "0xcheque123",
-            "warning": None
-        }
-
-        result = check_preflight_balances()
+        result = await check_preflight_balances()
 
         # Verify balances structure
         assert "balances" in result
@@ -394,45 +355,3 @@ class TestCheckPreflightBalances:
         assert result["balances"]["chequebook"]["available_bzz"] == 10.0
         assert result["balances"]["chequebook"]["total_bzz"] == 15.0
         assert result["balances"]["chequebook"]["threshold_bzz"] == 5.0
-
-    @patch("app.x402.preflight.check_chequebook_balance")
-    @patch("app.x402.preflight.check_xdai_balance")
-    @patch("app.x402.preflight.check_xbzz_balance")
-    def test_multiple_warnings(self, mock_xbzz, mock_xdai, mock_chequebook):
-        """Multiple low balances generate multiple warnings."""
-        mock_xbzz.return_value = {
-            "ok": False,
-            "balance_plur": 5 * PLUR_PER_BZZ,
-            "balance_bzz": 5.0,
-            "threshold_bzz": 10.0,
-            "wallet_address": "0xwallet123",
-            "warning": "xBZZ below threshold"
-        }
-        mock_xdai.return_value = {
-            "ok": False,
-            "balance_wei": int(0.1 * WEI_PER_XDAI),
-            "balance_xdai": 0.1,
-            "threshold_xdai": 0.5,
-            "wallet_address": "0xwallet123",
-            "warning": "xDAI below threshold"
-        }
-        mock_chequebook.return_value = {
-            "ok": False,
-            "available_balance_plur": 2 * PLUR_PER_BZZ,
-            "available_balance_bzz": 2.0,
-            "total_balance_plur": 5 * PLUR_PER_BZZ,
-            "total_balance_bzz": 5.0,
-            "threshold_bzz": 5.0,
-            "chequebook_address": "0xcheque123",
-            "warning": "Chequebook below threshold"
-        }
-
-        result = check_preflight_balances()
-
-        # Can still accept (low balance = warning, not error)
-        assert result["can_accept"] is True
-        assert result["xbzz_ok"] is False
-        assert result["xdai_ok"] is False
-        assert result["chequebook_ok"] is False
-        assert len(result["warnings"]) == 3
-        assert len(result["errors"]) == 0
@@ -3,7 +3,8 @@
 Unit tests for x402 pricing service.
 """
 import pytest
-from unittest.mock import patch, MagicMock
+from types import MappingProxyType, SimpleNamespace
+from unittest.mock import patch, AsyncMock
 
 from app.x402.pricing import (
     plur_to_bzz,
@@ -13,55 +14,105 @@ from app.x402.pricing import (
     calculate_stamp_price_usd,
     calculate_upload_price_usd,
     get_price_quote,
+    clear_price_cache,
+    CACHE_TTL_SECONDS,
+    _price_cache,
+    _stamp_price_core,
     PLUR_PER_BZZ,
 )
 
+# Read-only /chainstate payloads keyed by current price in PLUR
+CHAINSTATE = {
+    name: MappingProxyType({"currentPrice": price})
+    for name, price in [("k1", "1000"), ("m1", "1000000"), ("one", "1"), ("zero", "0")]
+}
 
-class TestConversionFunctions:
-    """Test unit conversion and helper functions."""
+# Relative tolerance for USD prices, which are rounded to 6 decimals
+PRICE_REL_TOL = 1e-4
+
+
+@pytest.fixture(autouse=True)
+def _clear_price_cache():
+    """Isolate tests from cached stamp prices."""
+    clear_price_cache()
+    yield
+    clear_price_cache()
+
+
+# Pricing settings every test starts from; tests override what they need
+_DEFAULT_SETTINGS = {
+    "X402_BZZ_USD_RATE": 0.50,
+    "X402_MARKUP_PERCENT": 50.0,
+    "X402_MIN_PRICE_USD": 0.01,
+    "X402_NETWORK": "base-sepolia",
+    "X402_PAY_TO_ADDRESS": "0x1234567890abcdef",
+}
 
-    def test_plur_to_bzz_zero(self):
-        """Zero PLUR equals zero BZZ."""
-        assert plur_to_bzz(0) == 0.0
 
-    def test_plur_to_bzz_one_bzz(self):
-        """One BZZ worth of PLUR."""
-        assert plur_to_bzz(PLUR_PER_BZZ) == 1.0
+@pytest.fixture(scope="module")
+def _patched_settings():
+    """Patch pricing settings once per module with a plain namespace."""
+    settings_ns = SimpleNamespace()
+    with patch("app.x402.pricing.settings", settings_ns):
+        yield settings_ns
 
-    def test_plur_to_bzz_fractional(self):
-        """Fractional BZZ values."""
-        assert plur_to_bzz(PLUR_PER_BZZ // 2) == 0.5
 
-    def test_bzz_to_usd_with_rate(self):
+@pytest.fixture(autouse=True)
+def mock_settings(_patched_settings):
+    """Pricing settings reset to _DEFAULT_SETTINGS for each test."""
+    vars(_patched_settings).clear()
+    vars(_patched_settings).update(_DEFAULT_SETTINGS)
+    return _patched_settings
+
+
+class TestConversionFunctions:
+    """Test unit conversion and helper functions."""
+
+    @pytest.mark.parametrize("plur,bzz", [
+        (0, 0.0),
+        (PLUR_PER_BZZ, 1.0),
+        (PLUR_PER_BZZ // 2, 0.5),
+    ], ids=["zero", "one_bzz", "fractional"])
+    def test_plur_to_bzz(self, plur, bzz):
+        """Convert PLUR to BZZ."""
+        assert plur_to_bzz(plur) == bzz
+
+    @pytest.mark.parametrize("bzz,rate,usd", [
+        (1.0, 0.50, 0.50),
+        (2.0, 0.50, 1.00),
+        (0.5, 1.00, 0.50),
+    ])
+    def test_bzz_to_usd_with_rate(self, bzz, rate, usd):
         """Convert BZZ to USD with explicit rate."""
-        assert bzz_to_usd(1.0, rate=0.50) == 0.50
-        assert bzz_to_usd(2.0, rate=0.50) == 1.00
-        assert bzz_to_usd(0.5, rate=1.00) == 0.50
+        assert bzz_to_usd(bzz, rate=rate) == usd
 
-    @patch("app.x402.pricing.settings")
     def test_bzz_to_usd_default_rate(self, mock_settings):
         """Convert BZZ to USD using config rate."""
         mock_settings.X402_BZZ_USD_RATE = 0.75
         assert bzz_to_usd(2.0) == 1.50
 
-    def test_apply_markup_explicit(self):
+    @pytest.mark.parametrize("markup_percent,price", [
+        (50, 1.50),
+        (100, 2.00),
+        (0, 1.00),
+    ])
+    def test_apply_markup_explicit(self, markup_percent, price):
         """Apply explicit markup percentage."""
-        assert apply_markup(1.00, markup_percent=50) == 1.50
-        assert apply_markup(1.00, markup_percent=100) == 2.00
-        assert apply_markup(1.00, markup_percent=0) == 1.00
+        assert apply_markup(1.00, markup_percent=markup_percent) == price
 
-    @patch("app.x402.pricing.settings")
     def test_apply_markup_default(self, mock_settings):
         """Apply default markup from config."""
         mock_settings.X402_MARKUP_PERCENT = 25.0
         assert apply_markup(1.00) == 1.25
 
-    def test_apply_minimum_price_explicit(self):
+    @pytest.mark.parametrize("price,expected", [
+        (0.005, 0.01),
+        (0.05, 0.05),
+    ])
+    def test_apply_minimum_price_explicit(self, price, expected):
         """Apply explicit minimum price."""
-        assert apply_minimum_price(0.005, minimum=0.01) == 0.01
-        assert apply_minimum_price(0.05, minimum=0.01) == 0.05
+        assert apply_minimum_price(price, minimum=0.01) == expected
 
-    @patch("app.x402.pricing.settings")
     def test_apply_minimum_price_default(self, mock_settings):
         """Apply default minimum from config."""
         mock_settings.X402_MIN_PRICE_USD = 0.02
@@ -72,19 +123,14 @@ class TestConversionFunctions:
 class TestCalculateStampPriceUSD:
     """Test stamp price calculations."""
 
-    @patch("app.x402.pricing.settings")
-    @patch("app.x402.pricing.get_chainstate")
-    def test_basic_stamp_price(self, mock_chainstate, mock_settings):
+    @pytest.mark.asyncio
+    @patch("app.x402.pricing.get_chainstate", new_callable=AsyncMock)
+    async def test_basic_stamp_price(self, mock_chainstate):
         """Calculate basic stamp price."""
-        # Configure mocks
-        mock_settings.X402_BZZ_USD_RATE = 0.50
-        mock_settings.X402_MARKUP_PERCENT = 50.0
-        mock_settings.X402_MIN_PRICE_USD = 0.01
-
         # Current price of 1000 PLUR per chunk per block
-        mock_chainstate.return_value = {"currentPrice": "1000"}
+        mock_chainstate.return_value = CHAINSTATE["k1"]
 
-        result = calculate_stamp_price_usd(
+        result = await calculate_stamp_price_usd(
             duration_hours=24,
             depth=17,
             include_breakdown=True
@@ -103,18 +149,17 @@ class TestCalculateStampPriceUSD:
         assert result["exchange_rate"] == 0.50
         assert result["markup_percent"] == 50.0
 
-    @patch("app.x402.pricing.settings")
-    @patch("app.x402.pricing.get_chainstate")
-    def test_minimum_price_applied(self, mock_chainstate, mock_settings):
+    @pytest.mark.asyncio
+    @patch("app.x402.pricing.get_chainstate", new_callable=AsyncMock)
+    async def test_minimum_price_applied(self, mock_chainstate, mock_settings):
         """Verify minimum price is applied for small requests."""
-        mock_settings.X402_BZZ_USD_RATE = 0.50
         mock_settings.X402_MARKUP_PERCENT = 0.0
         mock_settings.X402_MIN_PRICE_USD = 1.00
 
         # Very low price to trigger minimum
-        mock_chainstate.return_value = {"currentPrice": "1"}
+        mock_chainstate.return_value = CHAINSTATE["one"]
 
-        result = calculate_stamp_price_usd(
+        result = await calculate_stamp_price_usd(
             duration_hours=1,
             depth=17,
             include_breakdown=True
@@ -123,17 +168,17 @@ class TestCalculateStampPriceUSD:
         assert result["price_usd"] == 1.00
         assert result["minimum_applied"] is True
 
-    @patch("app.x402.pricing.settings")
-    @patch("app.x402.pricing.get_chainstate")
-    def test_markup_applied(self, mock_chainstate, mock_settings):
+    @pytest.mark.asyncio
+    @patch("app.x402.pricing.get_chainstate", new_callable=AsyncMock)
+    async def test_markup_applied(self, mock_chainstate, mock_settings):
         """Verify markup is correctly applied."""
         mock_settings.X402_BZZ_USD_RATE = 1.00  # 1:1 for easy calculation
         mock_settings.X402_MARKUP_PERCENT = 100.0  # Double the price
         mock_settings.X402_MIN_PRICE_USD = 0.0  # No minimum
 
-        mock_chainstate.return_value = {"currentPrice": "1000000"}
+        mock_chainstate.return_value = CHAINSTATE["m1"]
 
-        result = calculate_stamp_price_usd(
+        result = await calculate_stamp_price_usd(
             duration_hours=24,
             depth=17,
             include_breakdown=True
@@ -143,28 +188,24 @@ class TestCalculateStampPriceUSD:
         base_cost = result["breakdown"]["cost_usd_before_markup"]
         final_price = result["price_usd"]
 
-        # Allow for rounding
-        assert abs(final_price - base_cost * 2) < 0.01
+        assert final_price == pytest.approx(base_cost * 2, rel=PRICE_REL_TOL)
 
-    @patch("app.x402.pricing.get_chainstate")
-    def test_invalid_chainstate_price(self, mock_chainstate):
+    @pytest.mark.asyncio
+    @patch("app.x402.pricing.get_chainstate", new_callable=AsyncMock)
+    async def test_invalid_chainstate_price(self, mock_chainstate):
         """Raise error for invalid chainstate price."""
-        mock_chainstate.return_value = {"currentPrice": "0"}
+        mock_chainstate.return_value = CHAINSTATE["zero"]
 
         with pytest.raises(ValueError, match="Invalid current price"):
-            calculate_stamp_price_usd(duration_hours=24, depth=17)
+            await calculate_stamp_price_usd(duration_hours=24, depth=17)
 
-    @patch("app.x402.pricing.settings")
-    @patch("app.x402.pricing.get_chainstate")
-    def test_breakdown_structure(self, mock_chainstate, mock_settings):
+    @pytest.mark.asyncio
+    @patch("app.x402.pricing.get_chainstate", new_callable=AsyncMock)
+    async def test_breakdown_structure(self, mock_chainstate):
         """Verify breakdown contains all expected fields."""
-        mock_settings.X402_BZZ_USD_RATE = 0.50
-        mock_settings.X402_MARKUP_PERCENT = 50.0
-        mock_settings.X402_MIN_PRICE_USD = 0.01
+        mock_chainstate.return_value = CHAINSTATE["k1"]
 
-        mock_chainstate.return_value = {"currentPrice": "1000"}
-
-        result = calculate_stamp_price_usd(
+        result = await calculate_stamp_price_usd(
             duration_hours=24,
             depth=17,
             include_breakdown=True
@@ -182,17 +223,13 @@ class TestCalculateStampPriceUSD:
         assert "minimum_price_usd" in breakdown
         assert "final_price_usd" in breakdown
 
-    @patch("app.x402.pricing.settings")
-    @patch("app.x402.pricing.get_chainstate")
-    def test_no_breakdown_option(self, mock_chainstate, mock_settings):
+    @pytest.mark.asyncio
+    @patch("app.x402.pricing.get_chainstate", new_callable=AsyncMock)
+    async def test_no_breakdown_option(self, mock_chainstate):
         """Verify breakdown can be excluded."""
-        mock_settings.X402_BZZ_USD_RATE = 0.50
-        mock_settings.X402_MARKUP_PERCENT = 50.0
-        mock_settings.X402_MIN_PRICE_USD = 0.01
-
-        mock_chainstate.return_value = {"currentPrice": "1000"}
+        mock_chainstate.return_value = CHAINSTATE["k1"]
 
-        result = calculate_stamp_price_usd(
+        result = await calculate_stamp_price_usd(
             duration_hours=24,
             depth=17,
             include_breakdown=False
@@ -204,18 +241,14 @@ class TestCalculateStampPriceUSD:
 class TestCalculateUploadPriceUSD:
     """Test upload price calculations."""
 
-    @patch("app.x402.pricing.settings")
-    @patch("app.x402.pricing.get_chainstate")
-    def test_small_upload(self, mock_chainstate, mock_settings):
+    @pytest.mark.asyncio
+    @patch("app.x402.pricing.get_chainstate", new_callable=AsyncMock)
+    async def test_small_upload(self, mock_chainstate):
         """Calculate price for small upload (fits in minimum depth)."""
-        mock_settings.X402_BZZ_USD_RATE = 0.50
-        mock_settings.X402_MARKUP_PERCENT = 50.0
-        mock_settings.X402_MIN_PRICE_USD = 0.01
-
-        mock_chainstate.return_value = {"currentPrice": "1000"}
+        mock_chainstate.return_value = CHAINSTATE["k1"]
 
         # 1 KB upload
-        result = calculate_upload_price_usd(
+        result = await calculate_upload_price_usd(
             size_bytes=1024,
             duration_hours=24,
             include_breakdown=True
@@ -225,18 +258,14 @@ class TestCalculateUploadPriceUSD:
         assert "breakdown" in result
         assert result["breakdown"]["depth_used"] == 17  # Minimum depth
 
-    @patch("app.x402.pricing.settings")
-    @patch("app.x402.pricing.get_chainstate")
-    def test_large_upload_increases_depth(self, mock_chainstate, mock_settings):
+    @pytest.mark.asyncio
+    @patch("app.x402.pricing.get_chainstate", new_callable=AsyncMock)
+    async def test_large_upload_increases_depth(self, mock_chainstate):
         """Large uploads should use higher depth."""
-        mock_settings.X402_BZZ_USD_RATE = 0.50
-        mock_settings.X402_MARKUP_PERCENT = 50.0
-        mock_settings.X402_MIN_PRICE_USD = 0.01
-
-        mock_chainstate.return_value = {"currentPrice": "1000"}
+        mock_chainstate.return_value = CHAINSTATE["k1"]
 
         # 1 GB upload - should need depth > 17
-        result = calculate_upload_price_usd(
+        result = await calculate_upload_price_usd(
             size_bytes=1024 * 1024 * 1024,  # 1 GB
             duration_hours=24,
             include_breakdown=True
@@ -245,17 +274,13 @@ class TestCalculateUploadPriceUSD:
         # 1 GB needs more than 2^17 chunks
         assert result["breakdown"]["depth_used"] > 17
 
-    @patch("app.x402.pricing.settings")
-    @patch("app.x402.pricing.get_chainstate")
-    def test_upload_breakdown_structure(self, mock_chainstate, mock_settings):
+    @pytest.mark.asyncio
+    @patch("app.x402.pricing.get_chainstate", new_callable=AsyncMock)
+    async def test_upload_breakdown_structure(self, mock_chainstate):
         """Verify upload breakdown contains expected fields."""
-        mock_settings.X402_BZZ_USD_RATE = 0.50
-        mock_settings.X402_MARKUP_PERCENT = 50.0
-        mock_settings.X402_MIN_PRICE_USD = 0.01
-
-        mock_chainstate.return_value = {"currentPrice": "1000"}
+        mock_chainstate.return_value = CHAINSTATE["k1"]
 
-        result = calculate_upload_price_usd(
+        result = await calculate_upload_price_usd(
             size_bytes=1024,
             duration_hours=24,
             include_breakdown=True
@@ -273,19 +298,13 @@ class TestCalculateUploadPriceUSD:
 class TestGetPriceQuote:
     """Test price quote generation."""
 
-    @patch("app.x402.pricing.settings")
-    @patch("app.x402.pricing.get_chainstate")
-    def test_stamp_purchase_quote(self, mock_chainstate, mock_settings):
+    @pytest.mark.asyncio
+    @patch("app.x402.pricing.get_chainstate", new_callable=AsyncMock)
+    async def test_stamp_purchase_quote(self, mock_chainstate):
         """Generate quote for stamp purchase."""
-        mock_settings.X402_BZZ_USD_RATE = 0.50
-        mock_settings.X402_MARKUP_PERCENT = 50.0
-        mock_settings.X402_MIN_PRICE_USD = 0.01
-        mock_settings.X402_NETWORK = "base-sepolia"
-        mock_settings.X402_PAY_TO_ADDRESS = "0x1234567890abcdef"
-
-        mock_chainstate.return_value = {"currentPrice": "1000"}
+        mock_chainstate.return_value = CHAINSTATE["k1"]
 
-        result = get_price_quote(
+        result = await get_price_quote(
             operation="stamp_purchase",
             duration_hours=24,
             depth=17
@@ -297,19 +316,13 @@ class TestGetPriceQuote:
         assert result["pay_to"] == "0x1234567890abcdef"
         assert "details" in result
 
-    @patch("app.x402.pricing.settings")
-    @patch("app.x402.pricing.get_chainstate")
-    def test_upload_quote(self, mock_chainstate, mock_settings):
+    @pytest.mark.asyncio
+    @patch("app.x402.pricing.get_chainstate", new_callable=AsyncMock)
+    async def test_upload_quote(self, mock_chainstate):
         """Generate quote for upload."""
-        mock_settings.X402_BZZ_USD_RATE = 0.50
-        mock_settings.X402_MARKUP_PERCENT = 50.0
-        mock_settings.X402_MIN_PRICE_USD = 0.01
-        mock_settings.X402_NETWORK = "base-sepolia"
-        mock_settings.X402_PAY_TO_ADDRESS = "0x1234567890abcdef"
+        mock_chainstate.return_value = CHAINSTATE["k1"]
 
-        mock_chainstate.return_value = {"currentPrice": "1000"}
-
-        result = get_price_quote(
+        result = await get_price_quote(
             operation="upload",
             size_bytes=1024,
             duration_hours=24
@@ -319,19 +332,15 @@ class TestGetPriceQuote:
         assert result["currency"] == "USDC"
         assert result["network"] == "base-sepolia"
 
-    @patch("app.x402.pricing.settings")
-    @patch("app.x402.pricing.get_chainstate")
-    def test_missing_pay_to_address(self, mock_chainstate, mock_settings):
+    @pytest.mark.asyncio
+    @patch("app.x402.pricing.get_chainstate", new_callable=AsyncMock)
+    async def test_missing_pay_to_address(self, mock_chainstate, mock_settings):
         """Handle missing pay_to address gracefully."""
-        mock_settings.X402_BZZ_USD_RATE = 0.50
-        mock_settings.X402_MARKUP_PERCENT = 50.0
-        mock_settings.X402_MIN_PRICE_USD = 0.01
-        mock_settings.X402_NETWORK = "base-sepolia"
         mock_settings.X402_PAY_TO_ADDRESS = None
 
-        mock_chainstate.return_value = {"currentPrice": "1000"}
+        mock_chainstate.return_value = CHAINSTATE["k1"]
 
-        result = get_price_quote(
+        result = await get_price_quote(
             operation="stamp_purchase",
             duration_hours=24
         )
@@ -339,63 +348,163 @@ class TestGetPriceQuote:
         # Should use placeholder address
         assert result["pay_to"] == "0x0000000000000000000000000000000000000000"
 
-    def test_unknown_operation(self):
+    @pytest.mark.asyncio
+    async def test_unknown_operation(self):
         """Raise error for unknown operation type."""
         with pytest.raises(ValueError, match="Unknown operation type"):
-            get_price_quote(operation="unknown_operation")
+            await get_price_quote(operation="unknown_operation")
 
 
 class TestPricingFormulas:
     """Test the pricing formula calculations."""
 
-    @patch("app.x402.pricing.settings")
-    @patch("app.x402.pricing.get_chainstate")
-    def test_price_increases_with_duration(self, mock_chainstate, mock_settings):
-        """Longer duration should increase price."""
-        mock_settings.X402_BZZ_USD_RATE = 0.50
-        mock_settings.X402_MARKUP_PERCENT = 50.0
+    @pytest.fixture
+    def chain_mock(self):
+        """Chainstate at 1M PLUR per chunk per block."""
+        with patch(
+            "app.x402.pricing.get_chainstate",
+            new_callable=AsyncMock,
+            return_value=CHAINSTATE["m1"],
+        ) as m:
+            yield m
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("param,values,fixed", [
+        ("duration_hours", [6, 12, 24, 48, 96, 720], {"depth": 17}),
+        ("depth", [17, 18, 19, 20, 21, 22, 23], {"duration_hours": 24}),
+    ], ids=["duration", "depth"])
+    async def test_price_increases_monotonically(self, chain_mock, mock_settings, param, values, fixed):
+        """Longer duration or higher depth (more storage) should increase price."""
         mock_settings.X402_MIN_PRICE_USD = 0.0
 
-        mock_chainstate.return_value = {"currentPrice": "1000000"}
+        prices = [
+            (await calculate_stamp_price_usd(**{param: value}, **fixed))["price_usd"]
+            for value in values
+        ]
 
-        price_24h = calculate_stamp_price_usd(duration_hours=24, depth=17)
-        price_48h = calculate_stamp_price_usd(duration_hours=48, depth=17)
+        assert all(lower < higher for lower, higher in zip(prices, prices[1:])), prices
+        assert chain_mock.await_count == 1
 
-        assert price_48h["price_usd"] > price_24h["price_usd"]
+    @pytest.mark.asyncio
+    async def test_price_scales_with_exchange_rate(self, chain_mock, mock_settings):
+        """Higher exchange rate should increase USD price."""
+        mock_settings.X402_MARKUP_PERCENT = 0.0
+        mock_settings.X402_MIN_PRICE_USD = 0.0
 
-    @patch("app.x402.pricing.settings")
-    @patch("app.x402.pricing.get_chainstate")
-    def test_price_increases_with_depth(self, mock_chainstate, mock_settings):
-        """Higher depth (more storage) should increase price."""
+        # Price at $0.50/BZZ
         mock_settings.X402_BZZ_USD_RATE = 0.50
-        mock_settings.X402_MARKUP_PERCENT = 50.0
-        mock_settings.X402_MIN_PRICE_USD = 0.0
+        price_low = await calculate_stamp_price_usd(duration_hours=24, depth=17)
+
+        # Price at $1.00/BZZ (2x rate)
+        mock_settings.X402_BZZ_USD_RATE = 1.00
+        price_high = await calculate_stamp_price_usd(duration_hours=24, depth=17)
+
+        # Price should double
+        assert price_high["price_usd"] == pytest.approx(
+            2 * price_low["price_usd"], rel=PRICE_REL_TOL
+        )
 
-        mock_chainstate.return_value = {"currentPrice": "1000000"}
 
-        price_d17 = calculate_stamp_price_usd(duration_hours=24, depth=17)
-        price_d20 = calculate_stamp_price_usd(duration_hours=24, depth=20)
+class TestPriceCache:
+    """Test caching of stamp price calculations."""
 
-        # depth 20 has 8x the capacity of depth 17, so should cost more
-        assert price_d20["price_usd"] > price_d17["price_usd"]
+    @pytest.mark.asyncio
+    @patch("app.x402.pricing.get_chainstate", new_callable=AsyncMock)
+    async def test_repeat_quote_skips_chainstate(self, mock_chainstate):
+        """Repeated quotes for the same parameters query chainstate once."""
+        mock_chainstate.return_value = CHAINSTATE["k1"]
 
-    @patch("app.x402.pricing.settings")
-    @patch("app.x402.pricing.get_chainstate")
-    def test_price_scales_with_exchange_rate(self, mock_chainstate, mock_settings):
-        """Higher exchange rate should increase USD price."""
+        first = await calculate_upload_price_usd(size_bytes=1024)
+        second = await calculate_upload_price_usd(size_bytes=2048)
+
+        assert mock_chainstate.await_count == 1
+        assert first["price_usd"] == second["price_usd"]
+        assert second["breakdown"]["size_bytes"] == 2048
+
+    @pytest.mark.asyncio
+    @patch("app.x402.pricing.get_chainstate", new_callable=AsyncMock)
+    async def test_config_change_bypasses_cache(self, mock_chainstate, mock_settings):
+        """Changing the exchange rate produces a fresh calculation."""
         mock_settings.X402_MARKUP_PERCENT = 0.0
         mock_settings.X402_MIN_PRICE_USD = 0.0
+        mock_chainstate.return_value = CHAINSTATE["m1"]
 
-        mock_chainstate.return_value = {"currentPrice": "1000000"}
-
-        # Price at $0.50/BZZ
         mock_settings.X402_BZZ_USD_RATE = 0.50
-        price_low = calculate_stamp_price_usd(duration_hours=24, depth=17)
-
-        # Price at $1.00/BZZ (2x rate)
+        low = await calculate_stamp_price_usd(duration_hours=24, depth=17)
         mock_settings.X402_BZZ_USD_RATE = 1.00
-        price_high = calculate_stamp_price_usd(duration_hours=24, depth=17)
-
-        # Price should approximately double
-        ratio = price_high["price_usd"] / price_low["price_usd"]
-        assert 1.9 < ratio < 2.1  # Allow small rounding variance
+        high = await calculate_stamp_price_usd(duration_hours=24, depth=17)
+
+        assert mock_chainstate.await_count == 1
+        assert high["price_usd"] > low["price_usd"]
+
+    @pytest.mark.asyncio
+    @patch("app.x402.pricing.get_chainstate", new_callable=AsyncMock)
+    async def test_different_parameters_share_chainstate(self, mock_chainstate):
+        """Calculations for different durations reuse the chainstate price."""
+        mock_chainstate.return_value = CHAINSTATE["k1"]
+
+        await calculate_stamp_price_usd(duration_hours=24, depth=17)
+        await calculate_stamp_price_usd(duration_hours=48, depth=20)
+
+        assert mock_chainstate.await_count == 1
+
+    @pytest.mark.asyncio
+    @patch("app.x402.pricing.get_chainstate", new_callable=AsyncMock)
+    async def test_invalid_chainstate_price_not_cached(self, mock_chainstate):
+        """A zero price is rejected and queried again on the next call."""
+        mock_chainstate.return_value = CHAINSTATE["zero"]
+        with pytest.raises(ValueError):
+            await calculate_stamp_price_usd(duration_hours=24, depth=17)
+
+        mock_chainstate.return_value = CHAINSTATE["k1"]
+        result = await calculate_stamp_price_usd(duration_hours=24, depth=17)
+
+        assert mock_chainstate.await_count == 2
+        assert result["price_usd"] > 0
+
+    @pytest.mark.asyncio
+    @patch("app.x402.pricing.get_chainstate", new_callable=AsyncMock)
+    async def test_expired_quote_reuses_price_arithmetic(self, mock_chainstate):
+        """An expired quote with an unchanged chainstate price skips recomputation."""
+        mock_chainstate.return_value = CHAINSTATE["k1"]
+
+        first = await calculate_stamp_price_usd(duration_hours=24, depth=17)
+        _price_cache.clear()
+        second = await calculate_stamp_price_usd(duration_hours=24, depth=17)
+
+        assert _stamp_price_core.cache_info().hits == 1
+        assert second == first
+
+    @pytest.mark.asyncio
+    @patch("app.x402.pricing.get_chainstate", new_callable=AsyncMock)
+    async def test_cached_quote_is_independent_copy(self, mock_chainstate):
+        """Mutating a returned quote does not change later cached quotes."""
+        mock_chainstate.return_value = CHAINSTATE["k1"]
+
+        first = await calculate_stamp_price_usd(duration_hours=24, depth=17)
+        first["price_usd"] = -1
+        first["breakdown"]["depth"] = -1
+        second = await calculate_stamp_price_usd(duration_hours=24, depth=17)
+
+        assert second["price_usd"] > 0
+        assert second["breakdown"]["depth"] == 17
+
+    @pytest.mark.asyncio
+    @patch("app.x402.pricing.time.time")
+    @patch("app.x402.pricing.get_chainstate", new_callable=AsyncMock)
+    async def test_quote_expires_with_its_chainstate_price(self, mock_chainstate, mock_time):
+        """A quote is never served from a chainstate price older than CACHE_TTL_SECONDS."""
+        mock_chainstate.return_value = CHAINSTATE["k1"]
+
+        mock_time.return_value = 1000.0
+        await calculate_stamp_price_usd(duration_hours=24, depth=17)
+
+        # Computed from the price fetched at t=1000
+        mock_time.return_value = 1000.0 + CACHE_TTL_SECONDS - 10
+        await calculate_stamp_price_usd(duration_hours=48, depth=17)
+        assert mock_chainstate.await_count == 1
+
+        # Past the price's TTL, the newer quote expires with it
+        mock_time.return_value = 1000.0 + CACHE_TTL_SECONDS + 1
+        await calculate_stamp_price_usd(duration_hours=48, depth=17)
+        assert mock_chainstate.await_count == 2
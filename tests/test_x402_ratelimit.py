@@ -3,10 +3,11 @@
 Unit tests for x402 rate limiting.
 """
 import pytest
-import time
 from unittest.mock import patch
 
 from app.x402.ratelimit import (
+    NS_PER_SECOND,
+    RATE_LIMIT_SHARDS,
     RateLimiter,
     check_rate_limit,
     get_rate_limit_headers,
@@ -15,6 +16,19 @@ from app.x402.ratelimit import (
 )
 
 
+@pytest.fixture
+def clock():
+    """Patched limiter clock; clock.advance(seconds) moves it forward."""
+    with patch("app.x402.ratelimit.time.monotonic_ns") as mock_time:
+        mock_time.return_value = 1000 * NS_PER_SECOND
+
+        def advance(seconds):
+            mock_time.return_value += int(seconds * NS_PER_SECOND)
+
+        mock_time.advance = advance
+        yield mock_time
+
+
 class TestRateLimiter:
     """Test the RateLimiter class."""
 
@@ -84,7 +98,7 @@ class TestRateLimiter:
         assert is_limited is False
         assert count == 1
 
-    def test_window_expiry(self):
+    def test_window_expiry(self, clock):
         """Requests expire after the window passes."""
         limiter = RateLimiter(requests_per_minute=2, window_seconds=1)
 
@@ -94,14 +108,71 @@ class TestRateLimiter:
         is_limited, _, _ = limiter.is_rate_limited("192.168.1.1")
         assert is_limited is True
 
-        # Wait for window to pass
-        time.sleep(1.1)
+        # Wait for the window and the one it is weighted against to pass
+        clock.advance(2.1)
 
         # Should be allowed again
         is_limited, count, _ = limiter.is_rate_limited("192.168.1.1")
         assert is_limited is False
         assert count == 1  # Counter reset
 
+    def test_previous_window_weighted(self, clock):
+        """Requests from the previous window count in proportion to their overlap."""
+        limiter = RateLimiter(requests_per_minute=4, window_seconds=60)
+
+        for _ in range(4):
+            limiter.is_rate_limited("192.168.1.1")
+
+        # 15s into the next window: 4 * 45/60 = 3 still counted
+        clock.advance(75)
+        is_limited, count, _ = limiter.is_rate_limited("192.168.1.1")
+        assert is_limited is False
+        assert count == 4
+
+        is_limited, count, _ = limiter.is_rate_limited("192.168.1.1")
+        assert is_limited is True
+        assert count == 4
+
+        # 45s into the next window: 4 * 15/60 + 1 = 2
+        clock.advance(30)
+        assert limiter.get_client_stats("192.168.1.1")["requests_in_window"] == 2
+
+    def test_blocked_requests_not_recorded(self):
+        """Blocked requests don't grow the stored window."""
+        limiter = RateLimiter(requests_per_minute=2)
+
+        for _ in range(5):
+            limiter.is_rate_limited("192.168.1.1")
+
+        _, windows = limiter._shard("192.168.1.1")
+        assert windows["192.168.1.1"].current == 2
+        assert limiter.get_client_stats("192.168.1.1")["requests_in_window"] == 2
+
+    def test_lru_eviction(self):
+        """Tracked IPs are capped, evicting the least recently seen."""
+        limiter = RateLimiter(requests_per_minute=10, max_clients=RATE_LIMIT_SHARDS)
+
+        for i in range(1000):
+            limiter.is_rate_limited(f"10.0.{i // 256}.{i % 256}")
+
+        assert sum(len(windows) for _, windows in limiter._shards) <= RATE_LIMIT_SHARDS
+        assert limiter.get_client_stats("10.0.3.231")["requests_in_window"] == 1
+        assert limiter.get_client_stats("10.0.0.0")["requests_in_window"] == 0
+
+    def test_recently_seen_ip_not_evicted(self):
+        """Repeat requests keep an IP at the most recent end of its shard."""
+        limiter = RateLimiter(requests_per_minute=10, max_clients=2 * RATE_LIMIT_SHARDS)
+        _, windows = limiter._shard("192.168.1.1")
+
+        limiter.is_rate_limited("192.168.1.1")
+        for i in range(1000):
+            ip = f"10.0.{i // 256}.{i % 256}"
+            if limiter._shard(ip)[1] is windows:
+                limiter.is_rate_limited(ip)
+                limiter.is_rate_limited("192.168.1.1")
+
+        assert limiter.get_client_stats("192.168.1.1")["requests_in_window"] == 10
+
     def test_unknown_ip_not_limited(self):
         """Unknown/invalid IPs are not rate limited."""
         limiter = RateLimiter(requests_per_minute=1)
@@ -241,6 +312,16 @@ class TestGetRateLimitHeaders:
         assert headers["X-RateLimit-Remaining"] == "7"
         assert headers["X-RateLimit-Reset"] == "60"
 
+    def test_repeated_stats_share_headers(self):
+        """Identical stats reuse one read-only header mapping."""
+        stats = {"limit": 10, "remaining": 7, "window_seconds": 60}
+
+        headers = get_rate_limit_headers(stats)
+
+        assert get_rate_limit_headers(dict(stats)) is headers
+        with pytest.raises(TypeError):
+            headers["X-RateLimit-Remaining"] = "0"
+
     def test_generate_headers_empty_stats(self):
         """Generate headers from empty stats."""
         headers = get_rate_limit_headers({})
@@ -315,6 +396,27 @@ class TestConcurrency:
         not_limited = [r for r in results if not r[0]]
         assert len(not_limited) == 100
 
+    def test_concurrent_requests_many_ips(self):
+        """Concurrent first requests from many IPs are all counted."""
+        import threading
+
+        limiter = RateLimiter(requests_per_minute=100)
+        ips = [f"10.0.0.{i}" for i in range(64)]
+
+        def make_requests():
+            for ip in ips:
+                limiter.is_rate_limited(ip)
+
+        threads = [threading.Thread(target=make_requests) for _ in range(8)]
+
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        for ip in ips:
+            assert limiter.get_client_stats(ip)["requests_in_window"] == 8
+
 
 class TestEdgeCases:
     """Test edge cases and special scenarios."""
@@ -346,7 +448,7 @@ class TestEdgeCases:
             is_limited, _, _ = limiter.is_rate_limited("192.168.1.1")
             assert is_limited is False
 
-    def test_sliding_window_behavior(self):
+    def test_sliding_window_behavior(self, clock):
         """Sliding window correctly ages out requests."""
         limiter = RateLimiter(requests_per_minute=3, window_seconds=2)
 
@@ -355,17 +457,17 @@ class TestEdgeCases:
         limiter.is_rate_limited("192.168.1.1")
 
         # Wait 1 second (half the window)
-        time.sleep(1)
+        clock.advance(1)
 
         # Make 1 more (total 3, at limit)
         is_limited, count, _ = limiter.is_rate_limited("192.168.1.1")
         assert is_limited is False
         assert count == 3
 
-        # Wait another 1.5 seconds (first 2 requests should expire)
-        time.sleep(1.5)
+        # Wait another 1.5 seconds (0.5s into the next fixed window)
+        clock.advance(1.5)
 
-        # Should be allowed again (only 1 request in window)
+        # Should be allowed again: 3 * 0.75 weighted old + 1 new
         is_limited, count, _ = limiter.is_rate_limited("192.168.1.1")
         assert is_limited is False
-        assert count <= 2  # At most 1 old + 1 new
+        assert count == 3